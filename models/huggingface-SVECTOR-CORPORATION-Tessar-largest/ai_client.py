@@ -520,6 +520,61 @@ def option_profile_run_with_xai():
         print(f"Request failed: {e}")
 
 
+BENCHMARK_QUERIES = [
+    "In which year did beijing host the Olympic Games?",
+    "Which city hosted the Olympic Games in 1900?",
+    "How many times did athens host the Olympic Games?",
+    "Which city hosted the Olympic Games in 2012?",
+    "When did st. louis host the Olympic Games?",
+    "What is the first year in the table?",
+    "Which city hosted the Olympic Games after beijing?",
+    "Which city hosted the Olympic Games in 2004?",
+]
+
+
+def option_benchmark_table_cache():
+    """Compare the per-query latency of `/model/run` (no cache) and `/model/run_queries` (cached table)."""
+    table_data_path = input("Please input the local JSON file path containing the table data: ")
+    with open(table_data_path, "r") as f:
+        table_data = json.load(f)
+    num_repeats = int(input("Enter the number of repeats (default to 3): ") or 3)
+    num_queries = len(BENCHMARK_QUERIES) * num_repeats
+
+    start_time = time.perf_counter()
+    for _ in range(num_repeats):
+        for query in BENCHMARK_QUERIES:
+            send_post_request(
+                f"{SERVER_URL}/model/run",
+                {"table_data": table_data, "query": query, "ue_id": UE_ID},
+                {},
+            )
+    no_cache_latency = (time.perf_counter() - start_time) / num_queries
+
+    response, _, _, _ = send_post_request(
+        f"{SERVER_URL}/model/tables/register",
+        {"table_data": table_data, "ue_id": UE_ID},
+        {},
+    )
+    table_id = response["table_id"]
+
+    latencies = {}
+    for batch_size in [1, len(BENCHMARK_QUERIES)]:
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            send_post_request(
+                f"{SERVER_URL}/model/run_queries",
+                {"table_id": table_id, "queries": BENCHMARK_QUERIES, "batch_size": batch_size, "ue_id": UE_ID},
+                {},
+            )
+        latencies[batch_size] = (time.perf_counter() - start_time) / num_queries
+
+    print("\n--------- TABLE QA LATENCY (ms / query) ---------\n")
+    print(f"Table token cache enabled: {response['token_cache_enabled']}")
+    print(f"/model/run without cache: {no_cache_latency * 1000:.2f}")
+    for batch_size, latency in latencies.items():
+        print(f"/model/run_queries with cache, batch_size={batch_size}: {latency * 1000:.2f}")
+
+
 OPTIONS = [
     {
         "label": "Get help information",
@@ -541,6 +596,10 @@ OPTIONS = [
         "label": "Profile AI service with XAI (only image-classification models)",
         "action": option_profile_run_with_xai,
     },
+    {
+        "label": "Benchmark per-query latency with and without the table cache",
+        "action": option_benchmark_table_cache,
+    },
 ]
 
 
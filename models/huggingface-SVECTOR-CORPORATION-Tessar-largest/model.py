@@ -8,6 +8,11 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
 import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
@@ -28,6 +33,102 @@ tokenizer = TessarTokenizer.from_pretrained(MODEL_NAME)
 model = BartForConditionalGeneration.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
+# maximum number of registered tables kept in memory
+TABLE_CACHE_SIZE = int(os.getenv("TABLE_CACHE_SIZE", "64"))
+# default number of queries per `model.generate` call
+TABLE_QUERY_BATCH_SIZE = int(os.getenv("TABLE_QUERY_BATCH_SIZE", "8"))
+
+PARITY_PROBE_QUERIES = ["how many rows are there?", "what is the first value?"]
+
+
+def get_table_id(table_data: dict) -> str:
+    """Content hash of the table, independent of the key order of the JSON object."""
+    canonical = json.dumps(table_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def tokenize_query(query: str) -> list:
+    """Tokenize the query on its own, the same way the tokenizer treats the query part of a table input."""
+    if getattr(tokenizer, "do_lower_case", False):
+        query = query.lower()
+    return tokenizer.convert_tokens_to_ids(tokenizer.tokenize(query))
+
+
+class CachedTable:
+    """
+    A registered table with its parsed DataFrame and its tokenized (linearized) form.
+
+    The model input is `<s> query table </s>`, so the table tokens can be reused for
+    every query. Reuse is only enabled if splicing reproduces the tokenizer output
+    exactly for a few probe queries; otherwise each query is tokenized in full.
+    """
+
+    def __init__(self, table_data: dict):
+        self.table = pd.DataFrame.from_dict(table_data)
+        self.table_token_ids = None
+
+        reference_ids = tokenizer(table=self.table, query=PARITY_PROBE_QUERIES[0])["input_ids"]
+        query_ids = tokenize_query(PARITY_PROBE_QUERIES[0])
+        if reference_ids[1 : 1 + len(query_ids)] == query_ids:
+            self.table_token_ids = reference_ids[1 + len(query_ids) : -1]
+            if not all(
+                self.encode(query)
+                == tokenizer(table=self.table, query=query)["input_ids"]
+                for query in PARITY_PROBE_QUERIES
+            ):
+                self.table_token_ids = None
+
+    def encode(self, query: str) -> list:
+        """Return the input ids for a query against this table."""
+        if self.table_token_ids is not None:
+            input_ids = tokenizer.build_inputs_with_special_tokens(
+                tokenize_query(query) + self.table_token_ids
+            )
+            if len(input_ids) <= tokenizer.model_max_length:
+                return input_ids
+        # let the tokenizer truncate the table rows to fit
+        return tokenizer(table=self.table, query=query, truncation=True)["input_ids"]
+
+
+# registered tables, table id -> CachedTable, least recently used first
+cached_tables = OrderedDict()
+
+
+def register_table(table_data: dict) -> str:
+    """Register the table (once per distinct content) and return its id."""
+    table_id = get_table_id(table_data)
+    if table_id not in cached_tables:
+        cached_tables[table_id] = CachedTable(table_data)
+        while len(cached_tables) > TABLE_CACHE_SIZE:
+            cached_tables.popitem(last=False)
+    cached_tables.move_to_end(table_id)
+    return table_id
+
+
+def answer_queries(
+    cached_table: CachedTable, queries: list[str], batch_size: int = TABLE_QUERY_BATCH_SIZE
+) -> list:
+    """Answer many queries against one table, running `model.generate` on padded batches."""
+    encoded_queries = [cached_table.encode(query) for query in queries]
+    # sort by length so that the queries of a batch need little padding
+    order = sorted(range(len(queries)), key=lambda i: len(encoded_queries[i]))
+
+    answers = [None] * len(queries)
+    for start in range(0, len(order), batch_size):
+        batch_indexes = order[start : start + batch_size]
+        encoding = tokenizer.pad(
+            {"input_ids": [encoded_queries[i] for i in batch_indexes]},
+            return_tensors="pt",
+        ).to(device)
+        with torch.no_grad():
+            outputs = model.generate(**encoding)
+        for i, answer in zip(
+            batch_indexes, tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        ):
+            answers[i] = answer
+    return answers
+
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -99,6 +200,69 @@ async def profile_run(table_data: dict = Form(...), query: str = Form(...), ue_i
             status_code=500,
         )
 
+@router.post("/tables/register")
+async def register_table_endpoint(table_data: dict = Form(...), ue_id: str = Form(...)):
+    """
+    Endpoint to register a table once, the returned `table_id` can be used by `/run_queries`.
+    """
+    try:
+        table_id = register_table(table_data)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "table_id": table_id,
+                "token_cache_enabled": cached_tables[table_id].table_token_ids is not None,
+            }
+        )
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to process the request. {e}"},
+            status_code=500,
+        )
+
+
+@router.post("/run_queries")
+async def run_queries(
+    queries: list[str] = Form(...),
+    ue_id: str = Form(...),
+    table_id: Optional[str] = Form(None),
+    table_data: Optional[dict] = Form(None),
+    batch_size: int = Form(TABLE_QUERY_BATCH_SIZE),
+):
+    """
+    Endpoint to answer many queries against one table, given by `table_id` or `table_data`.
+    """
+    try:
+        if table_data is not None:
+            table_id = register_table(table_data)
+        if table_id not in cached_tables:
+            return JSONResponse(
+                content={"error": f"Table '{table_id}' is not registered."},
+                status_code=404,
+            )
+        cached_tables.move_to_end(table_id)
+
+        answers = answer_queries(cached_tables[table_id], queries, batch_size=batch_size)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "table_id": table_id,
+                "model_results": [
+                    {"query": query, "answer": answer}
+                    for query, answer in zip(queries, answers)
+                ],
+            }
+        )
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to process the request. {e}"},
+            status_code=500,
+        )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "table_data": {
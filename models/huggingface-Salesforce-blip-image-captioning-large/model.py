@@ -7,6 +7,11 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from typing import List, Optional
 import torch
 from fastapi import APIRouter, File, Form, UploadFile
 from fastapi.responses import JSONResponse
@@ -27,25 +32,152 @@ processor = BlipProcessor.from_pretrained(MODEL_NAME, use_fast=True)
 model = BlipForConditionalGeneration.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
-# Initialize the FastAPI router
-router = APIRouter()
+# maximum number of images whose vision encoder output is kept in memory
+VISION_CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "32"))
 
-@router.post("/run")
-async def run_model(file: UploadFile = File(...), ue_id: str = Form(...), text: str = Form(None)):
-    try:
-        # Prepare the model input
-        image = Image.open(file.file).convert("RGB")
+
+class VisionEncoderCache:
+    """LRU cache of the vision encoder output (image embeddings), keyed by the hash of the image bytes."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.image_embeds = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_image_embeds(self, image_bytes_list: List[bytes]) -> List[torch.Tensor]:
+        """Return the (1, seq_len, hidden) image embeddings, encoding all uncached images in one batch."""
+        keys = [hashlib.sha256(image_bytes).hexdigest() for image_bytes in image_bytes_list]
+        missing = {}
+        for key, image_bytes in zip(keys, image_bytes_list):
+            if key not in self.image_embeds and key not in missing:
+                missing[key] = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            pixel_values = processor(
+                images=list(missing.values()), return_tensors="pt"
+            )["pixel_values"].to(device)
+            with torch.no_grad():
+                image_embeds = model.vision_model(pixel_values=pixel_values)[0]
+            for key, embeds in zip(missing.keys(), image_embeds):
+                self.image_embeds[key] = embeds.unsqueeze(0)
+
+        # collect before evicting, so that a request larger than the cache still works
+        image_embeds = [self.image_embeds[key] for key in keys]
+        for key in keys:
+            self.image_embeds.move_to_end(key)
+        while len(self.image_embeds) > self.max_size:
+            self.image_embeds.popitem(last=False)
+        return image_embeds
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.image_embeds),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+vision_encoder_cache = VisionEncoderCache(VISION_CACHE_SIZE)
+
+
+def get_generate_kwargs(max_new_tokens: Optional[int], num_beams: Optional[int]) -> dict:
+    """Latency controls for the text decoder, unset values keep the model defaults."""
+    generate_kwargs = {}
+    if max_new_tokens:
+        generate_kwargs["max_new_tokens"] = max_new_tokens
+    if num_beams:
+        generate_kwargs["num_beams"] = num_beams
+    return generate_kwargs
+
+
+def generate_captions_from_image_embeds(
+    image_embeds: torch.Tensor, input_ids: torch.Tensor, generate_kwargs: dict
+) -> List[str]:
+    """
+    Run only the text decoder on precomputed image embeddings.
+    This mirrors `BlipForConditionalGeneration.generate` after its vision encoder call.
+    """
+    text_config = model.config.text_config
+    image_attention_mask = torch.ones(
+        image_embeds.size()[:-1], dtype=torch.long, device=device
+    )
+    input_ids = input_ids.clone()
+    input_ids[:, 0] = text_config.bos_token_id
+    with torch.no_grad():
+        outputs = model.text_decoder.generate(
+            input_ids=input_ids[:, :-1],
+            eos_token_id=text_config.sep_token_id,
+            pad_token_id=text_config.pad_token_id,
+            encoder_hidden_states=image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            **generate_kwargs,
+        )
+    return processor.batch_decode(outputs, skip_special_tokens=True)
+
+
+def caption_images(
+    image_bytes_list: List[bytes],
+    texts: Optional[List[str]] = None,
+    generate_kwargs: Optional[dict] = None,
+) -> List[List[str]]:
+    """
+    Caption every image with every text prefix (or unconditionally if no text is given).
+    The vision encoder runs at most once per distinct image; the (image, text) pairs are
+    grouped by prompt token length so each group is decoded as one unpadded batch.
+    Returns the captions as [image_index][text_index].
+    """
+    texts = texts or [None]
+    generate_kwargs = generate_kwargs or {}
+    image_embeds = vision_encoder_cache.get_image_embeds(image_bytes_list)
+
+    prompt_input_ids = []
+    for text in texts:
         if text:
-            inputs = processor(image, text, return_tensors="pt").to(device)
+            prompt_input_ids.append(processor(text=text, return_tensors="pt")["input_ids"][0])
         else:
-            inputs = processor(image, return_tensors="pt").to(device)
+            prompt_input_ids.append(
+                torch.tensor([model.decoder_input_ids, model.config.text_config.eos_token_id])
+            )
 
-        # Perform inference
-        with torch.no_grad():
-            outputs = model.generate(**inputs)
+    groups = {}
+    for image_index in range(len(image_bytes_list)):
+        for text_index, input_ids in enumerate(prompt_input_ids):
+            groups.setdefault(len(input_ids), []).append((image_index, text_index))
 
-        # Process the model outputs
-        caption = processor.decode(outputs[0], skip_special_tokens=True)
+    captions = [[None] * len(texts) for _ in image_bytes_list]
+    for pairs in groups.values():
+        batch_captions = generate_captions_from_image_embeds(
+            torch.cat([image_embeds[image_index] for image_index, _ in pairs]),
+            torch.stack([prompt_input_ids[text_index] for _, text_index in pairs]).to(device),
+            generate_kwargs,
+        )
+        for (image_index, text_index), caption in zip(pairs, batch_captions):
+            captions[image_index][text_index] = caption
+    return captions
+
+
+# Initialize the FastAPI router
+router = APIRouter()
+
+@router.post("/run")
+async def run_model(
+    file: UploadFile = File(...),
+    ue_id: str = Form(...),
+    text: str = Form(None),
+    max_new_tokens: Optional[int] = Form(None),
+    num_beams: Optional[int] = Form(None),
+):
+    try:
+        # Perform inference, the vision encoder output is reused for a known image
+        caption = caption_images(
+            [file.file.read()],
+            [text],
+            get_generate_kwargs(max_new_tokens, num_beams),
+        )[0][0]
 
         return JSONResponse(
             content={
@@ -102,6 +234,47 @@ async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...), text
             status_code=500,
         )
 
+@router.post("/run_batch")
+async def run_batch(
+    files: List[UploadFile] = File(...),
+    ue_id: str = Form(...),
+    texts: Optional[List[str]] = Form(None),
+    max_new_tokens: Optional[int] = Form(None),
+    num_beams: Optional[int] = Form(None),
+):
+    """
+    Endpoint to caption several images in one batch, optionally with several text prefixes per image.
+    """
+    try:
+        captions = caption_images(
+            [file.file.read() for file in files],
+            texts,
+            get_generate_kwargs(max_new_tokens, num_beams),
+        )
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": [
+                    {
+                        "file_name": file.filename,
+                        "captions": [
+                            {"text": text, "caption": caption}
+                            for text, caption in zip(texts or [None], image_captions)
+                        ],
+                    }
+                    for file, image_captions in zip(files, captions)
+                ],
+                "vision_encoder_cache": vision_encoder_cache.stats(),
+            }
+        )
+    except Exception as e:
+        print(f"Error processing file: {e}")
+        return JSONResponse(
+            content={"error": "Failed to process the image. {e}".format(e=str(e))},
+            status_code=500,
+        )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "file": {
@@ -115,7 +288,19 @@ MODEL_INPUT_FORM_SPEC = {
         "description": "Optional text for conditional image captioning.",
         "required": False,
         "example": "a photography of",
-    }
+    },
+    "max_new_tokens": {
+        "type": "integer",
+        "description": "Optional maximum number of generated tokens, lower values reduce latency.",
+        "required": False,
+        "example": 20,
+    },
+    "num_beams": {
+        "type": "integer",
+        "description": "Optional number of beams for beam search, 1 (greedy) is the fastest.",
+        "required": False,
+        "example": 1,
+    },
 }
 
 MODEL_OUTPUT_JSON_SPEC = {
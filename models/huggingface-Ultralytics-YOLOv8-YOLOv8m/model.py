@@ -4,14 +4,25 @@ from ai_server_utils import (
     profile_activities,
     prepare_profile_results,
 )
-# import profile utils
-from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+from typing import Optional
 import torch
 from fastapi import APIRouter, File, Form, UploadFile
-from fastapi.responses import JSONResponse
-from ultralytics import YOLO
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from yolo_utils import (
+    OUTPUT_FORMATS,
+    YOLO_BACKEND,
+    LazyStreamModel,
+    load_yolov8_model,
+    predict_yolov8,
+    process_yolov8_results,
+    profile_yolov8,
+    save_upload_to_temp_file,
+    stream_yolov8_results,
+    validate_stream_source,
+)
 from PIL import Image
 
 # --------------------------------
@@ -24,35 +35,48 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 # make sure the variables `MODEL_NAME` and `model` are defined here.
 # --------------------------------
 MODEL_NAME = "Ultralytics/YOLOv8m"
-model = YOLO("yolov8m.pt")
-model.eval()
+# the inference backend (pytorch, onnx or openvino) is selected by the `YOLO_BACKEND` env variable
+model, backend_parity = load_yolov8_model("yolov8m.pt")
+# separate instance for `/run_video`, a stream holds its predictor for its whole duration
+stream_model = LazyStreamModel("yolov8m.pt", model)
 
 # Initialize the FastAPI router
 router = APIRouter()
 
-def process_yolov8_detection_model_results(results):
+def process_yolov8_detection_model_results(
+    results, render=True, output_format="summary"
+):
     """
     Process the YOLOv8 detection model results.
+    The rendered image is `None` if `render` is false, which skips the plotting cost.
     """
-    rendered_image = results[0].plot(conf=True, pil=True, show=False, save=False)
-
-    return results[0].summary(), rendered_image
+    return process_yolov8_results(
+        results, render=render, output_format=output_format
+    )
 
 @router.post("/run")
-async def run_model(file: UploadFile = File(...), ue_id: str = Form(...)):
+async def run_model(
+    file: UploadFile = File(...),
+    ue_id: str = Form(...),
+    render: bool = Form(True),
+    output_format: str = Form("summary"),
+):
     try:
         # Prepare the model input
         input_image = Image.open(file.file)
 
         # Perform inference
-        with torch.no_grad():
-            results = model.predict(input_image, device=device)       
-        model_results, visualization = process_yolov8_detection_model_results(results)
+        results = await run_in_threadpool(predict_yolov8, model, input_image, device=device)
+        model_results, visualization = process_yolov8_detection_model_results(
+            results,
+            render=render,
+            output_format=output_format,
+        )
         return JSONResponse(
             content={
                 "ue_id": ue_id,
                 "model_results": model_results,
-                "visualization": encode_image(visualization),
+                "visualization": encode_image(visualization) if visualization is not None else None,
             }
         )
     except Exception as e:
@@ -63,7 +87,12 @@ async def run_model(file: UploadFile = File(...), ue_id: str = Form(...)):
         )
 
 @router.post("/profile_run")
-async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...)):
+async def profile_run(
+    file: UploadFile = File(...),
+    ue_id: str = Form(...),
+    render: bool = Form(True),
+    output_format: str = Form("summary"),
+):
     """
     Endpoint to profile the AI model execution.
     """
@@ -72,23 +101,24 @@ async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...)):
         image = Image.open(file.file).convert("RGB")
 
         # perform profiling
-        with profile(
-            activities=profile_activities,
-            profile_memory=True,
-        ) as prof:
-            with record_function("model_run"):
-                with torch.no_grad():
-                    results = model.predict(image, device=device)
+        prof, results = await run_in_threadpool(
+            profile_yolov8, model, image, profile_activities, device=device
+        )
 
         profile_result = prepare_profile_results(prof)
-        model_results, visualization = process_yolov8_detection_model_results(results)
+        profile_result["backend"] = YOLO_BACKEND
+        model_results, visualization = process_yolov8_detection_model_results(
+            results,
+            render=render,
+            output_format=output_format,
+        )
 
         return JSONResponse(
             content={
                 "ue_id": ue_id,
                 "profile_result": profile_result,
                 "model_results": model_results,
-                "visualization": encode_image(visualization),
+                "visualization": encode_image(visualization) if visualization is not None else None,
             }
         )
 
@@ -99,6 +129,58 @@ async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...)):
             status_code=500,
         )
 
+@router.post("/run_video")
+async def run_video(
+    file: Optional[UploadFile] = File(None),
+    source: str = Form(""),
+    ue_id: str = Form(...),
+    vid_stride: int = Form(1),
+    imgsz: int = Form(640),
+    max_frames: int = Form(0),
+    output_format: str = Form("summary"),
+):
+    """
+    Run the model on an uploaded video or a stream URL (rtsp, http or https) and stream
+    the per-frame results as NDJSON while the frames are processed.
+    """
+    try:
+        assert file is not None or source, "Either a video `file` or a stream `source` is required."
+        assert vid_stride >= 1, "`vid_stride` must be at least 1."
+        assert output_format in OUTPUT_FORMATS, f"Output format '{output_format}' is not supported."
+
+        if file is None:
+            source = validate_stream_source(source)
+            video_path = None
+        else:
+            video_path = await run_in_threadpool(save_upload_to_temp_file, file)
+        frames = stream_yolov8_results(
+            await run_in_threadpool(stream_model.get),
+            video_path or source,
+            ue_id,
+            device=device,
+            vid_stride=vid_stride,
+            imgsz=imgsz,
+            max_frames=max_frames,
+            output_format=output_format,
+            cleanup_path=video_path,
+        )
+        return StreamingResponse(frames, media_type="application/x-ndjson")
+    except Exception as e:
+        print(f"Error processing video: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to process the video. {e}"},
+            status_code=500,
+        )
+
+@router.get("/backend")
+async def get_backend():
+    """
+    Endpoint to get the inference backend and its parity check against PyTorch.
+    """
+    return JSONResponse(
+        content={"backend": YOLO_BACKEND, "parity": backend_parity}
+    )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "file": {
@@ -106,7 +188,19 @@ MODEL_INPUT_FORM_SPEC = {
         "description": "The image file to be processed.",
         "required": True,
         "example": "puppy.png",
-    }
+    },
+    "render": {
+        "type": "boolean",
+        "description": "Whether to render the results on the image, set to false to skip the visualization.",
+        "required": False,
+        "example": True,
+    },
+    "output_format": {
+        "type": "string",
+        "description": "'summary' for a list of JSON objects, 'packed' for base64 encoded float16/int arrays.",
+        "required": False,
+        "example": "summary",
+    },
 }
 
 MODEL_OUTPUT_JSON_SPEC = {
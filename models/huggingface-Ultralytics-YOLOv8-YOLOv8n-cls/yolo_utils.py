@@ -0,0 +1,382 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+import torch
+from torch.profiler import profile, record_function
+from ultralytics import YOLO
+
+
+# -------------------------------------------
+# Output formats
+# -------------------------------------------
+# "summary": `results[0].summary()`, a list of dicts with JSON floats
+# "packed": base64 encoded float16/int arrays, see `pack_yolov8_result`
+OUTPUT_FORMATS = ["summary", "packed"]
+# "rle": run-length encoded binary masks, "polygon": simplified mask contours
+MASK_FORMATS = ["rle", "polygon"]
+# maximum distance (in pixels) between a simplified polygon and the original contour
+POLYGON_EPSILON = 1.0
+
+
+def encode_array(array, dtype: str) -> dict:
+    """Pack a numpy array into a little-endian base64 string with its dtype and shape."""
+    array = np.ascontiguousarray(np.asarray(array).astype(np.dtype(dtype).newbyteorder("<")))
+    return {
+        "dtype": dtype,
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("utf-8"),
+    }
+
+
+def encode_mask_rle(mask: np.ndarray) -> dict:
+    """
+    Run-length encode a binary mask in row-major order.
+    The counts alternate between background and foreground pixels, starting with background.
+    """
+    flat = mask.astype(bool).ravel()
+    change_positions = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    counts = np.diff(np.concatenate([[0], change_positions, [flat.size]]))
+    if flat.size and flat[0]:
+        counts = np.concatenate([[0], counts])
+    return encode_array(counts, "uint32")
+
+
+def encode_mask_polygons(polygons: list, epsilon: float = POLYGON_EPSILON) -> dict:
+    """
+    Simplify the mask contours (in original image pixels) with Douglas-Peucker and pack them.
+    All points are concatenated into one (num_points, 2) uint16 array, `offsets[i]` is the
+    index of the first point of polygon `i`.
+    """
+    simplified = []
+    for polygon in polygons:
+        polygon = np.asarray(polygon, dtype=np.float32)
+        if len(polygon) > 2:
+            polygon = cv2.approxPolyDP(polygon.reshape(-1, 1, 2), epsilon, True).reshape(-1, 2)
+        simplified.append(np.clip(np.round(polygon), 0, np.iinfo(np.uint16).max))
+    lengths = [len(polygon) for polygon in simplified]
+    points = np.concatenate(simplified) if simplified else np.empty((0, 2))
+    return {
+        "points": encode_array(points, "uint16"),
+        "offsets": encode_array(np.cumsum([0] + lengths[:-1]), "uint32"),
+    }
+
+
+def pack_yolov8_result(result, mask_format: str = "rle") -> dict:
+    """Pack one Ultralytics result into compact arrays, only the fields of the model's task are included."""
+    assert mask_format in MASK_FORMATS, f"Mask format '{mask_format}' is not supported."
+    packed = {"image_shape": list(result.orig_shape)}
+    class_ids = None
+
+    if result.boxes is not None:
+        class_ids = result.boxes.cls.cpu().numpy().astype(np.int64)
+        packed["boxes_xyxy"] = encode_array(result.boxes.xyxy.cpu().numpy(), "float16")
+        packed["classes"] = encode_array(class_ids, "uint16")
+        packed["scores"] = encode_array(result.boxes.conf.cpu().numpy(), "float16")
+
+    if result.obb is not None:
+        class_ids = result.obb.cls.cpu().numpy().astype(np.int64)
+        packed["obb_corners"] = encode_array(result.obb.xyxyxyxy.cpu().numpy(), "float16")
+        packed["classes"] = encode_array(class_ids, "uint16")
+        packed["scores"] = encode_array(result.obb.conf.cpu().numpy(), "float16")
+
+    if result.keypoints is not None:
+        # (num_detections, num_keypoints, 3) as x, y, visibility
+        packed["keypoints"] = encode_array(result.keypoints.data.cpu().numpy(), "float16")
+
+    if result.masks is not None:
+        if mask_format == "rle":
+            masks = result.masks.data.cpu().numpy()
+            packed["mask_shape"] = list(masks.shape[1:])
+            packed["masks_rle"] = [encode_mask_rle(mask) for mask in masks]
+        else:
+            packed["masks_polygon"] = encode_mask_polygons(result.masks.xy)
+
+    if result.probs is not None:
+        class_ids = np.asarray(result.probs.top5, dtype=np.int64)
+        packed["top5_classes"] = encode_array(class_ids, "uint16")
+        packed["top5_scores"] = encode_array(result.probs.top5conf.cpu().numpy(), "float16")
+
+    if class_ids is not None:
+        # only the names of the classes present in this result
+        packed["names"] = {int(i): result.names[int(i)] for i in np.unique(class_ids)}
+    return packed
+
+
+def process_yolov8_results(
+    results, render: bool = True, output_format: str = "summary", mask_format: str = "rle"
+):
+    """
+    Prepare the model results and, only if `render` is set, the rendered image.
+    Returns `(model_results, rendered_image_or_None)`.
+    """
+    assert output_format in OUTPUT_FORMATS, f"Output format '{output_format}' is not supported."
+    if output_format == "summary":
+        model_results = results[0].summary()
+    else:
+        model_results = pack_yolov8_result(results[0], mask_format=mask_format)
+
+    rendered_image = None
+    if render:
+        rendered_image = results[0].plot(conf=True, pil=True, show=False, save=False)
+    return model_results, rendered_image
+
+
+# -------------------------------------------
+# Inference off the event loop
+# -------------------------------------------
+# Ultralytics' predictor holds a lock for the whole `predict` call, and for the whole
+# iteration of a `stream=True` generator. The calls run on worker threads (`run_in_threadpool`)
+# so a waiting request never blocks the event loop, and the video streams use their own
+# model instance (`load_yolov8_stream_model`) so a long stream does not hold back the image requests.
+def predict_yolov8(model, image, **kwargs):
+    """Run the model on one image without gradients, called on a worker thread."""
+    with torch.no_grad():
+        return model.predict(image, **kwargs)
+
+
+def profile_yolov8(model, image, activities, **kwargs):
+    """Profile one inference of the model, called on a worker thread. Returns `(prof, results)`."""
+    with profile(
+        activities=activities,
+        profile_memory=True,
+    ) as prof:
+        with record_function("model_run"):
+            results = predict_yolov8(model, image, **kwargs)
+    return prof, results
+
+
+# -------------------------------------------
+# Video and stream processing
+# -------------------------------------------
+# the only stream sources accepted besides uploaded files, local paths and camera
+# indexes of the service host are rejected
+STREAM_SOURCE_SCHEMES = ["rtsp", "rtsps", "http", "https"]
+
+
+def validate_stream_source(source: str) -> str:
+    """Check that a stream source is a network URL of one of the `STREAM_SOURCE_SCHEMES`."""
+    parsed_source = urlparse(source.strip())
+    assert parsed_source.scheme.lower() in STREAM_SOURCE_SCHEMES and parsed_source.netloc, (
+        f"Stream source '{source}' is not supported, "
+        f"use a URL with one of the schemes {STREAM_SOURCE_SCHEMES}."
+    )
+    return source.strip()
+
+
+def save_upload_to_temp_file(upload_file, chunk_size: int = 1024 * 1024) -> str:
+    """Copy an uploaded video to a temporary file in chunks, so the video is never held in memory."""
+    suffix = os.path.splitext(upload_file.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as temp_file:
+        shutil.copyfileobj(upload_file.file, temp_file, chunk_size)
+    return temp_file.name
+
+
+def stream_yolov8_results(
+    model,
+    source: str,
+    ue_id: str,
+    device=None,
+    vid_stride: int = 1,
+    imgsz: int = 640,
+    max_frames: int = 0,
+    output_format: str = "summary",
+    mask_format: str = "rle",
+    cleanup_path: str = None,
+):
+    """
+    Run the model over a video file or stream and yield one NDJSON line per processed frame.
+    Ultralytics' `stream=True` generator decodes and infers one frame at a time, so the memory
+    usage does not grow with the video length. `cleanup_path` is deleted once the stream ends.
+    """
+    try:
+        results = model.predict(
+            source,
+            stream=True,
+            device=device,
+            vid_stride=vid_stride,
+            imgsz=imgsz,
+            verbose=False,
+        )
+        for processed_frames, result in enumerate(results):
+            if max_frames and processed_frames >= max_frames:
+                break
+            model_results, _ = process_yolov8_results(
+                [result], render=False, output_format=output_format, mask_format=mask_format
+            )
+            frame = {
+                "ue_id": ue_id,
+                "frame_index": processed_frames * vid_stride,
+                "model_results": model_results,
+            }
+            yield json.dumps(frame) + "\n"
+    except Exception as e:
+        print(f"Error processing video: {e}")
+        yield json.dumps({"ue_id": ue_id, "error": f"Failed to process the video. {e}"}) + "\n"
+    finally:
+        if cleanup_path and os.path.exists(cleanup_path):
+            os.remove(cleanup_path)
+
+
+# -------------------------------------------
+# Inference backends
+# -------------------------------------------
+# "pytorch" runs the .pt weights eagerly, "onnx" and "openvino" load the weights
+# exported at build time (see the `YOLO_BACKEND` build argument in the Dockerfile)
+YOLO_BACKEND = os.getenv("YOLO_BACKEND", "pytorch")
+# compare the exported backend against PyTorch on a sample image at startup, 0 to disable
+YOLO_BACKEND_PARITY_CHECK = int(os.getenv("YOLO_BACKEND_PARITY_CHECK", "1"))
+# sample image for the parity check, Ultralytics' bundled bus.jpg is used if it does not exist
+YOLO_BACKEND_PARITY_IMAGE = os.getenv("YOLO_BACKEND_PARITY_IMAGE", "puppy.png")
+# suffix of the exported weights for each backend, e.g. yolov8n.pt -> yolov8n_openvino_model/
+YOLO_BACKEND_EXPORT_SUFFIXES = {
+    "pytorch": ".pt",
+    "onnx": ".onnx",
+    "openvino": "_openvino_model",
+}
+
+
+def get_exported_weights_path(weights: str, backend: str) -> str:
+    return os.path.splitext(weights)[0] + YOLO_BACKEND_EXPORT_SUFFIXES[backend]
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of two sets of xyxy boxes."""
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(axis=1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(axis=1)
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def compare_yolov8_results(reference, candidate, iou_threshold: float = 0.5) -> dict:
+    """
+    Compare the result of an exported backend with the PyTorch reference.
+    Classification compares the top-1 class and the probabilities, the other tasks greedily
+    match the detections of the same class by IoU (oriented boxes use their xyxy bounds).
+    """
+    if reference.probs is not None:
+        reference_probs = reference.probs.data.cpu().numpy()
+        candidate_probs = candidate.probs.data.cpu().numpy()
+        top1_match = int(reference.probs.top1) == int(candidate.probs.top1)
+        return {
+            "passed": top1_match,
+            "top1_match": top1_match,
+            "max_prob_diff": float(np.abs(reference_probs - candidate_probs).max()),
+        }
+
+    reference_boxes = reference.obb if reference.obb is not None else reference.boxes
+    candidate_boxes = candidate.obb if candidate.obb is not None else candidate.boxes
+    reference_xyxy = reference_boxes.xyxy.cpu().numpy()
+    candidate_xyxy = candidate_boxes.xyxy.cpu().numpy()
+    reference_classes = reference_boxes.cls.cpu().numpy()
+    candidate_classes = candidate_boxes.cls.cpu().numpy()
+    reference_scores = reference_boxes.conf.cpu().numpy()
+    candidate_scores = candidate_boxes.conf.cpu().numpy()
+
+    ious = box_iou(reference_xyxy, candidate_xyxy)
+    ious[reference_classes[:, None] != candidate_classes[None, :]] = 0
+    matched_ious, score_diffs = [], []
+    unmatched = np.ones(len(candidate_xyxy), dtype=bool)
+    for row in np.argsort(-reference_scores):
+        if not unmatched.any():
+            break
+        column = int(np.argmax(np.where(unmatched, ious[row], -1)))
+        if ious[row, column] < iou_threshold:
+            continue
+        unmatched[column] = False
+        matched_ious.append(ious[row, column])
+        score_diffs.append(abs(reference_scores[row] - candidate_scores[column]))
+
+    return {
+        "passed": len(matched_ious) == len(reference_xyxy) == len(candidate_xyxy),
+        "reference_detections": len(reference_xyxy),
+        "candidate_detections": len(candidate_xyxy),
+        "matched_detections": len(matched_ious),
+        "mean_iou": float(np.mean(matched_ious)) if matched_ious else None,
+        "max_score_diff": float(np.max(score_diffs)) if score_diffs else None,
+    }
+
+
+def check_backend_parity(reference_model, model, image=None) -> dict:
+    """Run both models on a sample image and compare their outputs."""
+    if image is None:
+        image = YOLO_BACKEND_PARITY_IMAGE
+        if not os.path.exists(image):
+            from ultralytics.utils import ASSETS
+
+            image = str(ASSETS / "bus.jpg")
+    reference = reference_model.predict(image, verbose=False)[0]
+    candidate = model.predict(image, verbose=False)[0]
+    return compare_yolov8_results(reference, candidate)
+
+
+def load_yolov8_model(weights: str, backend: str = YOLO_BACKEND):
+    """
+    Load the YOLOv8 model for the selected inference backend.
+    Returns `(model, parity)`, `parity` is the comparison against PyTorch or `None`
+    if the backend is PyTorch or the check is disabled.
+    """
+    assert backend in YOLO_BACKEND_EXPORT_SUFFIXES, f"Backend '{backend}' is not supported."
+    reference_model = YOLO(weights)
+    if backend == "pytorch":
+        reference_model.eval()
+        return reference_model, None
+
+    exported_weights = get_exported_weights_path(weights, backend)
+    if not os.path.exists(exported_weights):
+        # the export normally happens at build time, this keeps the service usable without it
+        print(f"{exported_weights} not found, exporting {weights} to {backend} at startup.")
+        reference_model.export(format=backend)
+    model = YOLO(exported_weights, task=reference_model.task)
+
+    parity = None
+    if YOLO_BACKEND_PARITY_CHECK:
+        parity = check_backend_parity(reference_model, model)
+        print(f"Parity of the {backend} backend against PyTorch: {parity}")
+        if not parity["passed"]:
+            print(f"WARNING: the {backend} backend does not match the PyTorch outputs.")
+    del reference_model
+    return model, parity
+
+
+def load_yolov8_stream_model(weights: str, model, backend: str = YOLO_BACKEND):
+    """
+    Load a second instance of the model for the video streams, from the same weights as `model`
+    (the exported weights exist once `load_yolov8_model` returned). Concurrent streams wait
+    for each other on its predictor lock, on worker threads.
+    """
+    if backend == "pytorch":
+        stream_model = YOLO(weights)
+        stream_model.eval()
+        return stream_model
+    return YOLO(get_exported_weights_path(weights, backend), task=model.task)
+
+
+class LazyStreamModel:
+    """
+    The stream model of `load_yolov8_stream_model`, loaded on the first `/run_video` call so
+    that the servers that never stream do not hold a second instance. The lock keeps concurrent
+    first calls from loading it twice, `get` blocks while loading and runs on a worker thread.
+    """
+
+    def __init__(self, weights: str, model, backend: str = YOLO_BACKEND):
+        self.weights = weights
+        self.model = model
+        self.backend = backend
+        self._stream_model = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._stream_model is None:
+            with self._lock:
+                if self._stream_model is None:
+                    self._stream_model = load_yolov8_stream_model(self.weights, self.model, self.backend)
+        return self._stream_model
@@ -90,6 +90,8 @@ class ProfileResultProcessor:
         self.self_cpu_time_total_us = 0
         self.device_time_total_us = 0
         self.self_device_time_total_us = 0
+        # inference backend (pytorch, onnx or openvino)
+        self.backend = None
 
         # xai related
         self.gradcam_method_name = None
@@ -135,6 +137,8 @@ class ProfileResultProcessor:
             self.node_id = node_id
         if self.k8s_pod_name is None:
             self.k8s_pod_name = k8s_pod_name
+        if self.backend is None:
+            self.backend = profile_result.get("backend", "pytorch")
 
         if self.gradcam_method_name is None:
             self.gradcam_method_name = gradcam_method_name
@@ -180,6 +184,7 @@ class ProfileResultProcessor:
         print(f"Device Name: {self.device_name}")
         print(f"Node ID: {self.node_id}")
         print(f"K8S_POD_NAME: {self.k8s_pod_name}")
+        print(f"Backend: {self.backend}")
 
         if self.gradcam_method_name:
             print(f"GradCAM Method Name: {self.gradcam_method_name}")
@@ -215,6 +220,7 @@ class ProfileResultProcessor:
         if not self.gradcam_method_name:
             complete_profile_data_to_save = {
                 "node_id": self.node_id,
+                "backend": self.backend,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -243,10 +249,13 @@ class ProfileResultProcessor:
                 },
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and backend
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("backend", "pytorch") == self.backend
+                ):
                     profile["inference"] = complete_profile_data_to_save["inference"]
                     profile_found = True
                     break
@@ -261,6 +270,7 @@ class ProfileResultProcessor:
         else:
             complete_xai_profile_data_to_save = {
                 "node_id": self.node_id,
+                "backend": self.backend,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -293,10 +303,13 @@ class ProfileResultProcessor:
                 ],
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and backend
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("backend", "pytorch") == self.backend
+                ):
                     profile_found = True
 
                     # check if there is already a profile for this xai method
@@ -351,6 +364,56 @@ def option_run():
             print("No visualization image found in the response.")
 
 
+def option_run_video():
+    """Run the AI service on a video file or stream URL and print the NDJSON frame results as they arrive."""
+    video_source = input("Please input the video file path or stream URL (e.g. rtsp://...): ").strip()
+    vid_stride = int(input("Process every n-th frame (default to 1): ") or 1)
+    imgsz = int(input("Inference image size (default to 640): ") or 640)
+    max_frames = int(input("Maximum number of frames to process, 0 for all (default to 0): ") or 0)
+
+    data = {
+        "ue_id": UE_ID,
+        "vid_stride": vid_stride,
+        "imgsz": imgsz,
+        "max_frames": max_frames,
+    }
+    files = {}
+    if "://" in video_source:
+        data["source"] = video_source
+    else:
+        files["file"] = open(video_source, "rb")
+
+    try:
+        start_time = time.perf_counter()
+        frame_count = 0
+        with requests.post(
+            f"{SERVER_URL}/model/run_video", data=data, files=files, stream=True
+        ) as response:
+            if response.status_code != 200:
+                print(f"Error: {response.status_code}, {response.text}")
+                return
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if "error" in frame:
+                    print(f"Error: {frame['error']}")
+                    break
+                frame_count += 1
+                print(
+                    f"Frame {frame['frame_index']}: {len(frame['model_results'])} results"
+                )
+        total_time = time.perf_counter() - start_time
+        print(f"\nProcessed {frame_count} frames in {total_time:.2f} seconds")
+        if frame_count:
+            print(f"Average: {frame_count / total_time:.2f} frames / second")
+    except requests.exceptions.RequestException as e:
+        print(f"Request failed: {e}")
+    finally:
+        for file in files.values():
+            file.close()
+
+
 def option_profile_run():
     data = prepare_ai_service_request_data()
     data = {**data, "ue_id": UE_ID}
@@ -541,6 +604,48 @@ def option_profile_run_with_xai():
         print(f"Request failed: {e}")
 
 
+def option_benchmark_response_formats():
+    """Compare the latency and response size of the rendered, render-free and packed outputs of `/model/run`."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    num_requests = int(input("Enter the number of requests per variant (default to 20): ") or 20)
+
+    # `mask_format` only changes the response of segmentation models
+    variants = [
+        {"render": True, "output_format": "summary"},
+        {"render": False, "output_format": "summary"},
+        {"render": False, "output_format": "packed", "mask_format": "rle"},
+        {"render": False, "output_format": "packed", "mask_format": "polygon"},
+    ]
+    rows = []
+    for variant in variants:
+        latencies, response_sizes = [], []
+        for _ in range(num_requests):
+            start_time = time.perf_counter()
+            response = requests.post(
+                f"{SERVER_URL}/model/run",
+                data={**data, **variant, "ue_id": UE_ID},
+                files=files,
+            )
+            latencies.append(time.perf_counter() - start_time)
+            if response.status_code != 200:
+                print(f"Error: {response.status_code}, {response.text}")
+                return
+            response_sizes.append(len(response.content))
+        rows.append(
+            (
+                ", ".join(f"{key}={value}" for key, value in variant.items()),
+                sum(latencies) / num_requests * 1000,
+                sum(response_sizes) / num_requests / 1024,
+            )
+        )
+
+    print("\n--------- RESPONSE FORMAT BENCHMARK ---------\n")
+    print(f"{'variant':<60} {'latency (ms)':>14} {'response (KB)':>14}")
+    for label, latency_ms, response_kb in rows:
+        print(f"{label:<60} {latency_ms:>14.2f} {response_kb:>14.2f}")
+
+
 OPTIONS = [
     {
         "label": "Get help information",
@@ -550,6 +655,10 @@ OPTIONS = [
         "label": "Run AI service",
         "action": option_run,
     },
+    {
+        "label": "Run AI service on a video or stream",
+        "action": option_run_video,
+    },
     {
         "label": "Profile AI service",
         "action": option_profile_run,
@@ -562,6 +671,10 @@ OPTIONS = [
         "label": "Profile AI service with XAI (only image-classification models)",
         "action": option_profile_run_with_xai,
     },
+    {
+        "label": "Benchmark response formats (render / summary / packed)",
+        "action": option_benchmark_response_formats,
+    },
 ]
 
 
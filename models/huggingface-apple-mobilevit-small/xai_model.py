@@ -1,6 +1,7 @@
 from typing import Callable, List, Optional
 from fastapi import APIRouter, File, Form, UploadFile
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from PIL import Image
 from torch.profiler import profile, record_function
 from pytorch_grad_cam import (
@@ -21,7 +22,6 @@ from pytorch_grad_cam.utils.model_targets import ClassifierOutputTarget
 from PIL import Image
 import numpy as np
 import torch
-from torchvision import transforms
 from typing import List, Optional
 
 
@@ -35,16 +35,26 @@ from ai_server_utils import (
 
 # Currently only support GradCAM on image-classification models.
 # so we import the model directly from the model.py file
-from model import model, device, processor as resize_and_normalize_processor
-
-
-resize_only_processor = transforms.Compose(
-    [
-        transforms.Resize((256, 256)),
-        transforms.ToTensor(),
-    ],
+from model import model, device, image_ingest
+from xai_engine import (
+    HEATMAP_DTYPES,
+    PERTURBATION_METHODS,
+    XAI_OUTPUT_FORMATS,
+    CAMEngine,
+    CAMEngineRegistry,
+    encode_heatmaps,
+)
+from xai_cache import XAIResultCache, get_model_fingerprint
+from xai_jobs import XAI_SLOW_METHODS, XAIJobManager, XAIJobQueueFull
+from xai_profiles import (
+    XAI_AUTO_LATENCY_BUDGET_MS,
+    get_default_perturbation_settings,
+    get_xai_method_costs,
+    load_node_profile,
+    select_xai_method,
 )
 
+
 GRADCAM_METHODS = {
     "GradCAM": GradCAM,
     "HiResCAM": HiResCAM,
@@ -59,6 +69,9 @@ GRADCAM_METHODS = {
     "RandomCAM": RandomCAM,
 }
 
+# method name that lets the service pick the method within the latency budget
+AUTO_GRADCAM_METHOD = "auto"
+
 
 class HuggingfaceToTensorModelWrapper(torch.nn.Module):
     """Model wrapper to return a tensor"""
@@ -91,126 +104,410 @@ def get_reshape_transform():
     return None
 
 
+def repeat_input_tensor_for_targets(
+    input_tensor: torch.Tensor, targets_for_gradcam: Optional[List[Callable]]
+) -> torch.Tensor:
+    """Helper function to replicate the tensor for each of the categories we want to create Grad-CAM for."""
+    return input_tensor[None, :].repeat(
+        (
+            1
+            if targets_for_gradcam is None or len(targets_for_gradcam) == 0
+            else len(targets_for_gradcam)
+        ),
+        1,
+        1,
+        1,
+    )
+
+
+def create_cam_visualization(batch_results: np.ndarray, input_image: np.ndarray) -> Image.Image:
+    """Helper function to overlay each CAM of the batch on the uint8 model input pixels and stack them horizontally."""
+    rgb_image = np.float32(input_image) / 255
+    results = []
+    for grayscale_cam in batch_results:
+        visualization = show_cam_on_image(
+            rgb_image,
+            grayscale_cam,
+            use_rgb=True,
+        )
+        results.append(visualization)
+    return Image.fromarray(np.hstack(results))
+
+
 def run_grad_cam_on_image(
-    model: torch.nn.Module,
-    target_layers: List[torch.nn.Module],
+    cam_engine: CAMEngine,
     targets_for_gradcam: Optional[List[Callable]],
     reshape_transform: Optional[Callable],
     input_tensor: torch.Tensor,
-    input_image: torch.Tensor,
-    gradcam_method: Callable,
+    input_image: np.ndarray,
 ):
     """Helper function to run GradCAM on an image and create a visualization.
     Since the classification target is None, the highest scoring category will be used for every image in the batch.
     """
 
-    with gradcam_method(
-        model=model,
-        target_layers=target_layers,
+    batch_results, model_outputs = cam_engine(
+        input_tensor=repeat_input_tensor_for_targets(input_tensor, targets_for_gradcam),
+        targets=(
+            None
+            if targets_for_gradcam is None or len(targets_for_gradcam) == 0
+            else targets_for_gradcam
+        ),
         reshape_transform=reshape_transform,
-    ) as cam:
-
-        # Replicate the tensor for each of the categories we want to create Grad-CAM for:
-        repeated_tensor = input_tensor[None, :].repeat(
-            (
-                1
-                if targets_for_gradcam is None or len(targets_for_gradcam) == 0
-                else len(targets_for_gradcam)
-            ),
-            1,
-            1,
-            1,
-        )
+    )
+    output_image = create_cam_visualization(batch_results, input_image)
 
-        batch_results = cam(
-            input_tensor=repeated_tensor,
-            targets=(
-                None
-                if targets_for_gradcam is None or len(targets_for_gradcam) == 0
-                else targets_for_gradcam
-            ),
-        )
-        results = []
-        for grayscale_cam in batch_results:
-            # adjust the shape of the input_image from (3, 244, 244) to (244, 244, 3)
-            visualization = show_cam_on_image(
-                np.float32(input_image.permute(1, 2, 0).numpy()),
-                grayscale_cam,
-                use_rgb=True,
-            )
-            results.append(visualization)
-        output_image = Image.fromarray(np.hstack(results))
+    return output_image, model_outputs
 
-        return output_image, cam.outputs
+
+def run_grad_cam_methods_on_image(
+    gradcam_method_names: List[str],
+    targets_for_gradcam: Optional[List[Callable]],
+    reshape_transform: Optional[Callable],
+    input_tensor: torch.Tensor,
+    input_image: np.ndarray,
+    reuse_cam_engine: bool = True,
+    output_format: str = "image",
+    perturbation_settings: Optional[dict] = None,
+):
+    """Helper function to run several GradCAM methods on an image and create one visualization per method.
+    With the "heatmap" output format, the raw CAMs are returned at the resolution of the feature map instead.
+    The gradient-based methods share a single forward and backward pass.
+    """
+    batch_results_per_method, model_outputs = cam_engines.run_methods(
+        gradcam_method_names,
+        input_tensor=repeat_input_tensor_for_targets(input_tensor, targets_for_gradcam),
+        targets=(
+            None
+            if targets_for_gradcam is None or len(targets_for_gradcam) == 0
+            else targets_for_gradcam
+        ),
+        reshape_transform=reshape_transform,
+        reuse=reuse_cam_engine,
+        native_resolution=output_format == "heatmap",
+        perturbation_settings=perturbation_settings,
+    )
+    if output_format == "heatmap":
+        return batch_results_per_method, model_outputs
+
+    output_images = {
+        gradcam_method_name: create_cam_visualization(batch_results, input_image)
+        for gradcam_method_name, batch_results in batch_results_per_method.items()
+    }
+
+    return output_images, model_outputs
+
+
+def get_requested_gradcam_method_names(
+    gradcam_method_name: Optional[str], gradcam_method_names: Optional[List[str]]
+) -> List[str]:
+    """Helper function to merge the single and the list form of the requested GradCAM methods."""
+    requested_method_names = ([gradcam_method_name] if gradcam_method_name else []) + (
+        gradcam_method_names or []
+    )
+    assert (
+        requested_method_names
+    ), "Provide a GradCAM method in 'gradcam_method_name' or 'gradcam_method_names'."
+    for requested_method_name in requested_method_names:
+        assert (
+            requested_method_name in GRADCAM_METHODS
+        ), f"GradCAM method '{requested_method_name}' is not supported. "
+    return list(dict.fromkeys(requested_method_names))
+
+
+def get_perturbation_settings(
+    gradcam_method_names: List[str], perturbation_overrides: Optional[dict] = None
+) -> dict:
+    """Helper function to apply the request-level overrides to the service-level perturbation settings."""
+    overrides = {
+        name: value for name, value in (perturbation_overrides or {}).items() if value is not None
+    }
+    return {
+        gradcam_method_name: {
+            **default_perturbation_settings[gradcam_method_name],
+            **overrides,
+            **({"source": "request"} if overrides else {}),
+        }
+        for gradcam_method_name in gradcam_method_names
+        if gradcam_method_name in default_perturbation_settings
+    }
+
+
+def select_auto_gradcam_method(
+    latency_budget_ms: Optional[float], perturbation_overrides: Optional[dict] = None
+) -> dict:
+    """Helper function to resolve the "auto" method with the profiled costs of the node and its current load.
+    The perturbation-based methods are costed with the channel ratio they will run with.
+    """
+    perturbation_settings = get_perturbation_settings(
+        list(xai_method_costs_ms), perturbation_overrides
+    )
+    method_costs_ms = {
+        gradcam_method_name: cost_ms
+        * perturbation_settings.get(gradcam_method_name, {}).get("channel_ratio", 1.0)
+        for gradcam_method_name, cost_ms in xai_method_costs_ms.items()
+    }
+    method_selection = select_xai_method(
+        latency_budget_ms if latency_budget_ms is not None else XAI_AUTO_LATENCY_BUDGET_MS,
+        method_costs_ms,
+        list(GRADCAM_METHODS),
+        in_flight=cam_engines.in_flight,
+    )
+    method_selection["cost_source"] = xai_method_cost_source
+    return method_selection
 
 
 # Initialize the FastAPI router
 router = APIRouter()
 
+# CAM engines are created once per (method, target layers) and reused across requests
+cam_engines = CAMEngineRegistry(
+    model=get_model_to_tensor_wrapper_class()(model),
+    target_layers=get_target_layers_for_grad_cam(model),
+    gradcam_methods=GRADCAM_METHODS,
+)
+
+# the slow XAI methods can be submitted as jobs, computed on a bounded worker pool
+xai_jobs = XAIJobManager()
+
+# service-level cost settings of the perturbation-based methods, derived from the node's profile
+default_perturbation_settings = {
+    gradcam_method_name: get_default_perturbation_settings(
+        gradcam_method_name, load_node_profile(), device
+    )
+    for gradcam_method_name in PERTURBATION_METHODS
+    if gradcam_method_name in GRADCAM_METHODS
+}
+
+# profiled execution time of each method on this node, used to resolve the "auto" method
+xai_method_costs_ms, xai_method_cost_source = get_xai_method_costs()
+
+# results of repeated XAI requests on the same image, tied to the fingerprint of the loaded model
+xai_cache = XAIResultCache(fingerprint=get_model_fingerprint(model))
+
+
+def explain_image(
+    pixels: np.ndarray,
+    pixel_values: torch.Tensor,
+    gradcam_method_names: List[str],
+    target_category_indexes: Optional[List[int]] = None,
+    reuse_cam_engine: bool = True,
+    output_format: str = "image",
+    heatmap_dtype: str = "uint8",
+    perturbation_overrides: Optional[dict] = None,
+) -> dict:
+    """
+    Run the XAI methods on an ingested image (see `ImageIngest`), shared by `/run` and the XAI jobs.
+    Returns the `xai_results` and `model_results` of the response.
+    """
+    assert (
+        output_format in XAI_OUTPUT_FORMATS
+    ), f"Output format '{output_format}' is not supported, use one of {XAI_OUTPUT_FORMATS}."
+    assert (
+        heatmap_dtype in HEATMAP_DTYPES
+    ), f"Heatmap dtype '{heatmap_dtype}' is not supported, use one of {HEATMAP_DTYPES}."
+
+    if target_category_indexes is None or len(target_category_indexes) == 0:
+        targets_for_gradcam = None
+    else:
+        # Convert to output target from category indexes
+        targets_for_gradcam = [
+            ClassifierOutputTarget(index) for index in target_category_indexes
+        ]
+    perturbation_settings = get_perturbation_settings(
+        gradcam_method_names, perturbation_overrides
+    )
+    reshape_transform = get_reshape_transform()
+
+    # Perform inference
+    print("Running GradCAM...")
+    xai_outputs, model_output_logits = run_grad_cam_methods_on_image(
+        gradcam_method_names=gradcam_method_names,
+        targets_for_gradcam=targets_for_gradcam,
+        reshape_transform=reshape_transform,
+        input_tensor=pixel_values.squeeze(0),
+        input_image=pixels,
+        reuse_cam_engine=reuse_cam_engine,
+        output_format=output_format,
+        perturbation_settings=perturbation_settings,
+    )
+
+    predictions = get_image_classification_results_from_model_output_logits(model, model_output_logits)
+
+    if output_format == "heatmap":
+        result_key = "heatmap"
+        encoded_outputs = {
+            gradcam_method_name: encode_heatmaps(grayscale_cams, heatmap_dtype)
+            for gradcam_method_name, grayscale_cams in xai_outputs.items()
+        }
+    else:
+        result_key = "image"
+        encoded_outputs = {
+            gradcam_method_name: encode_image(xai_image)
+            for gradcam_method_name, xai_image in xai_outputs.items()
+        }
+
+    if len(encoded_outputs) == 1:
+        # a single method keeps the original response format
+        [(gradcam_method_name, encoded_output)] = encoded_outputs.items()
+        xai_results = {
+            result_key: encoded_output,
+            "xai_method": gradcam_method_name,
+        }
+    else:
+        xai_results = {
+            f"{result_key}s": encoded_outputs,
+            "xai_methods": list(encoded_outputs),
+        }
+    if output_format == "heatmap":
+        # category explained by each heatmap of the batch, the overlay is left to the client
+        xai_results["target_ids"] = (
+            list(target_category_indexes)
+            if targets_for_gradcam is not None
+            else [int(model_output_logits[0].argmax())]
+        )
+    if perturbation_settings:
+        xai_results["perturbation"] = perturbation_settings
+
+    return {
+        "xai_results": xai_results,
+        "model_results": predictions,
+    }
+
+
+def explain_image_bytes(
+    image_bytes: bytes,
+    gradcam_method_names: List[str],
+    target_category_indexes: Optional[List[int]] = None,
+    reuse_cam_engine: bool = True,
+    output_format: str = "image",
+    heatmap_dtype: str = "uint8",
+    perturbation_overrides: Optional[dict] = None,
+    use_cache: bool = True,
+    method_selection: Optional[dict] = None,
+) -> dict:
+    """
+    Decode the uploaded image and run `explain_image`, unless the result is cached.
+    The cache key is the image content hash, the methods, the target categories and the
+    output parameters. The targets are explained in the requested order, with duplicates,
+    so the key keeps that order: the heatmaps and `target_ids` follow it.
+    `method_selection` is the resolution of the "auto" method, reported in the response.
+    """
+    perturbation_settings = get_perturbation_settings(gradcam_method_names, perturbation_overrides)
+    cache_key = XAIResultCache.make_key(
+        image_bytes,
+        gradcam_method_names=gradcam_method_names,
+        # no targets (None or []) explain the top category
+        target_category_indexes=list(target_category_indexes or []),
+        output_format=output_format,
+        heatmap_dtype=heatmap_dtype,
+        perturbation_settings={
+            gradcam_method_name: {
+                name: value for name, value in settings.items() if name != "source"
+            }
+            for gradcam_method_name, settings in perturbation_settings.items()
+        },
+    )
+
+    xai_output = xai_cache.get(cache_key) if use_cache else None
+    if xai_output is not None:
+        xai_output["xai_results"]["cache_hit"] = True
+        if method_selection is not None:
+            xai_output["xai_results"]["method_selection"] = method_selection
+        return xai_output
+
+    pixels, pixel_values = image_ingest(image_bytes)
+    xai_output = explain_image(
+        pixels,
+        pixel_values,
+        gradcam_method_names,
+        target_category_indexes,
+        reuse_cam_engine,
+        output_format,
+        heatmap_dtype,
+        perturbation_overrides,
+    )
+    if use_cache:
+        xai_cache.put(cache_key, xai_output)
+    xai_output["xai_results"]["cache_hit"] = False
+    if method_selection is not None:
+        xai_output["xai_results"]["method_selection"] = method_selection
+    return xai_output
+
 
 @router.post("/run")
 async def run_model(
     file: UploadFile = File(...),
     ue_id: str = Form(...),
-    gradcam_method_name: str = Form(...),
+    gradcam_method_name: Optional[str] = Form(None),
+    gradcam_method_names: Optional[List[str]] = Form(None),
     target_category_indexes: Optional[List[int]] = Form(None),
+    reuse_cam_engine: bool = Form(True),
+    output_format: str = Form("image"),
+    heatmap_dtype: str = Form("uint8"),
+    perturbation_batch_size: Optional[int] = Form(None),
+    channel_ratio: Optional[float] = Form(None),
+    top_k_channels: Optional[int] = Form(None),
+    use_cache: bool = Form(True),
+    latency_budget_ms: Optional[float] = Form(None),
 ):
     """
-    Endpoint to run the XAI model."""
+    Endpoint to run the XAI model.
+    Several methods can be requested at once in `gradcam_method_names`.
+    `output_format="heatmap"` returns the raw low-resolution CAMs instead of the composited image.
+    `perturbation_batch_size`, `channel_ratio` and `top_k_channels` override the cost settings
+    of AblationCAM and ScoreCAM, the settings used are reported in `xai_results.perturbation`.
+    The slow methods (`XAI_SLOW_METHODS`) are computed on a worker thread to keep the
+    event loop free, submit them to `/jobs` to not hold the connection either.
+    Repeated requests are served from the XAI result cache, unless `use_cache` is false.
+    `gradcam_method_name="auto"` picks the most informative method whose profiled time on this
+    node, scaled by the XAI requests in flight, fits `latency_budget_ms`
+    (`XAI_AUTO_LATENCY_BUDGET_MS` by default). The choice is reported in `xai_results.method_selection`.
+    """
 
     try:
         # Prepare the model input
         print("Preparing the model input...")
-        image = Image.open(file.file).convert("RGB")
-        normalized_image_tensor = (
-            resize_and_normalize_processor(images=image, return_tensors="pt")[
-                "pixel_values"
-            ]
-            .squeeze(0)
-            .to(device)
+        image_bytes = await file.read()
+        perturbation_overrides = {
+            "batch_size": perturbation_batch_size,
+            "channel_ratio": channel_ratio,
+            "top_k": top_k_channels,
+        }
+        method_selection = None
+        if gradcam_method_name == AUTO_GRADCAM_METHOD:
+            method_selection = select_auto_gradcam_method(latency_budget_ms, perturbation_overrides)
+            gradcam_method_name = method_selection["chosen"]
+        gradcam_method_names = get_requested_gradcam_method_names(
+            gradcam_method_name, gradcam_method_names
         )
-        original_image_tensor = resize_only_processor(image)
 
-        if target_category_indexes is None or len(target_category_indexes) == 0:
-            targets_for_gradcam = None
+        if any(method_name in XAI_SLOW_METHODS for method_name in gradcam_method_names):
+            xai_output = await run_in_threadpool(
+                explain_image_bytes,
+                image_bytes,
+                gradcam_method_names,
+                target_category_indexes,
+                reuse_cam_engine,
+                output_format,
+                heatmap_dtype,
+                perturbation_overrides,
+                use_cache,
+                method_selection,
+            )
         else:
-            # Convert to output target from category indexes
-            targets_for_gradcam = [
-                ClassifierOutputTarget(index) for index in target_category_indexes
-            ]
-        assert (
-            gradcam_method_name in GRADCAM_METHODS
-        ), f"GradCAM method '{gradcam_method_name}' is not supported. "
-        gradcam_method = GRADCAM_METHODS[gradcam_method_name]
-
-        model_wrapper_class = get_model_to_tensor_wrapper_class()
-        target_layers = get_target_layers_for_grad_cam(model)
-        reshape_transform = get_reshape_transform()
-
-        # Perform inference
-        print("Running GradCAM...")
-        xai_image, model_output_logits = run_grad_cam_on_image(
-            model=model_wrapper_class(model),
-            target_layers=target_layers,
-            targets_for_gradcam=targets_for_gradcam,
-            reshape_transform=reshape_transform,
-            input_tensor=normalized_image_tensor,
-            input_image=original_image_tensor,
-            gradcam_method=gradcam_method,
-        )
+            xai_output = explain_image_bytes(
+                image_bytes,
+                gradcam_method_names,
+                target_category_indexes,
+                reuse_cam_engine,
+                output_format,
+                heatmap_dtype,
+                perturbation_overrides,
+                use_cache,
+                method_selection,
+            )
 
-        predictions = get_image_classification_results_from_model_output_logits(model, model_output_logits)
-
-        return JSONResponse(
-            {
-                "ue_id": ue_id,
-                "xai_results": {
-                    "image": encode_image(xai_image),
-                    "xai_method": gradcam_method_name,
-                },
-                "model_results": predictions,
-            }
-        )
+        return JSONResponse({"ue_id": ue_id, **xai_output})
 
     except Exception as e:
         print(f"Error processing file: {e}")
@@ -226,21 +523,14 @@ async def profile_run(
     ue_id: str = Form(...),
     gradcam_method_name: str = Form(...),
     target_category_indexes: Optional[List[int]] = Form(None),
+    reuse_cam_engine: bool = Form(True),
 ):
     """
     Endpoint to profile the XAI run.
     """
     try:
         # Prepare the model input
-        image = Image.open(file.file).convert("RGB")
-        normalized_image_tensor = (
-            resize_and_normalize_processor(images=image, return_tensors="pt")[
-                "pixel_values"
-            ]
-            .squeeze(0)
-            .to(device)
-        )
-        original_image_tensor = resize_only_processor(image)
+        pixels, pixel_values = image_ingest(await file.read())
         if target_category_indexes is None or len(target_category_indexes) == 0:
             targets_for_gradcam = None
         else:
@@ -249,14 +539,8 @@ async def profile_run(
                 ClassifierOutputTarget(index) for index in target_category_indexes
             ]
 
-        assert (
-            gradcam_method_name in GRADCAM_METHODS
-        ), f"GradCAM method '{gradcam_method_name}' is not supported. "
-        gradcam_method = GRADCAM_METHODS[gradcam_method_name]
-
-        model_wrapper_class = get_model_to_tensor_wrapper_class()
-        target_layers = get_target_layers_for_grad_cam(model)
         reshape_transform = get_reshape_transform()
+        cam_engine = cam_engines.get(gradcam_method_name, reuse=reuse_cam_engine)
 
         # perform profiling
         with profile(
@@ -267,13 +551,11 @@ async def profile_run(
 
                 # Perform inference
                 xai_image, model_output_logits = run_grad_cam_on_image(
-                    model=model_wrapper_class(model),
-                    target_layers=target_layers,
+                    cam_engine=cam_engine,
                     targets_for_gradcam=targets_for_gradcam,
                     reshape_transform=reshape_transform,
-                    input_tensor=normalized_image_tensor,
-                    input_image=original_image_tensor,
-                    gradcam_method=gradcam_method,
+                    input_tensor=pixel_values.squeeze(0),
+                    input_image=pixels,
                 )
 
         return JSONResponse(
@@ -298,9 +580,183 @@ async def profile_run(
         )
 
 
+@router.get("/engines")
+async def get_cam_engines():
+    """
+    Endpoint to get the CAM engines that are kept alive across requests.
+    """
+    return JSONResponse(cam_engines.stats())
+
+
+@router.get("/perturbation_settings")
+async def get_default_perturbation_settings_of_node():
+    """
+    Endpoint to get the service-level cost settings of the perturbation-based methods.
+    """
+    return JSONResponse(default_perturbation_settings)
+
+
+@router.get("/method_costs")
+async def get_method_costs():
+    """
+    Endpoint to get the profiled XAI method costs used by the "auto" method, and the current load.
+    """
+    return JSONResponse(
+        {
+            "cost_source": xai_method_cost_source,
+            "costs_ms": xai_method_costs_ms,
+            "in_flight": cam_engines.in_flight,
+            "default_latency_budget_ms": XAI_AUTO_LATENCY_BUDGET_MS,
+        }
+    )
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """
+    Endpoint to get the size and hit rate of the XAI result cache.
+    """
+    return JSONResponse(xai_cache.metrics())
+
+
+@router.delete("/cache")
+async def invalidate_cache():
+    """
+    Endpoint to drop the cached XAI results, e.g. after the model weights were reloaded.
+    The model fingerprint is recomputed.
+    """
+    xai_cache.invalidate(get_model_fingerprint(model))
+    return JSONResponse(xai_cache.metrics())
+
+
+@router.post("/jobs")
+async def submit_job(
+    file: UploadFile = File(...),
+    ue_id: str = Form(...),
+    gradcam_method_name: Optional[str] = Form(None),
+    gradcam_method_names: Optional[List[str]] = Form(None),
+    target_category_indexes: Optional[List[int]] = Form(None),
+    reuse_cam_engine: bool = Form(True),
+    output_format: str = Form("image"),
+    heatmap_dtype: str = Form("uint8"),
+    perturbation_batch_size: Optional[int] = Form(None),
+    channel_ratio: Optional[float] = Form(None),
+    top_k_channels: Optional[int] = Form(None),
+    use_cache: bool = Form(True),
+    latency_budget_ms: Optional[float] = Form(None),
+):
+    """
+    Endpoint to submit an XAI run as an asynchronous job.
+    Poll `/jobs/{job_id}` for the status and fetch the result from `/jobs/{job_id}/result`.
+    The "auto" method is resolved when the job is submitted.
+    """
+    try:
+        perturbation_overrides = {
+            "batch_size": perturbation_batch_size,
+            "channel_ratio": channel_ratio,
+            "top_k": top_k_channels,
+        }
+        method_selection = None
+        if gradcam_method_name == AUTO_GRADCAM_METHOD:
+            method_selection = select_auto_gradcam_method(latency_budget_ms, perturbation_overrides)
+            gradcam_method_name = method_selection["chosen"]
+        gradcam_method_names = get_requested_gradcam_method_names(
+            gradcam_method_name, gradcam_method_names
+        )
+        # read the upload now, the request is closed once the job is queued
+        image_bytes = await file.read()
+        job = xai_jobs.submit(
+            explain_image_bytes,
+            ue_id,
+            ",".join(gradcam_method_names),
+            image_bytes=image_bytes,
+            gradcam_method_names=gradcam_method_names,
+            target_category_indexes=target_category_indexes,
+            reuse_cam_engine=reuse_cam_engine,
+            output_format=output_format,
+            heatmap_dtype=heatmap_dtype,
+            perturbation_overrides=perturbation_overrides,
+            use_cache=use_cache,
+            method_selection=method_selection,
+        )
+        return JSONResponse(job.to_dict(), status_code=202)
+
+    except XAIJobQueueFull as e:
+        return JSONResponse(content={"error": str(e)}, status_code=429)
+    except Exception as e:
+        print(f"Error submitting the job: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to submit the job. {e}"},
+            status_code=500,
+        )
+
+
+@router.get("/jobs/metrics")
+async def get_job_metrics():
+    """
+    Endpoint to get the queue metrics of the XAI jobs.
+    """
+    return JSONResponse(xai_jobs.metrics())
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Endpoint to get the status of an XAI job.
+    """
+    job = xai_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            content={"error": f"Job '{job_id}' not found or expired."}, status_code=404
+        )
+    return JSONResponse(job.to_dict())
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Endpoint to fetch the result of a finished XAI job, in the same format as `/run`.
+    """
+    job = xai_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(
+            content={"error": f"Job '{job_id}' not found or expired."}, status_code=404
+        )
+    if job.status != "succeeded":
+        return JSONResponse(
+            content={
+                "error": f"Job '{job_id}' has no result, its status is '{job.status}'.",
+                **job.to_dict(),
+            },
+            status_code=409,
+        )
+    return JSONResponse({"ue_id": job.ue_id, "job_id": job.job_id, **job.result})
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """
+    Endpoint to cancel an XAI job.
+    """
+    job = xai_jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(
+            content={"error": f"Job '{job_id}' not found or expired."}, status_code=404
+        )
+    return JSONResponse(job.to_dict())
+
+
 XAI_OUTPUT_JSON_SPEC = {
     "xai_results": {
         "image": "XAI image result",
         "xai_method": "XAI method used",
+        "images": "XAI image result per method, if several methods were requested",
+        "xai_methods": "XAI methods used, if several methods were requested",
+        "heatmap": "Raw CAMs at feature map resolution (dtype, shape, base64 data), with output_format=heatmap",
+        "heatmaps": "Raw CAMs per method, if several methods were requested with output_format=heatmap",
+        "target_ids": "Category explained by each heatmap of the batch, with output_format=heatmap",
+        "perturbation": "Batch size, channel ratio and top-k channels per perturbation-based method",
+        "cache_hit": "Whether the result was served from the XAI result cache",
+        "method_selection": "Method chosen for gradcam_method_name=auto, with its expected cost and the latency budget",
     }
 }
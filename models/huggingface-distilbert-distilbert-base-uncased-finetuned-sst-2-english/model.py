@@ -11,6 +11,12 @@ from torch.profiler import profile, record_function
 import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
+from quantization_utils import (
+    QUANTIZE,
+    QUANTIZE_SMOKE_TEST,
+    quantize_model,
+    run_quantization_smoke_test,
+)
 from transformers import DistilBertTokenizer, DistilBertForSequenceClassification
 
 # --------------------------------
@@ -31,6 +37,38 @@ model = DistilBertForSequenceClassification.from_pretrained(
 ).to(device)
 model.eval()
 
+# --------------------------------
+# Optional dynamic int8 quantization, selected by the `QUANTIZE` env variable
+# --------------------------------
+# bundled samples for the accuracy smoke test of the quantized model
+QUANTIZATION_SMOKE_TEST_SAMPLES = [
+    "I love this product! It's amazing and works perfectly.",
+    "This is the worst purchase I have ever made.",
+    "The movie was okay, nothing special.",
+    "Absolutely fantastic service, I will come back again.",
+    "The food was cold and the staff was rude.",
+    "It arrived on time and does what it says.",
+]
+
+
+def predict_class_id(classification_model, text: str) -> int:
+    inputs = tokenizer(text, return_tensors="pt").to(device)
+    with torch.no_grad():
+        return classification_model(**inputs).logits.argmax().item()
+
+
+reference_model = model
+quantized_model, precision = quantize_model(reference_model, device)
+quantization_smoke_test = None
+if quantized_model is not reference_model and QUANTIZE_SMOKE_TEST:
+    quantization_smoke_test = run_quantization_smoke_test(
+        lambda sample: predict_class_id(reference_model, sample),
+        lambda sample: predict_class_id(quantized_model, sample),
+        QUANTIZATION_SMOKE_TEST_SAMPLES,
+    )
+model = quantized_model
+del reference_model, quantized_model
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -85,6 +123,7 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
                     logits = model(**inputs).logits
 
         profile_result = prepare_profile_results(prof)
+        profile_result["precision"] = precision
 
         # Process the model outputs
         predicted_class_id = logits.argmax().item()
@@ -109,6 +148,20 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
         )
 
 
+@router.get("/quantization")
+async def get_quantization():
+    """
+    Endpoint to get the quantization mode, the precision and the smoke test results.
+    """
+    return JSONResponse(
+        content={
+            "quantize": QUANTIZE,
+            "precision": precision,
+            "smoke_test": quantization_smoke_test,
+        }
+    )
+
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "text": {
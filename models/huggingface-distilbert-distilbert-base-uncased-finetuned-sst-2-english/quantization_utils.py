@@ -0,0 +1,84 @@
+import io
+import os
+
+import torch
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# "none" keeps the fp32 model, "dynamic-int8" quantizes the weights of all Linear layers
+# to int8 at load time (activations are quantized on the fly), only supported on CPU
+QUANTIZE = os.getenv("QUANTIZE", "none")
+# run the accuracy smoke test on the bundled samples after quantization, 0 to disable
+QUANTIZE_SMOKE_TEST = int(os.getenv("QUANTIZE_SMOKE_TEST", "1"))
+# minimum fraction of samples on which the quantized model must agree with the fp32 model
+QUANTIZE_MIN_AGREEMENT = float(os.getenv("QUANTIZE_MIN_AGREEMENT", "1.0"))
+
+QUANTIZE_MODES = ["none", "dynamic-int8"]
+# precision recorded in the profile results for each quantization mode
+PRECISIONS = {"none": "fp32", "dynamic-int8": "int8-dynamic"}
+
+
+def get_model_size_mb(model) -> float:
+    """Size of the serialized state dict, which includes the packed int8 weights."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def quantize_model(model, device, mode: str = QUANTIZE):
+    """
+    Apply the quantization mode to the model.
+    Returns `(model, precision)`. The original model is not modified, and it is returned
+    unchanged if the mode is "none" or the model runs on a GPU.
+    """
+    assert mode in QUANTIZE_MODES, f"Quantization mode '{mode}' is not supported."
+    if mode == "none":
+        return model, PRECISIONS["none"]
+    if device.type != "cpu":
+        print(f"QUANTIZE={mode} is only supported on CPU, keeping the fp32 model on {device}.")
+        return model, PRECISIONS["none"]
+
+    quantized_model = torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    quantized_model.eval()
+    print(
+        f"Quantized the Linear layers to int8: {get_model_size_mb(model):.1f} MB -> "
+        f"{get_model_size_mb(quantized_model):.1f} MB"
+    )
+    return quantized_model, PRECISIONS[mode]
+
+
+def run_quantization_smoke_test(
+    reference_predict, quantized_predict, samples: list, min_agreement: float = QUANTIZE_MIN_AGREEMENT
+) -> dict:
+    """
+    Compare the predictions of the fp32 and the quantized model on the bundled samples.
+    `reference_predict(sample)` and `quantized_predict(sample)` must return comparable
+    predictions, e.g. the predicted class id.
+    """
+    mismatches = []
+    for sample in samples:
+        reference_prediction = reference_predict(sample)
+        quantized_prediction = quantized_predict(sample)
+        if reference_prediction != quantized_prediction:
+            mismatches.append(
+                {
+                    "sample": sample,
+                    "reference": reference_prediction,
+                    "quantized": quantized_prediction,
+                }
+            )
+
+    agreement = 1 - len(mismatches) / len(samples) if samples else 1.0
+    smoke_test = {
+        "samples": len(samples),
+        "agreement": agreement,
+        "passed": agreement >= min_agreement,
+        "mismatches": mismatches,
+    }
+    print(f"Quantization smoke test: {len(samples) - len(mismatches)}/{len(samples)} samples agree.")
+    if not smoke_test["passed"]:
+        print(f"WARNING: the quantized model agrees on less than {min_agreement:.0%} of the samples.")
+    return smoke_test
@@ -90,6 +90,8 @@ class ProfileResultProcessor:
         self.self_cpu_time_total_us = 0
         self.device_time_total_us = 0
         self.self_device_time_total_us = 0
+        # model precision (fp32 or int8-dynamic)
+        self.precision = None
 
         # xai related
         self.gradcam_method_name = None
@@ -135,6 +137,8 @@ class ProfileResultProcessor:
             self.node_id = node_id
         if self.k8s_pod_name is None:
             self.k8s_pod_name = k8s_pod_name
+        if self.precision is None:
+            self.precision = profile_result.get("precision", "fp32")
 
         if self.gradcam_method_name is None:
             self.gradcam_method_name = gradcam_method_name
@@ -174,6 +178,7 @@ class ProfileResultProcessor:
         print(f"Device Name: {self.device_name}")
         print(f"Node ID: {self.node_id}")
         print(f"K8S_POD_NAME: {self.k8s_pod_name}")
+        print(f"Precision: {self.precision}")
 
         if self.gradcam_method_name:
             print(f"GradCAM Method Name: {self.gradcam_method_name}")
@@ -209,6 +214,7 @@ class ProfileResultProcessor:
         if not self.gradcam_method_name:
             complete_profile_data_to_save = {
                 "node_id": self.node_id,
+                "precision": self.precision,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -238,10 +244,13 @@ class ProfileResultProcessor:
                 },
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and precision
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("precision", "fp32") == self.precision
+                ):
                     profile["inference"] = complete_profile_data_to_save["inference"]
                     profile_found = True
                     break
@@ -256,6 +265,7 @@ class ProfileResultProcessor:
         else:
             complete_xai_profile_data_to_save = {
                 "node_id": self.node_id,
+                "precision": self.precision,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -288,10 +298,13 @@ class ProfileResultProcessor:
                 ],
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and precision
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("precision", "fp32") == self.precision
+                ):
                     profile_found = True
 
                     # check if there is already a profile for this xai method
@@ -520,6 +533,46 @@ def option_profile_run_with_xai():
         print(f"Request failed: {e}")
 
 
+BENCHMARK_TEXTS = [
+    "My name is Wolfgang and I live in Berlin.",
+    "Angela Merkel met Emmanuel Macron in Paris on Tuesday.",
+    "Apple is looking at buying a U.K. startup for $1 billion.",
+    "The Cranfield University campus is located in Bedfordshire, England.",
+    "Sundar Pichai announced that Google will open a new office in Warsaw next year, "
+    "while Microsoft plans to expand its data centres in Dublin and Amsterdam.",
+    "Lionel Messi scored twice as Inter Miami beat the New York Red Bulls.",
+    "The European Space Agency launched the Juice probe from Kourou in French Guiana.",
+    "Barack Obama was born in Honolulu, Hawaii.",
+]
+
+
+def option_benchmark_batched_ner():
+    """Measure the throughput of `/model/run_batch` at batch sizes 1 to 64 against one `/model/run` per text."""
+    num_texts = int(input("Enter the number of texts per measurement (default to 128): ") or 128)
+    texts = [BENCHMARK_TEXTS[i % len(BENCHMARK_TEXTS)] for i in range(num_texts)]
+
+    start_time = time.perf_counter()
+    for text in texts:
+        send_post_request(f"{SERVER_URL}/model/run", {"text": text, "ue_id": UE_ID}, {})
+    baseline_throughput = num_texts / (time.perf_counter() - start_time)
+
+    rows = []
+    for batch_size in [1, 2, 4, 8, 16, 32, 64]:
+        start_time = time.perf_counter()
+        send_post_request(
+            f"{SERVER_URL}/model/run_batch",
+            {"texts": texts, "batch_size": batch_size, "ue_id": UE_ID},
+            {},
+        )
+        rows.append((batch_size, num_texts / (time.perf_counter() - start_time)))
+
+    print("\n--------- NER THROUGHPUT (texts / second) ---------\n")
+    print(f"/model/run (one text per request): {baseline_throughput:.2f}")
+    print(f"{'batch_size':>10} {'run_batch':>12} {'speedup':>10}")
+    for batch_size, throughput in rows:
+        print(f"{batch_size:>10} {throughput:>12.2f} {throughput / baseline_throughput:>9.2f}x")
+
+
 OPTIONS = [
     {
         "label": "Get help information",
@@ -541,6 +594,10 @@ OPTIONS = [
         "label": "Profile AI service with XAI (only image-classification models)",
         "action": option_profile_run_with_xai,
     },
+    {
+        "label": "Benchmark batched NER at batch sizes 1 to 64",
+        "action": option_benchmark_batched_ner,
+    },
 ]
 
 
@@ -8,9 +8,16 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import os
 import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
+from quantization_utils import (
+    QUANTIZE,
+    QUANTIZE_SMOKE_TEST,
+    quantize_model,
+    run_quantization_smoke_test,
+)
 from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
 
 # --------------------------------
@@ -27,12 +34,87 @@ tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
 model = AutoModelForTokenClassification.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
+# --------------------------------
+# Optional dynamic int8 quantization, selected by the `QUANTIZE` env variable
+# --------------------------------
+# bundled samples for the accuracy smoke test of the quantized model
+QUANTIZATION_SMOKE_TEST_SAMPLES = [
+    "My name is Wolfgang and I live in Berlin.",
+    "Apple is looking at buying a U.K. startup for $1 billion.",
+    "Angela Merkel met Emmanuel Macron in Paris on Monday.",
+    "The United Nations headquarters is in New York City.",
+]
+
+
+def predict_token_labels(token_classification_model, text: str) -> list:
+    inputs = tokenizer(text, return_tensors="pt").to(device)
+    with torch.no_grad():
+        return token_classification_model(**inputs).logits.argmax(dim=-1)[0].tolist()
+
+
+reference_model = model
+quantized_model, precision = quantize_model(reference_model, device)
+quantization_smoke_test = None
+if quantized_model is not reference_model and QUANTIZE_SMOKE_TEST:
+    quantization_smoke_test = run_quantization_smoke_test(
+        lambda sample: predict_token_labels(reference_model, sample),
+        lambda sample: predict_token_labels(quantized_model, sample),
+        QUANTIZATION_SMOKE_TEST_SAMPLES,
+    )
+model = quantized_model
+del reference_model, quantized_model
+
 # Initialize the FastAPI router
 router = APIRouter()
 
 # Initialize the NER pipeline
 nlp = pipeline("ner", model=model, tokenizer=tokenizer, device=0 if torch.cuda.is_available() else -1)
 
+# defaults for the batched endpoint
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "16"))
+NER_AGGREGATION_STRATEGY = os.getenv("NER_AGGREGATION_STRATEGY", "simple")
+NER_AGGREGATION_STRATEGIES = ["none", "simple", "first", "average", "max"]
+
+
+def run_ner_batch(
+    texts: list[str],
+    batch_size: int = NER_BATCH_SIZE,
+    aggregation_strategy: str = NER_AGGREGATION_STRATEGY,
+) -> list:
+    """
+    Run NER over a list of texts.
+    The texts are sorted by token length before batching, so every batch is padded
+    only to its own longest text, and the results are returned in the input order.
+    """
+    assert (
+        aggregation_strategy in NER_AGGREGATION_STRATEGIES
+    ), f"Aggregation strategy '{aggregation_strategy}' is not supported."
+    if not texts:
+        return []
+
+    token_lengths = [len(ids) for ids in tokenizer(texts)["input_ids"]]
+    order = sorted(range(len(texts)), key=lambda i: token_lengths[i])
+    sorted_results = nlp(
+        [texts[i] for i in order],
+        batch_size=batch_size,
+        aggregation_strategy=aggregation_strategy,
+    )
+
+    # entity label key is "entity" without aggregation and "entity_group" with aggregation
+    results = [None] * len(texts)
+    for text_index, entities in zip(order, sorted_results):
+        results[text_index] = [
+            {
+                "entity": entity.get("entity_group", entity.get("entity")),
+                "start": int(entity["start"]),
+                "end": int(entity["end"]),
+                "score": round(float(entity["score"]), 4),
+            }
+            for entity in entities
+        ]
+    return results
+
+
 @router.post("/run")
 async def run_model(text: str = Form(...), ue_id: str = Form(...)):
     try:
@@ -67,6 +149,7 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
                 ner_results = nlp(text)
 
         profile_result = prepare_profile_results(prof)
+        profile_result["precision"] = precision
 
         return JSONResponse(
             content={
@@ -83,6 +166,47 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
             status_code=500,
         )
 
+@router.post("/run_batch")
+async def run_batch(
+    texts: list[str] = Form(...),
+    ue_id: str = Form(...),
+    batch_size: int = Form(NER_BATCH_SIZE),
+    aggregation_strategy: str = Form(NER_AGGREGATION_STRATEGY),
+):
+    """
+    Endpoint to run NER on a list of texts with length-sorted dynamic padding.
+    """
+    try:
+        results = run_ner_batch(
+            texts, batch_size=batch_size, aggregation_strategy=aggregation_strategy
+        )
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": results,
+            }
+        )
+    except Exception as e:
+        print(f"Error processing text: {e}")
+        return JSONResponse(
+            content={"error": "Failed to process the text. {e}".format(e=str(e))},
+            status_code=500,
+        )
+
+@router.get("/quantization")
+async def get_quantization():
+    """
+    Endpoint to get the quantization mode, the precision and the smoke test results.
+    """
+    return JSONResponse(
+        content={
+            "quantize": QUANTIZE,
+            "precision": precision,
+            "smoke_test": quantization_smoke_test,
+        }
+    )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "text": {
@@ -520,6 +520,337 @@ def option_profile_run_with_xai():
         print(f"Request failed: {e}")
 
 
+def option_benchmark_xai_engine_reuse():
+    """Compare the per-request XAI latency of reused CAM engines against engines created per request."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    num_requests = int(input("Enter the number of requests per method (default to 10): ") or 10)
+
+    rows = []
+    for gradcam_method_name in XAI_GRADCAM_METHODS:
+        latencies_ms = {}
+        for reuse_cam_engine in [False, True]:
+            request_data = {
+                **data,
+                "ue_id": UE_ID,
+                "gradcam_method_name": gradcam_method_name,
+                "reuse_cam_engine": reuse_cam_engine,
+            }
+            # warm-up request, so the reused engine already exists when measuring
+            send_post_request(f"{SERVER_URL}/xai_model/run", request_data, files)
+            start_time = time.perf_counter()
+            for _ in range(num_requests):
+                send_post_request(f"{SERVER_URL}/xai_model/run", request_data, files)
+            latencies_ms[reuse_cam_engine] = (
+                (time.perf_counter() - start_time) / num_requests * 1000
+            )
+        rows.append((gradcam_method_name, latencies_ms[False], latencies_ms[True]))
+
+    print("\n--------- XAI ENGINE REUSE (average latency per request) ---------\n")
+    print(f"{'method':<16} {'per-request (ms)':>18} {'reused (ms)':>14} {'saved (ms)':>12}")
+    for gradcam_method_name, per_request_ms, reused_ms in rows:
+        print(
+            f"{gradcam_method_name:<16} {per_request_ms:>18.2f} {reused_ms:>14.2f} {per_request_ms - reused_ms:>12.2f}"
+        )
+
+
+def option_run_xai_job():
+    """Submit an XAI run as an asynchronous job, poll it until it finishes and fetch the result."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    while True:
+        gradcam_method_name = input(
+            f"Please select a GradCAM method (options: {XAI_GRADCAM_METHODS}, default to ScoreCAM): "
+        ) or "ScoreCAM"
+        if gradcam_method_name not in XAI_GRADCAM_METHODS:
+            print(f"Invalid GradCAM method. Please select again.")
+        else:
+            break
+    poll_interval_s = float(input("Enter the poll interval in seconds (default to 1): ") or 1)
+
+    data = {**data, "ue_id": UE_ID, "gradcam_method_name": gradcam_method_name}
+    response = requests.post(f"{SERVER_URL}/xai_model/jobs", files=files, data=data)
+    if response.status_code != 202:
+        print(f"Error: {response.status_code}, {response.text}")
+        return
+    job = response.json()
+    print(f"Submitted job {job['job_id']} ({job['status']}).")
+
+    start_time = time.perf_counter()
+    while job["status"] in ["queued", "running"]:
+        time.sleep(poll_interval_s)
+        response = send_get_request(f"{SERVER_URL}/xai_model/jobs/{job['job_id']}")
+        if response is None:
+            return
+        job = response[0]
+        print(f"[{time.perf_counter() - start_time:.1f} s] job {job['job_id']}: {job['status']}")
+
+    if job["status"] != "succeeded":
+        print(f"The job finished with status '{job['status']}': {job.get('error')}")
+        return
+    response = send_get_request(f"{SERVER_URL}/xai_model/jobs/{job['job_id']}/result")
+    if response is None:
+        return
+    result = response[0]
+    print("Model Results:", json.dumps(result.get("model_results"), indent=4))
+    print("XAI Results Method:", result["xai_results"].get("xai_method"))
+    image = Image.open(BytesIO(base64.b64decode(result["xai_results"]["image"])))
+    image.save("xai_output.png")
+    print("XAI image saved to xai_output.png")
+
+    metrics = send_get_request(f"{SERVER_URL}/xai_model/jobs/metrics")
+    if metrics is not None:
+        print("Job queue metrics:", json.dumps(metrics[0], indent=4))
+
+
+def option_benchmark_xai_multi_method():
+    """Compare one XAI request for several gradient-based methods against one request per method."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    num_requests = int(input("Enter the number of repetitions (default to 5): ") or 5)
+    gradcam_method_names = [
+        "GradCAM",
+        "HiResCAM",
+        "XGradCAM",
+        "GradCAMPlusPlus",
+        "LayerCAM",
+        "EigenGradCAM",
+    ]
+    data = {**data, "ue_id": UE_ID}
+
+    # warm-up requests, so all the CAM engines exist when measuring
+    send_post_request(
+        f"{SERVER_URL}/xai_model/run",
+        {**data, "gradcam_method_names": gradcam_method_names},
+        files,
+    )
+    start_time = time.perf_counter()
+    for _ in range(num_requests):
+        for gradcam_method_name in gradcam_method_names:
+            send_post_request(
+                f"{SERVER_URL}/xai_model/run",
+                {**data, "gradcam_method_name": gradcam_method_name},
+                files,
+            )
+    separate_ms = (time.perf_counter() - start_time) / num_requests * 1000
+
+    start_time = time.perf_counter()
+    for _ in range(num_requests):
+        send_post_request(
+            f"{SERVER_URL}/xai_model/run",
+            {**data, "gradcam_method_names": gradcam_method_names},
+            files,
+        )
+    shared_ms = (time.perf_counter() - start_time) / num_requests * 1000
+
+    print(f"\n--------- XAI MULTI-METHOD ({len(gradcam_method_names)} methods) ---------\n")
+    print(f"{'separate requests (ms)':>24} {'single request (ms)':>22} {'speed-up':>10}")
+    print(f"{separate_ms:>24.2f} {shared_ms:>22.2f} {separate_ms / shared_ms:>9.2f}x")
+
+
+def option_run_xai_heatmap():
+    """Request the raw XAI heatmap, overlay it on the client and compare the response sizes."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    gradcam_method_name = input("Please select a GradCAM method (default to GradCAM): ") or "GradCAM"
+    data = {**data, "ue_id": UE_ID, "gradcam_method_name": gradcam_method_name}
+
+    response_sizes = {}
+    for output_format in ["image", "heatmap"]:
+        start_time = time.perf_counter()
+        response = requests.post(
+            f"{SERVER_URL}/xai_model/run",
+            files=files,
+            data={**data, "output_format": output_format},
+        )
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        if response.status_code != 200:
+            print(f"Error: {response.status_code}, {response.text}")
+            return
+        response_sizes[output_format] = (len(response.content), latency_ms)
+        xai_results = response.json()["xai_results"]
+
+    print("\n--------- XAI RESPONSE SIZE ---------\n")
+    print(f"{'output format':<14} {'size (bytes)':>14} {'latency (ms)':>14}")
+    for output_format, (size, latency_ms) in response_sizes.items():
+        print(f"{output_format:<14} {size:>14} {latency_ms:>14.2f}")
+
+    # overlay the first heatmap of the batch on the input image
+    heatmap = xai_results["heatmap"]
+    assert heatmap["dtype"] == "uint8", "Only uint8 heatmaps are displayed."
+    height, width = heatmap["shape"][-2:]
+    heatmap_image = Image.frombytes(
+        "L", (width, height), base64.b64decode(heatmap["data"])[: width * height]
+    )
+    input_image = Image.open(BytesIO(files["file"])).convert("RGB")
+    heatmap_image = heatmap_image.resize(input_image.size, Image.BILINEAR)
+    print("Target IDs:", xai_results["target_ids"])
+    plt.imshow(input_image)
+    plt.imshow(heatmap_image, cmap="jet", alpha=0.5)
+    plt.axis("off")
+    plt.show()
+
+
+def decode_heatmap_values(heatmap):
+    """Decode a uint8 heatmap of the XAI response into a flat list of values in [0, 1]."""
+    assert heatmap["dtype"] == "uint8", "Only uint8 heatmaps are decoded."
+    return [value / 255 for value in base64.b64decode(heatmap["data"])]
+
+
+def heatmap_correlation(reference_values, values):
+    """Pearson correlation between two heatmaps of the same shape."""
+    count = len(reference_values)
+    reference_mean = sum(reference_values) / count
+    mean = sum(values) / count
+    covariance = sum(
+        (a - reference_mean) * (b - mean) for a, b in zip(reference_values, values)
+    )
+    reference_norm = sum((a - reference_mean) ** 2 for a in reference_values) ** 0.5
+    norm = sum((b - mean) ** 2 for b in values) ** 0.5
+    return covariance / (reference_norm * norm) if reference_norm and norm else 0.0
+
+
+def option_benchmark_xai_perturbation_settings():
+    """Benchmark the accuracy/latency trade-off of the AblationCAM and ScoreCAM cost settings."""
+    image_file_paths = input(
+        "Please input the image file paths (comma-separated): "
+    ).split(",")
+    images = []
+    for image_file_path in image_file_paths:
+        with open(image_file_path.strip(), "rb") as image_file:
+            images.append(image_file.read())
+    # (channel_ratio, top_k_channels), the first setting perturbs all channels and is the reference
+    settings = [(1.0, 0), (0.5, 0), (0.25, 0), (0.1, 0), (1.0, 64), (1.0, 32), (1.0, 16)]
+    batch_size = int(input("Enter the perturbation batch size (default to the service's): ") or 0)
+
+    for gradcam_method_name in ["AblationCAM", "ScoreCAM"]:
+        if gradcam_method_name not in XAI_GRADCAM_METHODS:
+            continue
+        rows = []
+        reference_heatmaps = []
+        for channel_ratio, top_k_channels in settings:
+            latencies_ms, correlations = [], []
+            for image_index, image in enumerate(images):
+                data = {
+                    "ue_id": UE_ID,
+                    "gradcam_method_name": gradcam_method_name,
+                    "output_format": "heatmap",
+                    "channel_ratio": channel_ratio,
+                    "top_k_channels": top_k_channels,
+                }
+                if batch_size:
+                    data["perturbation_batch_size"] = batch_size
+                start_time = time.perf_counter()
+                response = send_post_request(
+                    f"{SERVER_URL}/xai_model/run", data, {"file": image}
+                )
+                latencies_ms.append((time.perf_counter() - start_time) * 1000)
+                if response is None:
+                    return
+                values = decode_heatmap_values(response[0]["xai_results"]["heatmap"])
+                if len(reference_heatmaps) < len(images):
+                    reference_heatmaps.append(values)
+                correlations.append(heatmap_correlation(reference_heatmaps[image_index], values))
+            rows.append(
+                (
+                    channel_ratio,
+                    top_k_channels,
+                    sum(latencies_ms) / len(latencies_ms),
+                    sum(correlations) / len(correlations),
+                )
+            )
+
+        print(f"\n--------- {gradcam_method_name} COST SETTINGS ({len(images)} images) ---------\n")
+        print(f"{'channel ratio':>14} {'top-k':>7} {'latency (ms)':>14} {'correlation':>12}")
+        for channel_ratio, top_k_channels, latency_ms, correlation in rows:
+            print(
+                f"{channel_ratio:>14.2f} {top_k_channels or '-':>7} {latency_ms:>14.2f} {correlation:>12.3f}"
+            )
+
+
+def option_benchmark_xai_cache():
+    """Compare the latency of a cold XAI request with the cached repetitions and show the cache metrics."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    gradcam_method_name = input("Please select a GradCAM method (default to GradCAM): ") or "GradCAM"
+    num_requests = int(input("Enter the number of repeated requests (default to 10): ") or 10)
+    data = {**data, "ue_id": UE_ID, "gradcam_method_name": gradcam_method_name}
+
+    start_time = time.perf_counter()
+    send_post_request(f"{SERVER_URL}/xai_model/run", {**data, "use_cache": False}, files)
+    uncached_ms = (time.perf_counter() - start_time) * 1000
+
+    latencies_ms = []
+    for _ in range(num_requests):
+        start_time = time.perf_counter()
+        send_post_request(f"{SERVER_URL}/xai_model/run", data, files)
+        latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+    print("\n--------- XAI RESULT CACHE ---------\n")
+    print(f"Uncached request: {uncached_ms:.2f} ms")
+    print(f"First cacheable request: {latencies_ms[0]:.2f} ms")
+    if len(latencies_ms) > 1:
+        print(f"Repeated requests: {sum(latencies_ms[1:]) / len(latencies_ms[1:]):.2f} ms on average")
+    metrics = send_get_request(f"{SERVER_URL}/xai_model/cache")
+    if metrics is not None:
+        print("Cache metrics:", json.dumps(metrics[0], indent=4))
+
+
+def option_run_xai_auto():
+    """Let the service pick the XAI method within a latency budget and compare the expected and measured latency."""
+    data = prepare_ai_service_request_data()
+    files = prepare_ai_service_request_files()
+    latency_budget_ms = input("Enter the latency budget in ms (default to the service setting): ")
+    data = {**data, "ue_id": UE_ID, "gradcam_method_name": "auto", "use_cache": False}
+    if latency_budget_ms:
+        data["latency_budget_ms"] = float(latency_budget_ms)
+
+    start_time = time.perf_counter()
+    response = send_post_request(f"{SERVER_URL}/xai_model/run", data, files)
+    latency_ms = (time.perf_counter() - start_time) * 1000
+    if response is None:
+        return
+
+    method_selection = response[0]["xai_results"]["method_selection"]
+    print("\n--------- XAI METHOD SELECTION ---------\n")
+    print(json.dumps(method_selection, indent=4))
+    print(f"Measured latency: {latency_ms:.2f} ms")
+
+
+def option_benchmark_image_ingest():
+    """Compare the server processing time of the sample image and of a 4K JPEG of it on the model and XAI paths."""
+    data = {**prepare_ai_service_request_data(), "ue_id": UE_ID}
+    files = prepare_ai_service_request_files()
+    num_requests = int(input("Enter the number of requests per input (default to 5): ") or 5)
+
+    image_4k = BytesIO()
+    Image.open(BytesIO(files["file"])).convert("RGB").resize((3840, 2160), Image.BICUBIC).save(
+        image_4k, "JPEG", quality=90
+    )
+    inputs = {"sample image": files["file"], "4K JPEG": image_4k.getvalue()}
+    endpoints = {
+        "/model/run": data,
+        "/xai_model/run": {**data, "gradcam_method_name": "GradCAM", "use_cache": False},
+    }
+
+    print("\n--------- IMAGE INGEST BENCHMARK ---------\n")
+    print(f"{'endpoint':<16} {'input':<14} {'size (bytes)':>14} {'process time (s)':>18}")
+    for endpoint, endpoint_data in endpoints.items():
+        for input_name, image_bytes in inputs.items():
+            process_times = []
+            for _ in range(num_requests):
+                response = send_post_request(
+                    f"{SERVER_URL}{endpoint}", endpoint_data, {"file": image_bytes}
+                )
+                if response is None:
+                    return
+                process_times.append(float(response[1]))
+            print(
+                f"{endpoint:<16} {input_name:<14} {len(image_bytes):>14} "
+                f"{sum(process_times) / len(process_times):>18.4f}"
+            )
+
+
 OPTIONS = [
     {
         "label": "Get help information",
@@ -541,6 +872,38 @@ OPTIONS = [
         "label": "Profile AI service with XAI (only image-classification models)",
         "action": option_profile_run_with_xai,
     },
+    {
+        "label": "Benchmark XAI CAM engine reuse",
+        "action": option_benchmark_xai_engine_reuse,
+    },
+    {
+        "label": "Run XAI as an asynchronous job (only image-classification models)",
+        "action": option_run_xai_job,
+    },
+    {
+        "label": "Benchmark XAI multi-method requests",
+        "action": option_benchmark_xai_multi_method,
+    },
+    {
+        "label": "Run XAI with raw heatmap output",
+        "action": option_run_xai_heatmap,
+    },
+    {
+        "label": "Benchmark AblationCAM/ScoreCAM cost settings",
+        "action": option_benchmark_xai_perturbation_settings,
+    },
+    {
+        "label": "Benchmark XAI result cache",
+        "action": option_benchmark_xai_cache,
+    },
+    {
+        "label": "Run XAI with automatic method selection within a latency budget",
+        "action": option_run_xai_auto,
+    },
+    {
+        "label": "Benchmark image ingest on 4K inputs",
+        "action": option_benchmark_image_ingest,
+    },
 ]
 
 
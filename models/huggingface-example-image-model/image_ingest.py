@@ -0,0 +1,150 @@
+import os
+from io import BytesIO
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# the reduced JPEG decoding keeps at least this multiple of the resize target on the shortest
+# edge, so the final resize still has enough pixels to antialias
+IMAGE_DECODE_OVERSAMPLING = float(os.getenv("IMAGE_DECODE_OVERSAMPLING", "2"))
+
+
+def get_size_value(size, key: str) -> Optional[int]:
+    """Read a size entry of an image processor, a dict for the slow processors and a SizeDict for the fast ones."""
+    if size is None:
+        return None
+    if isinstance(size, dict):
+        return size.get(key)
+    return getattr(size, key, None)
+
+
+def get_pil_resample(resample) -> Image.Resampling:
+    """PIL filter of an image processor, an int enum for the slow processors and a torchvision mode for the fast ones."""
+    if resample is None:
+        return Image.Resampling.BILINEAR
+    if isinstance(resample, int):
+        return Image.Resampling(int(resample))
+    return Image.Resampling[str(getattr(resample, "value", resample)).upper()]
+
+
+class ImageIngest:
+    """
+    Decode an uploaded image once and prepare both the model input and the overlay image from it.
+
+    The geometry and the normalization are read from the Hugging Face image processor of the
+    model: resize (shortest edge or height/width, with the ConvNeXt `crop_pct` scheme),
+    center crop, rescale, normalize and channel flip. The resize and the crop are done in a
+    single PIL resampling step straight to the model input size, large JPEGs are decoded at a
+    reduced scale by libjpeg (`Image.draft`), and the pixels stay uint8 until the normalization.
+    The same uint8 buffer is returned for the CAM overlay, so it matches the model input exactly.
+    """
+
+    def __init__(self, processor, device: torch.device):
+        self.device = device
+        self.resample = get_pil_resample(getattr(processor, "resample", None))
+
+        size = processor.size
+        self.shortest_edge = get_size_value(size, "shortest_edge")
+        self.height = get_size_value(size, "height")
+        self.width = get_size_value(size, "width")
+        self.crop_pct = getattr(processor, "crop_pct", None)
+        self.crop_size = None
+        if getattr(processor, "do_center_crop", False) and getattr(processor, "crop_size", None):
+            self.crop_size = (
+                get_size_value(processor.crop_size, "height"),
+                get_size_value(processor.crop_size, "width"),
+            )
+
+        scale = getattr(processor, "rescale_factor", 1 / 255)
+        if not getattr(processor, "do_rescale", True):
+            scale = 1.0
+        if getattr(processor, "do_normalize", False):
+            mean = torch.tensor(processor.image_mean, dtype=torch.float32)
+            std = torch.tensor(processor.image_std, dtype=torch.float32)
+        else:
+            mean, std = torch.zeros(3), torch.ones(3)
+        # (pixel * scale - mean) / std folded into one multiply-add per channel
+        self._multiplier = (scale / std).view(3, 1, 1).to(device)
+        self._offset = (-mean / std).view(3, 1, 1).to(device)
+        self.flip_channel_order = getattr(processor, "do_flip_channel_order", False)
+
+    def get_geometry(self, image_size: Tuple[int, int]) -> tuple:
+        """
+        Geometry of the preprocessing of an image of `(width, height)`: the size it is resized to,
+        the model input size and the crop box in resized coordinates, all in (width, height) order.
+        """
+        width, height = image_size
+        if self.shortest_edge is not None:
+            shortest_edge = self.shortest_edge
+            if self.crop_pct is not None and shortest_edge < 384:
+                # ConvNeXt: resize the shortest edge to shortest_edge / crop_pct, then center crop
+                resize_edge = int(shortest_edge / self.crop_pct)
+                crop = (shortest_edge, shortest_edge)
+            elif self.crop_pct is not None:
+                # ConvNeXt: warp to a square without cropping
+                square = (shortest_edge, shortest_edge)
+                return square, square, (0, 0, shortest_edge, shortest_edge)
+            else:
+                resize_edge = shortest_edge
+                crop = None
+            if width <= height:
+                resized = (resize_edge, int(resize_edge * height / width))
+            else:
+                resized = (int(resize_edge * width / height), resize_edge)
+        else:
+            resized = (self.width, self.height)
+            crop = None
+
+        if self.crop_size is not None:
+            crop = (self.crop_size[1], self.crop_size[0])
+        if crop is None:
+            crop = resized
+        left = (resized[0] - crop[0]) // 2
+        top = (resized[1] - crop[1]) // 2
+        return resized, crop, (left, top, left + crop[0], top + crop[1])
+
+    def decode(self, image_bytes: bytes) -> Image.Image:
+        """Decode the image as RGB, at a reduced scale if it is a JPEG much larger than the model input."""
+        image = Image.open(BytesIO(image_bytes))
+        if image.format == "JPEG":
+            resized = self.get_geometry(image.size)[0]
+            # draft() picks the largest 1/2, 1/4 or 1/8 scale that keeps the image above the requested size
+            image.draft(
+                "RGB",
+                (
+                    int(min(resized) * IMAGE_DECODE_OVERSAMPLING),
+                    int(min(resized) * IMAGE_DECODE_OVERSAMPLING),
+                ),
+            )
+        return image.convert("RGB")
+
+    def resize(self, image: Image.Image) -> np.ndarray:
+        """Resize and crop the image to the model input size in one resampling step, as uint8 (height, width, 3)."""
+        resized, crop, (left, top, right, bottom) = self.get_geometry(image.size)
+        scale_x = image.width / resized[0]
+        scale_y = image.height / resized[1]
+        return np.array(
+            image.resize(
+                crop,
+                self.resample,
+                box=(left * scale_x, top * scale_y, right * scale_x, bottom * scale_y),
+            )
+        )
+
+    def normalize(self, pixels: np.ndarray) -> torch.Tensor:
+        """Normalize uint8 (height, width, 3) pixels to the (1, 3, height, width) model input."""
+        pixel_values = torch.from_numpy(pixels).to(self.device).permute(2, 0, 1).float()
+        pixel_values = pixel_values * self._multiplier + self._offset
+        if self.flip_channel_order:
+            pixel_values = pixel_values.flip(0)
+        return pixel_values.unsqueeze(0)
+
+    def __call__(self, image_bytes: bytes) -> Tuple[np.ndarray, torch.Tensor]:
+        """Decode, resize and normalize an uploaded image, returns `(pixels, pixel_values)`."""
+        pixels = self.resize(self.decode(image_bytes))
+        return pixels, self.normalize(pixels)
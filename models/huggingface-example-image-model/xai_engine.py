@@ -0,0 +1,473 @@
+import base64
+import copy
+import threading
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+from pytorch_grad_cam.ablation_layer import AblationLayer
+from pytorch_grad_cam.base_cam import BaseCAM
+from pytorch_grad_cam.utils.image import scale_cam_image
+from pytorch_grad_cam.utils.model_targets import ClassifierOutputTarget
+
+# methods whose CAM only depends on the activations and gradients of the target layers,
+# so several of them can be computed from a single forward and backward pass
+SHARED_PASS_METHODS = [
+    "GradCAM",
+    "HiResCAM",
+    "XGradCAM",
+    "GradCAMPlusPlus",
+    "LayerCAM",
+    "EigenGradCAM",
+]
+
+# methods that run one forward pass per perturbed feature map channel, with the
+# pytorch-grad-cam default batch sizes
+PERTURBATION_METHODS = {"AblationCAM": 32, "ScoreCAM": 16}
+
+# "image": CAM overlays composited on the input image, as a PNG
+# "heatmap": raw CAMs at the resolution of the target layer's feature map, see `encode_heatmaps`
+XAI_OUTPUT_FORMATS = ["image", "heatmap"]
+HEATMAP_DTYPES = ["uint8", "float16"]
+
+
+def encode_heatmaps(grayscale_cams: np.ndarray, dtype: str = "uint8") -> dict:
+    """
+    Pack a batch of CAMs (values in [0, 1]) into a little-endian base64 string with its dtype and shape.
+    uint8 heatmaps are scaled to [0, 255].
+    """
+    assert dtype in HEATMAP_DTYPES, f"Heatmap dtype '{dtype}' is not supported."
+    if dtype == "uint8":
+        array = np.round(np.clip(grayscale_cams, 0, 1) * 255).astype(np.uint8)
+    else:
+        array = np.asarray(grayscale_cams).astype("<f2")
+    array = np.ascontiguousarray(array)
+    return {
+        "dtype": dtype,
+        "shape": list(array.shape),
+        "data": base64.b64encode(array.tobytes()).decode("utf-8"),
+    }
+
+
+def keep_native_resolution(input_tensor: torch.Tensor) -> None:
+    """Replaces `BaseCAM.get_target_width_height`, so the CAMs are normalized but not upsampled."""
+    return None
+
+
+def select_channels(activations: np.ndarray, channel_ratio: float = 1.0, top_k: int = 0) -> np.ndarray:
+    """
+    Select the feature map channels to perturb for one image, `activations` has the shape (channels, ...).
+    `channel_ratio` keeps an evenly strided subset of the channels, then `top_k` (if > 0) keeps
+    the channels of that subset with the highest activation energy (sum of squares).
+    """
+    assert 0 < channel_ratio <= 1, "The channel ratio must be in (0, 1]."
+    assert top_k >= 0, "The number of top-k channels must not be negative."
+    number_of_channels = activations.shape[0]
+    selected = np.arange(number_of_channels)
+    if channel_ratio < 1:
+        count = max(1, int(round(number_of_channels * channel_ratio)))
+        selected = np.unique(np.linspace(0, number_of_channels - 1, count).round().astype(np.int64))
+    if 0 < top_k < len(selected):
+        energy = np.square(activations[selected].reshape(len(selected), -1)).sum(axis=1)
+        selected = np.sort(selected[np.argsort(-energy, kind="stable")[:top_k]])
+    return selected
+
+
+class SelectedChannelsAblationLayer(AblationLayer):
+    """Ablation layer of AblationCAM that only ablates the channels picked by `select_channels`."""
+
+    def __init__(self):
+        super(SelectedChannelsAblationLayer, self).__init__()
+        self.channel_ratio = 1.0
+        self.top_k = 0
+
+    def activations_to_be_ablated(self, activations, ratio_channels_to_ablate=1.0):
+        if isinstance(activations, torch.Tensor):
+            activations = activations.cpu().numpy()
+        self.indices = np.int32(select_channels(activations, self.channel_ratio, self.top_k))
+        return self.indices
+
+
+class CAMEngine:
+    """
+    A pytorch-grad-cam method instance bound to the model and its target layers,
+    created once and reused across XAI requests.
+
+    pytorch-grad-cam registers its forward hooks on the target layers when the method
+    is constructed. The engine keeps these hooks registered for its whole lifetime but
+    gates them with a thread-local flag, so they return immediately for any forward pass
+    that is not part of an XAI call (e.g. plain `/model/run` traffic).
+    A lock serializes the calls, because the method instance stores per-call state.
+    `model_lock`, if given, is also held during the calls, for a model shared by several engines.
+    """
+
+    def __init__(
+        self,
+        gradcam_method: Callable,
+        model: torch.nn.Module,
+        target_layers: List[torch.nn.Module],
+        single_use: bool = False,
+        model_lock: Optional[threading.Lock] = None,
+    ):
+        self.gradcam_method_name = gradcam_method.__name__
+        self.target_layers = target_layers
+        self.single_use = single_use
+        self.calls = 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._model_lock = model_lock if model_lock is not None else nullcontext()
+        self.cam = gradcam_method(model=model, target_layers=target_layers)
+        self._gate_hooks()
+
+        # settings of the last call of a perturbation-based method
+        self.perturbation: Optional[dict] = None
+        if self.gradcam_method_name == "AblationCAM":
+            self.cam.ablation_layer = SelectedChannelsAblationLayer()
+        elif self.gradcam_method_name == "ScoreCAM":
+            self._score_cam_weights = self.cam.get_cam_weights
+            self.cam.get_cam_weights = self._score_cam_weights_of_selected_channels
+
+    def _gated(self, hook: Callable) -> Callable:
+        def gated_hook(module, input, output):
+            if getattr(self._local, "active", False):
+                return hook(module, input, output)
+
+        return gated_hook
+
+    def _gate_hooks(self):
+        """Replace the hooks registered by pytorch-grad-cam with gated ones, in the same order."""
+        activations_and_grads = self.cam.activations_and_grads
+        activations_and_grads.release()
+        activations_and_grads.handles = [
+            target_layer.register_forward_hook(self._gated(hook))
+            for target_layer in self.target_layers
+            for hook in (
+                activations_and_grads.save_activation,
+                activations_and_grads.save_gradient,
+            )
+        ]
+
+    def _score_cam_weights_of_selected_channels(
+        self, input_tensor, target_layer, targets, activations, grads
+    ) -> np.ndarray:
+        """ScoreCAM weights computed on the selected channels only, the other channels get a zero weight."""
+        channel_ratio, top_k = self.perturbation["channel_ratio"], self.perturbation["top_k"]
+        if channel_ratio == 1 and top_k == 0:
+            return self._score_cam_weights(input_tensor, target_layer, targets, activations, grads)
+
+        weights = np.zeros(activations.shape[:2], dtype=np.float32)
+        for index in range(activations.shape[0]):
+            selected = select_channels(activations[index], channel_ratio, top_k)
+            weights[index, selected] = self._score_cam_weights(
+                input_tensor[index : index + 1],
+                target_layer,
+                targets[index : index + 1],
+                activations[index : index + 1, selected],
+                grads,
+            )[0]
+        return weights
+
+    def _apply_perturbation_settings(self, perturbation: Optional[dict]):
+        """Set the batch size and channel selection of a perturbation-based method for the next call."""
+        if self.gradcam_method_name not in PERTURBATION_METHODS:
+            self.perturbation = None
+            return
+        self.perturbation = {
+            "batch_size": PERTURBATION_METHODS[self.gradcam_method_name],
+            "channel_ratio": 1.0,
+            "top_k": 0,
+            **(perturbation or {}),
+        }
+        assert self.perturbation["batch_size"] >= 1, "The perturbation batch size must be at least 1."
+        self.cam.batch_size = self.perturbation["batch_size"]
+        if self.gradcam_method_name == "AblationCAM":
+            self.cam.ablation_layer.channel_ratio = self.perturbation["channel_ratio"]
+            self.cam.ablation_layer.top_k = self.perturbation["top_k"]
+
+    def __call__(
+        self,
+        input_tensor: torch.Tensor,
+        targets: Optional[List[Callable]] = None,
+        reshape_transform: Optional[Callable] = None,
+        native_resolution: bool = False,
+        perturbation: Optional[dict] = None,
+    ):
+        """
+        Run the CAM method on a batch of images.
+        Returns `(grayscale_cams, model_outputs)`. The CAMs are upsampled to the input size,
+        unless `native_resolution` is set.
+        `perturbation` sets the `batch_size`, `channel_ratio` and `top_k` of AblationCAM and ScoreCAM,
+        see `select_channels`. It is ignored by the other methods.
+        """
+        with self._lock, self._model_lock:
+            self._apply_perturbation_settings(perturbation)
+            # the reshape transform can depend on the input size, so it is set per call
+            self.cam.reshape_transform = reshape_transform
+            self.cam.activations_and_grads.reshape_transform = reshape_transform
+            if native_resolution:
+                self.cam.get_target_width_height = keep_native_resolution
+            self._local.active = True
+            try:
+                grayscale_cams = self.cam(input_tensor=input_tensor, targets=targets)
+                return grayscale_cams, self.cam.outputs
+            finally:
+                self._local.active = False
+                self.cam.__dict__.pop("get_target_width_height", None)
+                # drop the references to this call's tensors
+                self.cam.outputs = None
+                self.cam.activations_and_grads.activations = []
+                self.cam.activations_and_grads.gradients = []
+                self.calls += 1
+                if self.single_use:
+                    self.release()
+
+    def capture(
+        self,
+        input_tensor: torch.Tensor,
+        targets: Optional[List[Callable]] = None,
+        reshape_transform: Optional[Callable] = None,
+    ):
+        """
+        Run one forward and backward pass and capture the activations and gradients
+        of the target layers, without computing a CAM.
+        Returns `(activations, gradients, targets, model_outputs)`, one numpy array per target layer.
+        If `targets` is None, the highest scoring category of every image is used.
+        """
+        with self._lock:
+            self.cam.activations_and_grads.reshape_transform = reshape_transform
+            self._local.active = True
+            try:
+                outputs = self.cam.activations_and_grads(input_tensor.to(self.cam.device))
+                if targets is None:
+                    target_categories = np.argmax(outputs.cpu().data.numpy(), axis=-1)
+                    targets = [ClassifierOutputTarget(category) for category in target_categories]
+                self.cam.model.zero_grad()
+                loss = sum([target(output) for target, output in zip(targets, outputs)])
+                loss.backward()
+                activations = [
+                    activation.cpu().data.numpy()
+                    for activation in self.cam.activations_and_grads.activations
+                ]
+                gradients = [
+                    gradient.cpu().data.numpy()
+                    for gradient in self.cam.activations_and_grads.gradients
+                ]
+                return activations, gradients, targets, outputs
+            finally:
+                self._local.active = False
+                self.cam.activations_and_grads.activations = []
+                self.cam.activations_and_grads.gradients = []
+                self.calls += 1
+                if self.single_use:
+                    self.release()
+
+    def compute_from_activations(
+        self,
+        input_tensor: torch.Tensor,
+        targets: List[Callable],
+        activations: List[np.ndarray],
+        gradients: List[np.ndarray],
+        native_resolution: bool = False,
+    ) -> np.ndarray:
+        """
+        Compute the CAM of this method from captured activations and gradients,
+        the same way pytorch-grad-cam does after its own forward and backward pass.
+        """
+        # the class method, a concurrent `__call__` may have swapped in `keep_native_resolution`
+        target_size = (
+            None if native_resolution else BaseCAM.get_target_width_height(self.cam, input_tensor)
+        )
+        cam_per_target_layer = []
+        for target_layer, layer_activations, layer_gradients in zip(
+            self.target_layers, activations, gradients
+        ):
+            cam = self.cam.get_cam_image(
+                input_tensor,
+                target_layer,
+                targets,
+                layer_activations,
+                layer_gradients,
+                eigen_smooth=False,
+            )
+            cam = np.maximum(cam, 0)
+            cam_per_target_layer.append(scale_cam_image(cam, target_size)[:, None, :])
+        return self.cam.aggregate_multi_layers(cam_per_target_layer)
+
+    def release(self):
+        """Remove the hooks from the target layers, the engine must not be used afterwards."""
+        self.cam.activations_and_grads.release()
+        self.cam.activations_and_grads.handles = []
+
+
+class CAMEngineRegistry:
+    """
+    Create the CAM engines lazily, one per (method, target layers), and keep them alive.
+
+    The perturbation-based methods run on a deep copy of the model, created on their first use.
+    AblationCAM swaps an ablation layer into the model for the whole call, which would corrupt
+    any concurrent inference or gradient CAM on the served model. Their calls on the copy are
+    serialized by one lock. The copy doubles the memory of the model weights.
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        target_layers: List[torch.nn.Module],
+        gradcam_methods: Dict[str, Callable],
+    ):
+        self.model = model
+        self.target_layers = target_layers
+        self.gradcam_methods = gradcam_methods
+        self.created_engines = 0
+        # number of `run_methods` calls being computed, a measure of the load of the service
+        self.in_flight = 0
+
+        self._engines: Dict[tuple, CAMEngine] = {}
+        self._lock = threading.Lock()
+
+        self._perturbation_model: Optional[tuple] = None
+        self._perturbation_model_lock = threading.Lock()
+
+    def _get_perturbation_model(self) -> tuple:
+        """The copy of the model for the perturbation-based methods, with its target layers."""
+        with self._lock:
+            if self._perturbation_model is None:
+                layer_names = {id(module): name for name, module in self.model.named_modules()}
+                assert all(
+                    id(layer) in layer_names for layer in self.target_layers
+                ), "The target layers must be modules of the model."
+                model = copy.deepcopy(self.model)
+                target_layers = [
+                    model.get_submodule(layer_names[id(layer)]) for layer in self.target_layers
+                ]
+                self._perturbation_model = (model, target_layers)
+            return self._perturbation_model
+
+    def get(self, gradcam_method_name: str, reuse: bool = True) -> CAMEngine:
+        """
+        Get the engine of a CAM method.
+        With `reuse=False` a single-use engine is created, which releases its hooks after one call.
+        """
+        assert (
+            gradcam_method_name in self.gradcam_methods
+        ), f"GradCAM method '{gradcam_method_name}' is not supported. "
+        gradcam_method = self.gradcam_methods[gradcam_method_name]
+        model, target_layers, model_lock = self.model, self.target_layers, None
+        if gradcam_method_name in PERTURBATION_METHODS:
+            (model, target_layers), model_lock = (
+                self._get_perturbation_model(),
+                self._perturbation_model_lock,
+            )
+        if not reuse:
+            self.created_engines += 1
+            return CAMEngine(
+                gradcam_method, model, target_layers, single_use=True, model_lock=model_lock
+            )
+
+        key = (gradcam_method_name, tuple(id(layer) for layer in self.target_layers))
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = CAMEngine(gradcam_method, model, target_layers, model_lock=model_lock)
+                self._engines[key] = engine
+                self.created_engines += 1
+            return engine
+
+    def run_methods(
+        self,
+        gradcam_method_names: List[str],
+        input_tensor: torch.Tensor,
+        targets: Optional[List[Callable]] = None,
+        reshape_transform: Optional[Callable] = None,
+        reuse: bool = True,
+        native_resolution: bool = False,
+        perturbation_settings: Optional[Dict[str, dict]] = None,
+    ):
+        """
+        Run several CAM methods on the same batch of images.
+        The methods in `SHARED_PASS_METHODS` are computed from one captured forward and
+        backward pass, the other methods run on their own engine.
+        `perturbation_settings` maps a perturbation-based method to its settings.
+        Returns `({method name: grayscale_cams}, model_outputs)`.
+        """
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._run_methods(
+                gradcam_method_names,
+                input_tensor,
+                targets,
+                reshape_transform,
+                reuse,
+                native_resolution,
+                perturbation_settings or {},
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _run_methods(
+        self,
+        gradcam_method_names: List[str],
+        input_tensor: torch.Tensor,
+        targets: Optional[List[Callable]],
+        reshape_transform: Optional[Callable],
+        reuse: bool,
+        native_resolution: bool,
+        perturbation_settings: Dict[str, dict],
+    ):
+        gradcam_method_names = list(dict.fromkeys(gradcam_method_names))
+        engines = {
+            gradcam_method_name: self.get(gradcam_method_name, reuse=reuse)
+            for gradcam_method_name in gradcam_method_names
+        }
+        shared_pass_methods = [
+            gradcam_method_name
+            for gradcam_method_name in gradcam_method_names
+            if gradcam_method_name in SHARED_PASS_METHODS
+        ]
+        if len(shared_pass_methods) < 2:
+            shared_pass_methods = []
+
+        grayscale_cams, model_outputs = {}, None
+        if shared_pass_methods:
+            activations, gradients, shared_targets, model_outputs = engines[
+                shared_pass_methods[0]
+            ].capture(input_tensor, targets, reshape_transform)
+            for gradcam_method_name in shared_pass_methods:
+                engine = engines[gradcam_method_name]
+                grayscale_cams[gradcam_method_name] = engine.compute_from_activations(
+                    input_tensor, shared_targets, activations, gradients, native_resolution
+                )
+                if engine.single_use:
+                    engine.release()
+
+        for gradcam_method_name in gradcam_method_names:
+            if gradcam_method_name not in grayscale_cams:
+                grayscale_cams[gradcam_method_name], model_outputs = engines[
+                    gradcam_method_name
+                ](
+                    input_tensor,
+                    targets,
+                    reshape_transform,
+                    native_resolution,
+                    perturbation_settings.get(gradcam_method_name),
+                )
+
+        return {
+            gradcam_method_name: grayscale_cams[gradcam_method_name]
+            for gradcam_method_name in gradcam_method_names
+        }, model_outputs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "engines": {
+                    engine.gradcam_method_name: {"calls": engine.calls}
+                    for engine in self._engines.values()
+                },
+                "created_engines": self.created_engines,
+                "in_flight": self.in_flight,
+            }
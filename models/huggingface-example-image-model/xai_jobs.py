@@ -0,0 +1,284 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# number of XAI jobs computed in parallel
+XAI_JOB_WORKERS = int(os.getenv("XAI_JOB_WORKERS", "1"))
+# maximum number of jobs waiting for a worker, further submissions are rejected
+XAI_JOB_MAX_QUEUED = int(os.getenv("XAI_JOB_MAX_QUEUED", "16"))
+# seconds a finished job (and its result) is kept before it is discarded
+XAI_JOB_TTL_SECONDS = int(os.getenv("XAI_JOB_TTL_SECONDS", "3600"))
+# directory where finished jobs are persisted, persistence is disabled if empty
+XAI_JOB_STORE_DIR = os.getenv("XAI_JOB_STORE_DIR", "")
+# methods that are too slow to run on the event loop of the synchronous `/run` endpoint
+XAI_SLOW_METHODS = [
+    method.strip()
+    for method in os.getenv("XAI_SLOW_METHODS", "AblationCAM,ScoreCAM").split(",")
+    if method.strip()
+]
+
+JOB_STATUSES = ["queued", "running", "succeeded", "failed", "cancelled"]
+FINISHED_JOB_STATUSES = ["succeeded", "failed", "cancelled"]
+
+
+class XAIJobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is full."""
+
+
+class XAIJob:
+    """State of one asynchronous XAI run."""
+
+    def __init__(self, job_id: str, ue_id: str, xai_method: str, submitted_at: float):
+        self.job_id = job_id
+        self.ue_id = ue_id
+        self.xai_method = xai_method
+        self.status = "queued"
+        self.submitted_at = submitted_at
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        self.future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_JOB_STATUSES
+
+    def to_dict(self, include_result: bool = False) -> dict:
+        job_dict = {
+            "job_id": self.job_id,
+            "ue_id": self.ue_id,
+            "xai_method": self.xai_method,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+        }
+        if include_result:
+            job_dict["result"] = self.result
+        return job_dict
+
+    @classmethod
+    def from_dict(cls, job_dict: dict) -> "XAIJob":
+        job = cls(
+            job_dict["job_id"],
+            job_dict["ue_id"],
+            job_dict["xai_method"],
+            job_dict["submitted_at"],
+        )
+        job.status = job_dict["status"]
+        job.started_at = job_dict.get("started_at")
+        job.finished_at = job_dict.get("finished_at")
+        job.cancel_requested = job_dict.get("cancel_requested", False)
+        job.error = job_dict.get("error")
+        job.result = job_dict.get("result")
+        return job
+
+
+class XAIJobManager:
+    """
+    Run XAI computations on a bounded worker pool and keep their results until they expire.
+
+    Jobs are kept in memory. If `store_dir` is set, every finished job is also written
+    to `<store_dir>/<job_id>.json`, so results survive a service restart; jobs that were
+    still queued or running when the service stopped are reloaded as failed.
+    Expired jobs are purged lazily, whenever the store is accessed.
+    """
+
+    def __init__(
+        self,
+        workers: int = XAI_JOB_WORKERS,
+        max_queued: int = XAI_JOB_MAX_QUEUED,
+        ttl_seconds: int = XAI_JOB_TTL_SECONDS,
+        store_dir: str = XAI_JOB_STORE_DIR,
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl_seconds = ttl_seconds
+        self.store_dir = store_dir
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="xai-job"
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, XAIJob] = {}
+        self._submitted = 0
+        self._rejected = 0
+        self._total_queue_wait_s = 0.0
+        self._total_run_time_s = 0.0
+        self._started = 0
+        self._completed = 0
+
+        if self.store_dir:
+            self._load_jobs()
+
+    # -------------------------------------------
+    # Persistence helpers
+    # -------------------------------------------
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _save_job(self, job: XAIJob):
+        if not self.store_dir:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        job_path = self._job_path(job.job_id)
+        # write to a temporary file and swap it in, so a crash never leaves a half-written job
+        with open(job_path + ".tmp", "w") as file:
+            json.dump(job.to_dict(include_result=True), file)
+        os.replace(job_path + ".tmp", job_path)
+
+    def _delete_job_file(self, job_id: str):
+        if self.store_dir and os.path.exists(self._job_path(job_id)):
+            os.remove(self._job_path(job_id))
+
+    def _load_jobs(self):
+        if not os.path.isdir(self.store_dir):
+            return
+        for file_name in os.listdir(self.store_dir):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.store_dir, file_name), "r") as file:
+                    job = XAIJob.from_dict(json.load(file))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Skipping the unreadable job file {file_name}: {e}")
+                continue
+            if not job.finished:
+                job.status = "failed"
+                job.error = "The service was restarted before the job finished."
+                job.finished_at = time.time()
+                self._save_job(job)
+            self._jobs[job.job_id] = job
+        self._purge_expired()
+        print(f"Loaded {len(self._jobs)} XAI jobs from {self.store_dir}.")
+
+    def _purge_expired(self):
+        """Drop the finished jobs older than the TTL, the caller must hold the lock."""
+        now = time.time()
+        expired_job_ids = [
+            job.job_id
+            for job in self._jobs.values()
+            if job.finished and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired_job_ids:
+            del self._jobs[job_id]
+            self._delete_job_file(job_id)
+
+    # -------------------------------------------
+    # Worker
+    # -------------------------------------------
+    def _run_job(self, job: XAIJob, function: Callable, args: tuple, kwargs: dict):
+        with self._lock:
+            if job.status != "queued":
+                return
+            if job.cancel_requested:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self._save_job(job)
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            self._total_queue_wait_s += job.started_at - job.submitted_at
+            self._started += 1
+
+        result, error = None, None
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            print(f"XAI job {job.job_id} failed: {e}")
+            error = str(e)
+
+        with self._lock:
+            job.finished_at = time.time()
+            self._total_run_time_s += job.finished_at - job.started_at
+            self._completed += 1
+            if job.cancel_requested:
+                # a running CAM computation cannot be interrupted, its result is discarded instead
+                job.status = "cancelled"
+            elif error is not None:
+                job.status = "failed"
+                job.error = error
+            else:
+                job.status = "succeeded"
+                job.result = result
+            self._save_job(job)
+
+    # -------------------------------------------
+    # Public API
+    # -------------------------------------------
+    def submit(
+        self, function: Callable, ue_id: str, xai_method: str, *args, **kwargs
+    ) -> XAIJob:
+        """
+        Queue `function(*args, **kwargs)` as a job, its return value must be JSON serializable.
+        Raises `XAIJobQueueFull` if `max_queued` jobs are already waiting for a worker.
+        """
+        with self._lock:
+            self._purge_expired()
+            queued = sum(job.status == "queued" for job in self._jobs.values())
+            if queued >= self.max_queued:
+                self._rejected += 1
+                raise XAIJobQueueFull(
+                    f"The XAI job queue is full ({queued} jobs waiting), retry later."
+                )
+            job = XAIJob(uuid.uuid4().hex, ue_id, xai_method, time.time())
+            self._jobs[job.job_id] = job
+            self._submitted += 1
+            job.future = self._executor.submit(self._run_job, job, function, args, kwargs)
+            return job
+
+    def get(self, job_id: str) -> Optional[XAIJob]:
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[XAIJob]:
+        """
+        Cancel a job. A queued job is removed from the queue, a running job finishes
+        in the background but its result is discarded. Finished jobs are left unchanged.
+        """
+        with self._lock:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested = True
+            if job.status == "queued" and job.future.cancel():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self._save_job(job)
+            return job
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._purge_expired()
+            jobs_by_status = {status: 0 for status in JOB_STATUSES}
+            for job in self._jobs.values():
+                jobs_by_status[job.status] += 1
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": bool(self.store_dir),
+                "queue_depth": jobs_by_status["queued"],
+                "jobs": jobs_by_status,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "average_queue_wait_ms": (
+                    1000 * self._total_queue_wait_s / self._started if self._started else 0.0
+                ),
+                "average_run_time_ms": (
+                    1000 * self._total_run_time_s / self._completed if self._completed else 0.0
+                ),
+            }
@@ -0,0 +1,169 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import torch
+
+from ai_server_utils import NODE_ID
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# service data with the profiles of the nodes the service was profiled on
+SERVICE_DATA_JSON_PATH = os.getenv("SERVICE_DATA_JSON_PATH", "service_data.json")
+# latency targeted by the default channel ratio of AblationCAM and ScoreCAM
+XAI_PERTURBATION_TARGET_MS = float(os.getenv("XAI_PERTURBATION_TARGET_MS", "5000"))
+# service-level overrides of the perturbation settings, 0 derives the value from the node
+XAI_PERTURBATION_BATCH_SIZE = int(os.getenv("XAI_PERTURBATION_BATCH_SIZE", "0"))
+XAI_PERTURBATION_CHANNEL_RATIO = float(os.getenv("XAI_PERTURBATION_CHANNEL_RATIO", "0"))
+XAI_PERTURBATION_TOP_K = int(os.getenv("XAI_PERTURBATION_TOP_K", "0"))
+# latency budget of the "auto" method when the request does not set one
+XAI_AUTO_LATENCY_BUDGET_MS = float(os.getenv("XAI_AUTO_LATENCY_BUDGET_MS", "1000"))
+
+# larger batches do not speed up the forward passes on a CPU, they only use more memory
+CPU_PERTURBATION_BATCH_SIZE = 8
+GPU_PERTURBATION_BATCH_SIZE = 64
+# channel ratio of a CPU node on which the method was never profiled
+CPU_FALLBACK_CHANNEL_RATIO = 0.25
+
+# CAM methods from the most to the least informative, "auto" picks the first one that fits
+# the latency budget. The perturbation-based methods measure the effect of each channel on
+# the score directly, HiResCAM is faithful to the model's computation, GradCAM++ and LayerCAM
+# localize multiple and small objects better than GradCAM, and the Eigen/KPCA methods are not
+# class-discriminative. RandomCAM is a baseline and never chosen.
+XAI_METHOD_PREFERENCE = [
+    "ScoreCAM",
+    "AblationCAM",
+    "HiResCAM",
+    "GradCAMPlusPlus",
+    "LayerCAM",
+    "XGradCAM",
+    "GradCAM",
+    "EigenGradCAM",
+    "EigenCAM",
+    "KPCA_CAM",
+]
+
+
+def load_service_profiles(path: str = SERVICE_DATA_JSON_PATH) -> List[dict]:
+    """Profiles of all the nodes in the service data."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as file:
+        service_data = json.load(file)
+    return service_data.get("profiles", [])
+
+
+def load_node_profile(node_id: str = NODE_ID, path: str = SERVICE_DATA_JSON_PATH) -> Optional[dict]:
+    """Profile of the node in the service data, None if the node was not profiled."""
+    for profile in load_service_profiles(path):
+        if profile.get("node_id") == node_id:
+            return profile
+    return None
+
+
+def get_xai_method_costs(
+    node_id: str = NODE_ID, path: str = SERVICE_DATA_JSON_PATH
+) -> Tuple[Dict[str, float], str]:
+    """
+    Profiled execution time of each XAI method on the node, and where it comes from.
+    If the node was not profiled, the average over the other nodes is used ("other_nodes").
+    """
+    profiles = load_service_profiles(path)
+    for profile in profiles:
+        if profile.get("node_id") == node_id and profile.get("xai"):
+            return {
+                xai_profile["xai_method"]: xai_profile["execution_time_ms"]
+                for xai_profile in profile["xai"]
+            }, "node"
+
+    execution_times_ms: Dict[str, List[float]] = {}
+    for profile in profiles:
+        for xai_profile in profile.get("xai") or []:
+            execution_times_ms.setdefault(xai_profile["xai_method"], []).append(
+                xai_profile["execution_time_ms"]
+            )
+    if not execution_times_ms:
+        return {}, "none"
+    return {
+        xai_method: sum(times_ms) / len(times_ms)
+        for xai_method, times_ms in execution_times_ms.items()
+    }, "other_nodes"
+
+
+def select_xai_method(
+    latency_budget_ms: float,
+    method_costs_ms: Dict[str, float],
+    available_methods: List[str],
+    in_flight: int = 0,
+) -> dict:
+    """
+    Pick the most informative method (see `XAI_METHOD_PREFERENCE`) whose expected cost fits the budget.
+    The requests already in flight compete for the same device, so the profiled cost is
+    scaled by `1 + in_flight`. If no method fits, the cheapest one is chosen.
+    """
+    load_factor = 1 + in_flight
+    candidates = [
+        xai_method
+        for xai_method in XAI_METHOD_PREFERENCE
+        if xai_method in available_methods and xai_method in method_costs_ms
+    ]
+    assert candidates, "No profiled XAI method is available on this service, select a method explicitly."
+
+    chosen, within_budget = None, True
+    for xai_method in candidates:
+        if method_costs_ms[xai_method] * load_factor <= latency_budget_ms:
+            chosen = xai_method
+            break
+    if chosen is None:
+        chosen = min(candidates, key=lambda xai_method: method_costs_ms[xai_method])
+        within_budget = False
+
+    return {
+        "requested": "auto",
+        "chosen": chosen,
+        "latency_budget_ms": latency_budget_ms,
+        "base_cost_ms": method_costs_ms[chosen],
+        "expected_cost_ms": method_costs_ms[chosen] * load_factor,
+        "in_flight": in_flight,
+        "within_budget": within_budget,
+    }
+
+
+def get_xai_method_cost_ms(profile: Optional[dict], xai_method: str) -> Optional[float]:
+    """Profiled execution time of an XAI method, None if it was not profiled."""
+    for xai_profile in (profile or {}).get("xai", []):
+        if xai_profile.get("xai_method") == xai_method:
+            return xai_profile.get("execution_time_ms")
+    return None
+
+
+def get_default_perturbation_settings(
+    xai_method: str, profile: Optional[dict], device: torch.device
+) -> dict:
+    """
+    Service-level perturbation settings of AblationCAM or ScoreCAM on this node.
+    The batch size depends on the device. The channel ratio scales the profiled latency of
+    the method (which perturbs all channels) down to `XAI_PERTURBATION_TARGET_MS`, nodes
+    without a profile of the method keep all channels on a GPU and a fixed ratio on a CPU.
+    The environment overrides take precedence.
+    """
+    on_gpu = device.type != "cpu"
+    batch_size = XAI_PERTURBATION_BATCH_SIZE or (
+        GPU_PERTURBATION_BATCH_SIZE if on_gpu else CPU_PERTURBATION_BATCH_SIZE
+    )
+
+    profiled_ms = get_xai_method_cost_ms(profile, xai_method)
+    if XAI_PERTURBATION_CHANNEL_RATIO:
+        channel_ratio, source = XAI_PERTURBATION_CHANNEL_RATIO, "env"
+    elif profiled_ms:
+        channel_ratio, source = min(1.0, XAI_PERTURBATION_TARGET_MS / profiled_ms), "profile"
+    else:
+        channel_ratio, source = (1.0 if on_gpu else CPU_FALLBACK_CHANNEL_RATIO), "device"
+
+    return {
+        "batch_size": batch_size,
+        "channel_ratio": round(channel_ratio, 4),
+        "top_k": XAI_PERTURBATION_TOP_K,
+        "source": source,
+    }
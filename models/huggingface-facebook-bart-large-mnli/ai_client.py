@@ -90,6 +90,8 @@ class ProfileResultProcessor:
         self.self_cpu_time_total_us = 0
         self.device_time_total_us = 0
         self.self_device_time_total_us = 0
+        # model precision (fp32 or int8-dynamic)
+        self.precision = None
 
         # xai related
         self.gradcam_method_name = None
@@ -135,6 +137,8 @@ class ProfileResultProcessor:
             self.node_id = node_id
         if self.k8s_pod_name is None:
             self.k8s_pod_name = k8s_pod_name
+        if self.precision is None:
+            self.precision = profile_result.get("precision", "fp32")
 
         if self.gradcam_method_name is None:
             self.gradcam_method_name = gradcam_method_name
@@ -174,6 +178,7 @@ class ProfileResultProcessor:
         print(f"Device Name: {self.device_name}")
         print(f"Node ID: {self.node_id}")
         print(f"K8S_POD_NAME: {self.k8s_pod_name}")
+        print(f"Precision: {self.precision}")
 
         if self.gradcam_method_name:
             print(f"GradCAM Method Name: {self.gradcam_method_name}")
@@ -209,6 +214,7 @@ class ProfileResultProcessor:
         if not self.gradcam_method_name:
             complete_profile_data_to_save = {
                 "node_id": self.node_id,
+                "precision": self.precision,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -238,10 +244,13 @@ class ProfileResultProcessor:
                 },
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and precision
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("precision", "fp32") == self.precision
+                ):
                     profile["inference"] = complete_profile_data_to_save["inference"]
                     profile_found = True
                     break
@@ -256,6 +265,7 @@ class ProfileResultProcessor:
         else:
             complete_xai_profile_data_to_save = {
                 "node_id": self.node_id,
+                "precision": self.precision,
                 "device_type": self.device_type,
                 "device_name": self.device_name,
                 "initialization_time_ms": self.service_initialization_duration * 1000,
@@ -288,10 +298,13 @@ class ProfileResultProcessor:
                 ],
             }
 
-            # check if there is already a profile for this node id
+            # check if there is already a profile for this node id and precision
             profile_found = False
             for profile in service_data["profiles"]:
-                if profile["node_id"] == self.node_id:
+                if (
+                    profile["node_id"] == self.node_id
+                    and profile.get("precision", "fp32") == self.precision
+                ):
                     profile_found = True
 
                     # check if there is already a profile for this xai method
@@ -520,6 +533,63 @@ def option_profile_run_with_xai():
         print(f"Request failed: {e}")
 
 
+BENCHMARK_SEQUENCES = [
+    "one day I will see the world",
+    "The new phone has a great camera but the battery drains quickly.",
+    "Our team won the match after a dramatic penalty shootout.",
+    "The central bank raised interest rates to fight inflation.",
+    "I burned the pasta again while trying a new recipe from my grandmother.",
+    "The museum opens a new exhibition about ancient Egyptian art next week.",
+    "Scientists discovered water ice in a crater near the lunar south pole.",
+    "Traffic on the motorway was stuck for hours because of the snow storm.",
+]
+BENCHMARK_LABELS = [
+    "travel", "technology", "sports", "economy", "cooking", "art", "science", "weather",
+    "politics", "health", "music", "education", "business", "nature", "history", "finance",
+    "entertainment", "fashion", "law", "religion", "space", "cars", "family", "crime",
+    "gaming", "movies", "energy", "food", "housing", "jobs", "shopping", "transport",
+]
+
+
+def option_benchmark_batched_zero_shot():
+    """Compare the throughput of `/model/run` (one sequence per request) and `/model/run_batch` against the number of labels."""
+    num_repeats = int(input("Enter the number of repeats per label count: "))
+    label_counts = [2, 4, 8, 16, 32]
+
+    rows = []
+    for label_count in label_counts:
+        candidate_labels = BENCHMARK_LABELS[:label_count]
+
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            for sequence in BENCHMARK_SEQUENCES:
+                send_post_request(
+                    f"{SERVER_URL}/model/run",
+                    {"sequence": sequence, "candidate_labels": candidate_labels, "ue_id": UE_ID},
+                    {},
+                )
+        single_duration = (time.perf_counter() - start_time) / num_repeats
+
+        start_time = time.perf_counter()
+        for _ in range(num_repeats):
+            send_post_request(
+                f"{SERVER_URL}/model/run_batch",
+                {"sequences": BENCHMARK_SEQUENCES, "candidate_labels": candidate_labels, "ue_id": UE_ID},
+                {},
+            )
+        batch_duration = (time.perf_counter() - start_time) / num_repeats
+
+        num_pairs = len(BENCHMARK_SEQUENCES) * label_count
+        rows.append((label_count, num_pairs / single_duration, num_pairs / batch_duration))
+
+    print("\n--------- ZERO-SHOT THROUGHPUT (NLI pairs / second) ---------\n")
+    print(f"{'labels':>8} {'run':>12} {'run_batch':>12} {'speedup':>10}")
+    for label_count, single_throughput, batch_throughput in rows:
+        print(
+            f"{label_count:>8} {single_throughput:>12.2f} {batch_throughput:>12.2f} {batch_throughput / single_throughput:>9.2f}x"
+        )
+
+
 OPTIONS = [
     {
         "label": "Get help information",
@@ -541,6 +611,10 @@ OPTIONS = [
         "label": "Profile AI service with XAI (only image-classification models)",
         "action": option_profile_run_with_xai,
     },
+    {
+        "label": "Benchmark batched zero-shot classification against the number of labels",
+        "action": option_benchmark_batched_zero_shot,
+    },
 ]
 
 
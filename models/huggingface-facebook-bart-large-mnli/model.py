@@ -8,9 +8,17 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import os
+from functools import lru_cache
 import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
+from quantization_utils import (
+    QUANTIZE,
+    QUANTIZE_SMOKE_TEST,
+    quantize_model,
+    run_quantization_smoke_test,
+)
 from transformers import pipeline
 
 # --------------------------------
@@ -25,6 +33,142 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 MODEL_NAME = "facebook/bart-large-mnli"
 classifier = pipeline("zero-shot-classification", model=MODEL_NAME, device=0 if torch.cuda.is_available() else -1)
 
+# default number of (sequence, label) pairs per forward pass for the batched endpoint
+ZERO_SHOT_BATCH_SIZE = int(os.getenv("ZERO_SHOT_BATCH_SIZE", "16"))
+DEFAULT_HYPOTHESIS_TEMPLATE = "This example is {}."
+
+# the same label conventions the zero-shot-classification pipeline uses
+entailment_id = classifier.entailment_id
+contradiction_id = -1 if entailment_id == 0 else 0
+
+# --------------------------------
+# Optional dynamic int8 quantization, selected by the `QUANTIZE` env variable
+# --------------------------------
+# bundled samples for the accuracy smoke test of the quantized model
+QUANTIZATION_SMOKE_TEST_SAMPLES = [
+    ("one day I will see the world", ("travel", "cooking", "dancing")),
+    ("The stock market fell sharply after the announcement.", ("finance", "sports", "politics")),
+    ("The team won the championship in overtime.", ("sports", "technology", "health")),
+    ("The new phone has a faster processor and a better camera.", ("technology", "food", "travel")),
+]
+
+
+def predict_top_label(nli_model, sample: tuple) -> int:
+    sequence, candidate_labels = sample
+    inputs = classifier.tokenizer(
+        [sequence] * len(candidate_labels),
+        [DEFAULT_HYPOTHESIS_TEMPLATE.format(label) for label in candidate_labels],
+        return_tensors="pt",
+        padding=True,
+        truncation="only_first",
+    ).to(device)
+    with torch.no_grad():
+        return nli_model(**inputs).logits[:, entailment_id].argmax().item()
+
+
+reference_model = classifier.model
+quantized_model, precision = quantize_model(reference_model, device)
+quantization_smoke_test = None
+if quantized_model is not reference_model and QUANTIZE_SMOKE_TEST:
+    quantization_smoke_test = run_quantization_smoke_test(
+        lambda sample: predict_top_label(reference_model, sample),
+        lambda sample: predict_top_label(quantized_model, sample),
+        QUANTIZATION_SMOKE_TEST_SAMPLES,
+    )
+classifier.model = quantized_model
+del reference_model, quantized_model
+
+
+@lru_cache(maxsize=256)
+def tokenize_hypotheses(hypothesis_template: str, candidate_labels: tuple) -> tuple:
+    """Tokenize the hypotheses of a label set once, they are identical for every sequence."""
+    hypotheses = [hypothesis_template.format(label) for label in candidate_labels]
+    return tuple(
+        tuple(token_ids)
+        for token_ids in classifier.tokenizer(hypotheses, add_special_tokens=False)[
+            "input_ids"
+        ]
+    )
+
+
+def build_nli_pairs(sequences: list[str], hypotheses: tuple) -> list:
+    """Build the encoded (premise, hypothesis) pair for every sequence and label."""
+    tokenizer = classifier.tokenizer
+    premises = tokenizer(sequences, add_special_tokens=False)["input_ids"]
+    num_special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+
+    pairs = []
+    for sequence_index, premise in enumerate(premises):
+        for label_index, hypothesis in enumerate(hypotheses):
+            # truncate the premise only, like the pipeline's `only_first` truncation
+            max_premise_length = (
+                tokenizer.model_max_length - len(hypothesis) - num_special_tokens
+            )
+            input_ids = tokenizer.build_inputs_with_special_tokens(
+                premise[:max_premise_length], list(hypothesis)
+            )
+            pairs.append((sequence_index, label_index, input_ids))
+    return pairs
+
+
+def run_zero_shot_batch(
+    sequences: list[str],
+    candidate_labels: list[str],
+    hypothesis_template: str = DEFAULT_HYPOTHESIS_TEMPLATE,
+    multi_label: bool = False,
+    batch_size: int = ZERO_SHOT_BATCH_SIZE,
+) -> list:
+    """
+    Classify many sequences against the same candidate labels.
+    All (sequence, label) pairs are sorted by length and run in padded batches,
+    so each batch only pads to the length of its longest pair.
+    """
+    hypotheses = tokenize_hypotheses(hypothesis_template, tuple(candidate_labels))
+    pairs = build_nli_pairs(sequences, hypotheses)
+    pairs.sort(key=lambda pair: len(pair[2]))
+
+    pad_token_id = classifier.tokenizer.pad_token_id
+    nli_logits = torch.empty(len(sequences), len(candidate_labels), 2)
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start : start + batch_size]
+        max_length = len(batch[-1][2])
+        input_ids = torch.full((len(batch), max_length), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), max_length), dtype=torch.long)
+        for row, (_, _, token_ids) in enumerate(batch):
+            input_ids[row, : len(token_ids)] = torch.tensor(token_ids)
+            attention_mask[row, : len(token_ids)] = 1
+
+        with torch.no_grad():
+            logits = classifier.model(
+                input_ids=input_ids.to(device), attention_mask=attention_mask.to(device)
+            ).logits.cpu()
+
+        for row, (sequence_index, label_index, _) in enumerate(batch):
+            nli_logits[sequence_index, label_index, 0] = logits[row, contradiction_id]
+            nli_logits[sequence_index, label_index, 1] = logits[row, entailment_id]
+
+    if multi_label or len(candidate_labels) == 1:
+        # softmax over (contradiction, entailment) for each label independently
+        scores = nli_logits.softmax(dim=-1)[..., 1]
+    else:
+        # softmax over the entailment logits of all labels
+        scores = nli_logits[..., 1].softmax(dim=-1)
+
+    results = []
+    for sequence, sequence_scores in zip(sequences, scores.tolist()):
+        ranking = sorted(
+            zip(candidate_labels, sequence_scores), key=lambda x: x[1], reverse=True
+        )
+        results.append(
+            {
+                "labels": [label for label, _ in ranking],
+                "scores": [score for _, score in ranking],
+                "sequence": sequence,
+            }
+        )
+    return results
+
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -66,6 +210,7 @@ async def profile_run(sequence: str = Form(...), candidate_labels: list[str] = F
                 result = classifier(sequence, candidate_labels)
 
         profile_result = prepare_profile_results(prof)
+        profile_result["precision"] = precision
 
         return JSONResponse(
             content={
@@ -86,6 +231,53 @@ async def profile_run(sequence: str = Form(...), candidate_labels: list[str] = F
             status_code=500,
         )
 
+@router.post("/run_batch")
+async def run_batch(
+    sequences: list[str] = Form(...),
+    candidate_labels: list[str] = Form(...),
+    ue_id: str = Form(...),
+    hypothesis_template: str = Form(DEFAULT_HYPOTHESIS_TEMPLATE),
+    multi_label: bool = Form(False),
+    batch_size: int = Form(ZERO_SHOT_BATCH_SIZE),
+):
+    """
+    Endpoint to classify multiple sequences against the same candidate labels in length-bucketed batches.
+    """
+    try:
+        results = run_zero_shot_batch(
+            sequences,
+            candidate_labels,
+            hypothesis_template=hypothesis_template,
+            multi_label=multi_label,
+            batch_size=batch_size,
+        )
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": results,
+            }
+        )
+    except Exception as e:
+        print(f"Error processing text: {e}")
+        return JSONResponse(
+            content={"error": "Failed to process the text. {e}".format(e=str(e))},
+            status_code=500,
+        )
+
+@router.get("/quantization")
+async def get_quantization():
+    """
+    Endpoint to get the quantization mode, the precision and the smoke test results.
+    """
+    return JSONResponse(
+        content={
+            "quantize": QUANTIZE,
+            "precision": precision,
+            "smoke_test": quantization_smoke_test,
+        }
+    )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "sequence": {
@@ -8,10 +8,12 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import os
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
 from flair.data import Sentence
 from flair.models import SequenceTagger
+from flair.splitter import SegtokSentenceSplitter
 
 # --------------------------------
 # Model-specific configuration
@@ -20,6 +22,42 @@ from flair.models import SequenceTagger
 MODEL_NAME = "flair/ner-english-fast"
 tagger = SequenceTagger.load(MODEL_NAME)
 
+# default number of sentences per forward pass for the batched endpoint
+FLAIR_MINI_BATCH_SIZE = int(os.getenv("FLAIR_MINI_BATCH_SIZE", "32"))
+sentence_splitter = SegtokSentenceSplitter()
+
+
+def run_ner_batch(texts: list[str], mini_batch_size: int = FLAIR_MINI_BATCH_SIZE) -> list:
+    """
+    Split every text into sentences, tag all sentences of all texts in mini-batches,
+    and map the entity spans back to character offsets of the original texts.
+    """
+    sentences_per_text = [sentence_splitter.split(text) for text in texts]
+    all_sentences = [
+        sentence for sentences in sentences_per_text for sentence in sentences
+    ]
+    if all_sentences:
+        tagger.predict(all_sentences, mini_batch_size=mini_batch_size)
+
+    results = []
+    for sentences in sentences_per_text:
+        entities = []
+        for sentence in sentences:
+            for span in sentence.get_spans("ner"):
+                label = span.get_label("ner")
+                entities.append(
+                    {
+                        "text": span.text,
+                        "label": label.value,
+                        "start": sentence.start_position + span.start_position,
+                        "end": sentence.start_position + span.end_position,
+                        "score": label.score,
+                    }
+                )
+        results.append({"num_sentences": len(sentences), "entities": entities})
+    return results
+
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -85,6 +123,31 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
             status_code=500,
         )
 
+@router.post("/run_batch")
+async def run_batch(
+    texts: list[str] = Form(...),
+    ue_id: str = Form(...),
+    mini_batch_size: int = Form(FLAIR_MINI_BATCH_SIZE),
+):
+    """
+    Endpoint to run NER on a list of texts (or a single long document) in sentence mini-batches.
+    """
+    try:
+        results = run_ner_batch(texts, mini_batch_size=mini_batch_size)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": results,
+            }
+        )
+    except Exception as e:
+        print(f"Error processing text: {e}")
+        return JSONResponse(
+            content={"error": "Failed to process the text. {e}".format(e=str(e))},
+            status_code=500,
+        )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "text": {
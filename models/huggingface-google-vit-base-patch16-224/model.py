@@ -12,7 +12,8 @@ import torch
 from fastapi import APIRouter, File, Form, UploadFile
 from fastapi.responses import JSONResponse
 from transformers import ViTImageProcessor, ViTForImageClassification
-from PIL import Image
+
+from image_ingest import ImageIngest
 
 # --------------------------------
 # Device configuration
@@ -29,6 +30,9 @@ processor = ViTImageProcessor.from_pretrained(MODEL_NAME)
 model = ViTForImageClassification.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
+# decodes each upload once into the model input, shared with the XAI router
+image_ingest = ImageIngest(processor, device)
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -36,12 +40,11 @@ router = APIRouter()
 async def run_model(file: UploadFile = File(...), ue_id: str = Form(...)):
     try:
         # Prepare the model input
-        image = Image.open(file.file).convert("RGB")
-        inputs = processor(images=image, return_tensors="pt").to(device)
+        _, pixel_values = image_ingest(await file.read())
 
         # Perform inference
         with torch.no_grad():
-            outputs = model(**inputs)
+            outputs = model(pixel_values=pixel_values)
 
         # Process the model outputs
         predictions = get_image_classification_results_from_model_output_logits(model, outputs.logits)
@@ -66,8 +69,7 @@ async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...)):
     """
     try:
         # Prepare the model input
-        image = Image.open(file.file).convert("RGB")
-        inputs = processor(images=image, return_tensors="pt").to(device)
+        _, pixel_values = image_ingest(await file.read())
 
         # perform profiling
         with profile(
@@ -76,7 +78,7 @@ async def profile_run(file: UploadFile = File(...), ue_id: str = Form(...)):
         ) as prof:
             with record_function("model_run"):
                 with torch.no_grad():
-                    model_outputs = model(**inputs)
+                    model_outputs = model(pixel_values=pixel_values)
 
         profile_result = prepare_profile_results(prof)
 
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import torch
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# memory budget of the cached XAI results, 0 disables the cache
+XAI_CACHE_MAX_BYTES = int(os.getenv("XAI_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# directory where the results evicted from memory are spilled, disabled if empty
+XAI_CACHE_DIR = os.getenv("XAI_CACHE_DIR", "")
+# disk budget of the spilled results
+XAI_CACHE_DISK_MAX_BYTES = int(os.getenv("XAI_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+FINGERPRINT_FILE_NAME = "model_fingerprint"
+
+
+def get_model_fingerprint(model: torch.nn.Module) -> str:
+    """
+    Hash of the model identity and weights, the cached results are only valid for the model
+    they were computed with. Each parameter contributes its name, shape and sum.
+    """
+    fingerprint = hashlib.sha256()
+    fingerprint.update(type(model).__name__.encode())
+    fingerprint.update(str(getattr(model.config, "_name_or_path", "")).encode())
+    with torch.no_grad():
+        for name, tensor in model.state_dict().items():
+            fingerprint.update(f"{name}:{tuple(tensor.shape)}:".encode())
+            if tensor.is_floating_point():
+                fingerprint.update(f"{tensor.double().sum().item():.10e}".encode())
+    return fingerprint.hexdigest()
+
+
+class XAIResultCache:
+    """
+    LRU cache of XAI results with a byte budget.
+
+    The results are stored as JSON bytes, the budget counts the size of these bytes.
+    If `spill_dir` is set, the results evicted from memory are written to
+    `<spill_dir>/<key>.json` (with their own LRU budget) and promoted back to memory on a hit.
+    The spilled results survive a restart unless the model fingerprint changed.
+    """
+
+    def __init__(
+        self,
+        fingerprint: str,
+        max_bytes: int = XAI_CACHE_MAX_BYTES,
+        spill_dir: str = XAI_CACHE_DIR,
+        max_disk_bytes: int = XAI_CACHE_DISK_MAX_BYTES,
+    ):
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._disk_entries: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "spills": 0,
+            "invalidations": 0,
+        }
+
+        if self.spill_dir:
+            self._load_spill_dir()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(image_bytes: bytes, **params) -> str:
+        """Key of a result: hash of the image content and of the parameters that change the result."""
+        key = hashlib.sha256(image_bytes)
+        key.update(json.dumps(params, sort_keys=True).encode())
+        return key.hexdigest()
+
+    # -------------------------------------------
+    # Storage helpers
+    # -------------------------------------------
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _load_spill_dir(self):
+        """Index the spilled results, or drop them if they were computed with another model."""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        fingerprint_path = os.path.join(self.spill_dir, FINGERPRINT_FILE_NAME)
+        stored_fingerprint = None
+        if os.path.exists(fingerprint_path):
+            with open(fingerprint_path, "r") as file:
+                stored_fingerprint = file.read().strip()
+        if stored_fingerprint != self.fingerprint:
+            self._clear_spill_dir()
+            with open(fingerprint_path, "w") as file:
+                file.write(self.fingerprint)
+            return
+
+        spilled_files = [
+            file_name for file_name in os.listdir(self.spill_dir) if file_name.endswith(".json")
+        ]
+        # oldest first, so the LRU order survives the restart
+        spilled_files.sort(key=lambda file_name: os.path.getmtime(os.path.join(self.spill_dir, file_name)))
+        for file_name in spilled_files:
+            size = os.path.getsize(os.path.join(self.spill_dir, file_name))
+            self._disk_entries[file_name[: -len(".json")]] = size
+            self._disk_bytes += size
+        print(f"Indexed {len(self._disk_entries)} spilled XAI results in {self.spill_dir}.")
+
+    def _clear_spill_dir(self):
+        for file_name in os.listdir(self.spill_dir):
+            if file_name.endswith(".json"):
+                os.remove(os.path.join(self.spill_dir, file_name))
+        self._disk_entries.clear()
+        self._disk_bytes = 0
+
+    def _spill(self, key: str, value: bytes):
+        """Write an evicted result to disk, the caller must hold the lock."""
+        if not self.spill_dir or len(value) > self.max_disk_bytes:
+            return
+        with open(self._spill_path(key), "wb") as file:
+            file.write(value)
+        self._disk_entries[key] = len(value)
+        self._disk_bytes += len(value)
+        self._counters["spills"] += 1
+        while self._disk_bytes > self.max_disk_bytes:
+            evicted_key, size = self._disk_entries.popitem(last=False)
+            self._disk_bytes -= size
+            os.remove(self._spill_path(evicted_key))
+
+    def _unspill(self, key: str) -> Optional[bytes]:
+        """Read a spilled result and remove it from disk, the caller must hold the lock."""
+        size = self._disk_entries.pop(key, None)
+        if size is None:
+            return None
+        self._disk_bytes -= size
+        try:
+            with open(self._spill_path(key), "rb") as file:
+                value = file.read()
+            os.remove(self._spill_path(key))
+        except OSError:
+            return None
+        return value
+
+    def _store(self, key: str, value: bytes):
+        """Insert a result in memory and evict the least recently used ones, the caller must hold the lock."""
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            evicted_key, evicted_value = self._entries.popitem(last=False)
+            self._bytes -= len(evicted_value)
+            self._counters["evictions"] += 1
+            self._spill(evicted_key, evicted_value)
+
+    # -------------------------------------------
+    # Public API
+    # -------------------------------------------
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return json.loads(value)
+            value = self._unspill(key)
+            if value is not None:
+                self._counters["disk_hits"] += 1
+                self._store(key, value)
+                return json.loads(value)
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, result: dict):
+        if not self.enabled:
+            return
+        value = json.dumps(result).encode("utf-8")
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, fingerprint: Optional[str] = None):
+        """Drop all the results, e.g. when the model is reloaded. A new fingerprint can be given."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counters["invalidations"] += 1
+            if fingerprint is not None:
+                self.fingerprint = fingerprint
+            if self.spill_dir:
+                self._clear_spill_dir()
+                with open(os.path.join(self.spill_dir, FINGERPRINT_FILE_NAME), "w") as file:
+                    file.write(self.fingerprint)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk_entries),
+                "disk_bytes": self._disk_bytes,
+                "max_disk_bytes": self.max_disk_bytes if self.spill_dir else 0,
+                **self._counters,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "model_fingerprint": self.fingerprint,
+            }
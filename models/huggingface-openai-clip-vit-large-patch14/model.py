@@ -8,6 +8,8 @@ from ai_server_utils import (
 from torch.profiler import profile, record_function
 
 # import necessary libs for AI model inference and request handling
+import os
+from collections import OrderedDict
 import torch
 from fastapi import APIRouter, File, Form, UploadFile
 from fastapi.responses import JSONResponse
@@ -29,6 +31,89 @@ processor = CLIPProcessor.from_pretrained(MODEL_NAME)
 model = CLIPModel.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
+# maximum number of distinct text prompts whose embeddings are kept in memory
+TEXT_EMBEDDING_CACHE_SIZE = int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", "4096"))
+
+
+class TextEmbeddingCache:
+    """LRU cache of normalized CLIP text embeddings, keyed by prompt."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.embeddings = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_embeddings(self, text_prompts: list[str]) -> torch.Tensor:
+        """Return the (num_prompts, dim) embeddings, only encoding the prompts not yet cached."""
+        missing_prompts = list(
+            dict.fromkeys(p for p in text_prompts if p not in self.embeddings)
+        )
+        self.hits += len(text_prompts) - len(missing_prompts)
+        self.misses += len(missing_prompts)
+
+        if missing_prompts:
+            inputs = processor(
+                text=missing_prompts, return_tensors="pt", padding=True
+            ).to(device)
+            with torch.no_grad():
+                text_features = model.get_text_features(**inputs)
+            text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+            for prompt, embedding in zip(missing_prompts, text_features):
+                self.embeddings[prompt] = embedding
+
+        # collect before evicting, so that a request larger than the cache still works
+        embeddings = torch.stack([self.embeddings[p] for p in text_prompts])
+        for prompt in text_prompts:
+            self.embeddings.move_to_end(prompt)
+        while len(self.embeddings) > self.max_size:
+            self.embeddings.popitem(last=False)
+        return embeddings
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.embeddings),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+text_embedding_cache = TextEmbeddingCache(TEXT_EMBEDDING_CACHE_SIZE)
+
+# named prompt sets registered by the clients, name -> list of text prompts
+registered_prompt_sets = {}
+
+
+def get_image_embedding(image: Image.Image) -> torch.Tensor:
+    """Run the vision tower once and return the normalized image embedding."""
+    inputs = processor(images=image, return_tensors="pt").to(device)
+    with torch.no_grad():
+        image_features = model.get_image_features(**inputs)
+    return image_features / image_features.norm(dim=-1, keepdim=True)
+
+
+def classify_image_against_prompts(image: Image.Image, text_prompts: list[str]):
+    """
+    Score the image against the text prompts from the cached normalized embeddings.
+    This equals `CLIPModel(...).logits_per_image.softmax(dim=1)` without re-encoding the prompts.
+    """
+    image_embedding = get_image_embedding(image)
+    text_embeddings = text_embedding_cache.get_embeddings(text_prompts)
+    with torch.no_grad():
+        logits_per_image = model.logit_scale.exp() * image_embedding @ text_embeddings.T
+    probs = logits_per_image.softmax(dim=1).cpu().numpy()
+
+    # Map probabilities to text prompts
+    results = [
+        {"text_prompt": text, "probability": float(prob)}
+        for text, prob in zip(text_prompts, probs[0])
+    ]
+
+    # Sort results by probability (optional)
+    return sorted(results, key=lambda x: x["probability"], reverse=True)
+
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -37,24 +122,9 @@ async def run_model(file: UploadFile = File(...), text_prompts: list[str] = Form
     try:
         # Prepare the model input
         image = Image.open(file.file).convert("RGB")
-        inputs = processor(text=text_prompts, images=image, return_tensors="pt", padding=True).to(device)
 
         # Perform inference
-        with torch.no_grad():
-            model_outputs = model(**inputs)
-
-        # Process the model_outputs
-        logits_per_image = model_outputs.logits_per_image
-        probs = logits_per_image.softmax(dim=1).cpu().numpy()
-
-        # Map probabilities to text prompts
-        results = [
-            {"text_prompt": text, "probability": float(prob)}
-            for text, prob in zip(text_prompts, probs[0])
-        ]
-
-        # Sort results by probability (optional)
-        results = sorted(results, key=lambda x: x["probability"], reverse=True)
+        results = classify_image_against_prompts(image, text_prompts)
 
         return JSONResponse(
             content={
@@ -77,7 +147,6 @@ async def profile_run(file: UploadFile = File(...), text_prompts: list[str] = Fo
     try:
         # Prepare the model input
         image = Image.open(file.file).convert("RGB")
-        inputs = processor(text=text_prompts, images=image, return_tensors="pt", padding=True).to(device)
 
         # perform profiling
         with profile(
@@ -85,25 +154,10 @@ async def profile_run(file: UploadFile = File(...), text_prompts: list[str] = Fo
             profile_memory=True,
         ) as prof:
             with record_function("model_run"):
-                with torch.no_grad():
-                    model_outputs = model(**inputs)
+                results = classify_image_against_prompts(image, text_prompts)
 
         profile_result = prepare_profile_results(prof)
 
-        # Process the model_outputs
-        logits_per_image = model_outputs.logits_per_image
-        probs = logits_per_image.softmax(dim=1).cpu().numpy()
-
-        # Map probabilities to text prompts
-        results = [
-            {"text_prompt": text, "probability": float(prob)}
-            for text, prob in zip(text_prompts, probs[0])
-        ]
-
-        # Sort results by probability (optional)
-        results = sorted(results, key=lambda x: x["probability"], reverse=True)
-
-
         return JSONResponse(
             content={
                 "ue_id": ue_id,
@@ -119,6 +173,82 @@ async def profile_run(file: UploadFile = File(...), text_prompts: list[str] = Fo
             status_code=500,
         )
 
+@router.post("/prompt_sets/register")
+async def register_prompt_set(
+    prompt_set_name: str = Form(...),
+    text_prompts: list[str] = Form(...),
+    ue_id: str = Form(...),
+):
+    """
+    Endpoint to register (or replace) a named set of text prompts.
+    The prompt embeddings are computed once here and served from the cache afterwards.
+    """
+    try:
+        text_embedding_cache.get_embeddings(text_prompts)
+        registered_prompt_sets[prompt_set_name] = list(text_prompts)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "prompt_set_name": prompt_set_name,
+                "text_prompts": registered_prompt_sets[prompt_set_name],
+            }
+        )
+    except Exception as e:
+        print(f"Error registering the prompt set: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to register the prompt set. {e}"},
+            status_code=500,
+        )
+
+
+@router.get("/prompt_sets")
+async def get_prompt_sets():
+    """
+    Endpoint to list the registered prompt sets and the text embedding cache statistics.
+    """
+    return JSONResponse(
+        content={
+            "prompt_sets": registered_prompt_sets,
+            "text_embedding_cache": text_embedding_cache.stats(),
+        }
+    )
+
+
+@router.post("/run_prompt_set")
+async def run_prompt_set(
+    file: UploadFile = File(...),
+    prompt_set_name: str = Form(...),
+    ue_id: str = Form(...),
+):
+    """
+    Endpoint to score one image against a registered prompt set.
+    """
+    try:
+        if prompt_set_name not in registered_prompt_sets:
+            return JSONResponse(
+                content={"error": f"Prompt set '{prompt_set_name}' is not registered."},
+                status_code=404,
+            )
+
+        image = Image.open(file.file).convert("RGB")
+        results = classify_image_against_prompts(
+            image, registered_prompt_sets[prompt_set_name]
+        )
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": results,
+            }
+        )
+    except Exception as e:
+        print(f"Error processing file: {e}")
+        return JSONResponse(
+            content={"error": "Failed to process the image. {e}".format(e=str(e))},
+            status_code=500,
+        )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "file": {
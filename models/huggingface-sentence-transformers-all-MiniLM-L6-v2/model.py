@@ -11,6 +11,7 @@ import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
 from sentence_transformers import SentenceTransformer
+from vector_index import VectorIndex, VECTOR_INDEX_DIR
 
 # --------------------------------
 # Device configuration
@@ -25,6 +26,12 @@ MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 model = SentenceTransformer(MODEL_NAME).to(device)
 model.eval()
 
+# In-service vector index over the normalized sentence embeddings
+vector_index = VectorIndex(
+    dimension=model.get_sentence_embedding_dimension(),
+    snapshot_dir=VECTOR_INDEX_DIR,
+)
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -81,6 +88,97 @@ async def profile_run(sentences: list[str] = Form(...), ue_id: str = Form(...)):
             status_code=500,
         )
 
+@router.post("/index/add")
+async def index_add(
+    ids: list[str] = Form(...),
+    sentences: list[str] = Form(...),
+    ue_id: str = Form(...),
+):
+    """
+    Endpoint to encode sentences and add them to the vector index under the given ids.
+    Existing ids are overwritten.
+    """
+    try:
+        assert len(ids) == len(sentences), "The number of ids and sentences must match."
+
+        with torch.no_grad():
+            embeddings = model.encode(sentences, normalize_embeddings=True)
+
+        index_result = vector_index.add(ids, embeddings)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "index_results": index_result,
+            }
+        )
+    except Exception as e:
+        print(f"Error adding to the index: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to add the sentences to the index. {e}"},
+            status_code=500,
+        )
+
+@router.post("/index/search")
+async def index_search(
+    sentences: list[str] = Form(...),
+    ue_id: str = Form(...),
+    top_k: int = Form(5),
+):
+    """
+    Endpoint to retrieve the `top_k` most similar indexed ids for each query sentence.
+    """
+    try:
+        with torch.no_grad():
+            embeddings = model.encode(sentences, normalize_embeddings=True)
+
+        matches = vector_index.search(embeddings, top_k=top_k)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "model_results": [
+                    {"sentence": sentence, "matches": sentence_matches}
+                    for sentence, sentence_matches in zip(sentences, matches)
+                ],
+                "index_results": vector_index.stats(),
+            }
+        )
+    except Exception as e:
+        print(f"Error searching the index: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to search the index. {e}"},
+            status_code=500,
+        )
+
+@router.post("/index/delete")
+async def index_delete(ids: list[str] = Form(...), ue_id: str = Form(...)):
+    """
+    Endpoint to delete ids from the vector index.
+    """
+    try:
+        index_result = vector_index.delete(ids)
+
+        return JSONResponse(
+            content={
+                "ue_id": ue_id,
+                "index_results": index_result,
+            }
+        )
+    except Exception as e:
+        print(f"Error deleting from the index: {e}")
+        return JSONResponse(
+            content={"error": f"Failed to delete from the index. {e}"},
+            status_code=500,
+        )
+
+@router.get("/index/stats")
+async def index_stats():
+    """
+    Endpoint to retrieve the size and type of the vector index.
+    """
+    return JSONResponse(content=vector_index.stats())
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "sntences": {
@@ -0,0 +1,328 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# directory for the memory-mapped snapshot, persistence is disabled if empty
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "")
+# the snapshot is written at most once per interval after a write, and at exit.
+# 0 writes it after every add or delete, which rewrites the whole matrix each time
+VECTOR_INDEX_SNAPSHOT_INTERVAL_S = float(os.getenv("VECTOR_INDEX_SNAPSHOT_INTERVAL_S", "5"))
+# number of vectors above which the clustered (IVF) index is used for search
+VECTOR_INDEX_IVF_THRESHOLD = int(os.getenv("VECTOR_INDEX_IVF_THRESHOLD", "20000"))
+# number of clusters probed per query when the IVF index is active
+VECTOR_INDEX_IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "8"))
+
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+IDS_FILE_NAME = "ids.json"
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so that the dot product equals the cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, sorted by descending score."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex:
+    """
+    In-memory cosine similarity index over normalized embeddings.
+
+    The embeddings are kept in one contiguous float32 matrix (grown by doubling),
+    so an exact search is a single matmul followed by `argpartition`.
+    Once the index holds more than `ivf_threshold` vectors, the search switches to
+    an inverted file index: vectors are clustered with spherical k-means and
+    only the `nprobe` clusters closest to the query are scanned.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        snapshot_dir: str = "",
+        ivf_threshold: int = VECTOR_INDEX_IVF_THRESHOLD,
+        nprobe: int = VECTOR_INDEX_IVF_NPROBE,
+        snapshot_interval_s: float = VECTOR_INDEX_SNAPSHOT_INTERVAL_S,
+    ):
+        self.dimension = dimension
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval_s = snapshot_interval_s
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+
+        self._lock = threading.RLock()
+        self._matrix = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._id_to_row = {}
+
+        # IVF state, `_assignments[row]` is the cluster of the vector at `row`
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._ivf_built_size = 0
+
+        # whether the index changed since the last snapshot, the snapshot lock orders the writes
+        self._dirty = False
+        self._snapshot_lock = threading.Lock()
+
+        if self.snapshot_dir:
+            self.load_snapshot()
+            if self.snapshot_interval_s > 0:
+                threading.Thread(
+                    target=self._snapshot_loop, name="vector-index-snapshot", daemon=True
+                ).start()
+            atexit.register(self.save_snapshot)
+
+    def __len__(self):
+        return self._size
+
+    # -------------------------------------------
+    # Storage helpers
+    # -------------------------------------------
+    def _ensure_capacity(self, extra: int):
+        """Make sure the matrix is writable and can hold `extra` more rows."""
+        required = self._size + extra
+        capacity = self._matrix.shape[0]
+        if required <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(required, 2 * capacity, 64)
+        matrix = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        self._matrix = matrix
+
+        assignments = np.full(new_capacity, -1, dtype=np.int32)
+        assignments[: self._size] = self._assignments[: self._size]
+        self._assignments = assignments
+
+    # -------------------------------------------
+    # IVF helpers
+    # -------------------------------------------
+    def _ivf_active(self) -> bool:
+        return self._size > self.ivf_threshold
+
+    def _build_ivf(self, iterations: int = 10):
+        """Cluster the stored vectors with spherical k-means."""
+        vectors = self._matrix[: self._size]
+        n_lists = max(1, int(np.sqrt(self._size)))
+        rng = np.random.default_rng(0)
+        centroids = vectors[rng.choice(self._size, n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        self._centroids = centroids
+        self._assignments[: self._size] = np.argmax(vectors @ centroids.T, axis=1)
+        self._ivf_built_size = self._size
+
+    def _maybe_rebuild_ivf(self):
+        if not self._ivf_active():
+            return
+        # rebuild once the index has doubled since the last clustering
+        if self._centroids is None or self._size > 2 * self._ivf_built_size:
+            self._build_ivf()
+
+    # -------------------------------------------
+    # Public API
+    # -------------------------------------------
+    def add(self, ids: List[str], embeddings: np.ndarray) -> dict:
+        """Add or overwrite the embeddings stored under the given ids."""
+        assert len(ids) == len(embeddings), "The number of ids and embeddings must match."
+        vectors = normalize_rows(embeddings)
+        assert (
+            vectors.shape[1] == self.dimension
+        ), f"Expected embeddings of dimension {self.dimension}, got {vectors.shape[1]}."
+
+        with self._lock:
+            self._ensure_capacity(len(ids))
+            added, updated = 0, 0
+            for item_id, vector in zip(ids, vectors):
+                row = self._id_to_row.get(item_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(item_id)
+                    self._id_to_row[item_id] = row
+                    added += 1
+                else:
+                    updated += 1
+                self._matrix[row] = vector
+                if self._centroids is not None:
+                    self._assignments[row] = int(np.argmax(self._centroids @ vector))
+            self._maybe_rebuild_ivf()
+            self._dirty = True
+            result = {"added": added, "updated": updated, "size": self._size}
+        self._after_write()
+        return result
+
+    def delete(self, ids: List[str]) -> dict:
+        """Delete the given ids, unknown ids are reported as missing."""
+        with self._lock:
+            self._ensure_capacity(0)
+            deleted, missing = 0, []
+            for item_id in ids:
+                row = self._id_to_row.pop(item_id, None)
+                if row is None:
+                    missing.append(item_id)
+                    continue
+                # move the last row into the freed slot to keep the matrix contiguous
+                last = self._size - 1
+                if row != last:
+                    moved_id = self._ids[last]
+                    self._matrix[row] = self._matrix[last]
+                    self._assignments[row] = self._assignments[last]
+                    self._ids[row] = moved_id
+                    self._id_to_row[moved_id] = row
+                self._ids.pop()
+                self._size -= 1
+                deleted += 1
+            if not self._ivf_active():
+                self._centroids = None
+            self._dirty = True
+            result = {"deleted": deleted, "missing": missing, "size": self._size}
+        self._after_write()
+        return result
+
+    def search(self, queries: np.ndarray, top_k: int = 5) -> List[List[dict]]:
+        """Return the `top_k` most similar ids (cosine similarity) for each query."""
+        queries = normalize_rows(queries)
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in range(len(queries))]
+            self._maybe_rebuild_ivf()
+            vectors = self._matrix[: self._size]
+
+            if self._centroids is None:
+                # exact search: one matmul for the whole query batch
+                results = []
+                for query_scores in queries @ vectors.T:
+                    rows = top_k_indices(query_scores, top_k)
+                    results.append((rows, query_scores[rows]))
+            else:
+                results = []
+                assignments = self._assignments[: self._size]
+                probe_count = min(self.nprobe, self._centroids.shape[0])
+                for query, centroid_scores in zip(queries, queries @ self._centroids.T):
+                    probe = top_k_indices(centroid_scores, probe_count)
+                    candidates = np.flatnonzero(np.isin(assignments, probe))
+                    candidate_scores = vectors[candidates] @ query
+                    best = top_k_indices(candidate_scores, top_k)
+                    results.append((candidates[best], candidate_scores[best]))
+
+            return [
+                [
+                    {"id": self._ids[row], "score": float(score)}
+                    for row, score in zip(rows, scores)
+                ]
+                for rows, scores in results
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self._size,
+                "dimension": self.dimension,
+                "index_type": "ivf" if self._centroids is not None else "flat",
+                "ivf_lists": 0 if self._centroids is None else self._centroids.shape[0],
+                "ivf_threshold": self.ivf_threshold,
+                "nprobe": self.nprobe,
+                "snapshot_dir": self.snapshot_dir,
+                "snapshot_interval_s": self.snapshot_interval_s,
+                "unsaved_changes": self._dirty,
+            }
+
+    # -------------------------------------------
+    # Snapshots
+    # -------------------------------------------
+    def _after_write(self):
+        """Write the snapshot now if it is not debounced, called without holding the index lock."""
+        if self.snapshot_dir and self.snapshot_interval_s <= 0:
+            self.save_snapshot()
+
+    def _snapshot_loop(self):
+        """Background thread coalescing the writes of each interval into one snapshot."""
+        while True:
+            time.sleep(self.snapshot_interval_s)
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                print(f"Failed to save the vector index snapshot: {e}")
+
+    def save_snapshot(self):
+        """
+        Write the embeddings (as .npy) and ids to the snapshot directory, if the index changed
+        since the last snapshot. The index lock is only held to copy the rows, not during the write.
+        """
+        if not self.snapshot_dir:
+            return
+        with self._snapshot_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                embeddings = self._matrix[: self._size].copy()
+                ids = list(self._ids)
+                self._dirty = False
+
+            try:
+                os.makedirs(self.snapshot_dir, exist_ok=True)
+                embeddings_path = os.path.join(self.snapshot_dir, EMBEDDINGS_FILE_NAME)
+                ids_path = os.path.join(self.snapshot_dir, IDS_FILE_NAME)
+
+                # write to temporary files and swap them in, so a crash never leaves a half-written snapshot
+                with open(embeddings_path + ".tmp", "wb") as file:
+                    np.save(file, embeddings)
+                with open(ids_path + ".tmp", "w") as file:
+                    json.dump(ids, file)
+                os.replace(embeddings_path + ".tmp", embeddings_path)
+                os.replace(ids_path + ".tmp", ids_path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                raise
+
+    def load_snapshot(self):
+        """Memory-map the snapshot, the matrix is only copied into memory on the first write."""
+        embeddings_path = os.path.join(self.snapshot_dir, EMBEDDINGS_FILE_NAME)
+        ids_path = os.path.join(self.snapshot_dir, IDS_FILE_NAME)
+        if not (os.path.exists(embeddings_path) and os.path.exists(ids_path)):
+            return
+
+        matrix = np.load(embeddings_path, mmap_mode="r")
+        with open(ids_path, "r") as file:
+            ids = json.load(file)
+        assert matrix.shape == (
+            len(ids),
+            self.dimension,
+        ), f"Snapshot in {self.snapshot_dir} does not match the index dimension."
+
+        with self._lock:
+            self._matrix = matrix
+            self._size = len(ids)
+            self._ids = list(ids)
+            self._id_to_row = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._assignments = np.full(self._size, -1, dtype=np.int32)
+            self._centroids = None
+            self._ivf_built_size = 0
+        print(f"Loaded {self._size} vectors from {self.snapshot_dir}.")
@@ -11,6 +11,12 @@ from torch.profiler import profile, record_function
 import torch
 from fastapi import APIRouter, Form
 from fastapi.responses import JSONResponse
+from quantization_utils import (
+    QUANTIZE,
+    QUANTIZE_SMOKE_TEST,
+    quantize_model,
+    run_quantization_smoke_test,
+)
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 
 # --------------------------------
@@ -27,6 +33,40 @@ tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
 model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME).to(device)
 model.eval()
 
+# --------------------------------
+# Optional dynamic int8 quantization, selected by the `QUANTIZE` env variable
+# --------------------------------
+# bundled samples for the accuracy smoke test of the quantized model
+QUANTIZATION_SMOKE_TEST_SAMPLES = [
+    "I love this product! It's amazing and works perfectly.",
+    "This is the worst purchase I have ever made.",
+    "Das Essen war in Ordnung, nichts Besonderes.",
+    "Me encanta este lugar, el servicio es excelente.",
+    "Le film était vraiment ennuyeux.",
+    "It arrived on time and does what it says.",
+]
+
+
+def predict_class_id(classification_model, text: str) -> int:
+    inputs = tokenizer(
+        text, return_tensors="pt", truncation=True, padding=True, max_length=512
+    ).to(device)
+    with torch.no_grad():
+        return classification_model(**inputs).logits.argmax().item()
+
+
+reference_model = model
+quantized_model, precision = quantize_model(reference_model, device)
+quantization_smoke_test = None
+if quantized_model is not reference_model and QUANTIZE_SMOKE_TEST:
+    quantization_smoke_test = run_quantization_smoke_test(
+        lambda sample: predict_class_id(reference_model, sample),
+        lambda sample: predict_class_id(quantized_model, sample),
+        QUANTIZATION_SMOKE_TEST_SAMPLES,
+    )
+model = quantized_model
+del reference_model, quantized_model
+
 # Initialize the FastAPI router
 router = APIRouter()
 
@@ -81,6 +121,7 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
                     logits = model(**inputs).logits
 
         profile_result = prepare_profile_results(prof)
+        profile_result["precision"] = precision
 
         # Process the model outputs
         probabilities = torch.nn.functional.softmax(logits, dim=-1)
@@ -106,6 +147,19 @@ async def profile_run(text: str = Form(...), ue_id: str = Form(...)):
             status_code=500,
         )
 
+@router.get("/quantization")
+async def get_quantization():
+    """
+    Endpoint to get the quantization mode, the precision and the smoke test results.
+    """
+    return JSONResponse(
+        content={
+            "quantize": QUANTIZE,
+            "precision": precision,
+            "smoke_test": quantization_smoke_test,
+        }
+    )
+
 # Below are the model input and output specifications to be used by the `/help` endpoint
 MODEL_INPUT_FORM_SPEC = {
     "text": {
@@ -35,6 +35,10 @@ class XAIProfile(BaseModel):
 
 class Profile(BaseModel):
     node_id: str
+    # inference backend of the profiled service (pytorch, onnx, openvino)
+    backend: Optional[str] = "pytorch"
+    # numeric precision of the profiled model (fp32, int8-dynamic)
+    precision: Optional[str] = "fp32"
     device_type: str
     device_name: str
     initialization_time_ms: float
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel, MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017/?directConnection=true")
+MONGO_DATABASE_NAME = os.getenv("MONGO_DATABASE_NAME", "cranfield_ai_services")
+MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME", "ai_services")
+# task detail embeddings of the services, keyed by the service id
+MONGO_EMBEDDING_COLLECTION_NAME = os.getenv("MONGO_EMBEDDING_COLLECTION_NAME", "ai_service_embeddings")
+# connection pool of the client, a request waits for a free connection up to the wait queue timeout
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "32"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# threads running the blocking pymongo calls, sized to the connection pool by default.
+# 0 runs the calls on the event loop, which blocks it during every round trip (only for comparison)
+MONGO_EXECUTOR_WORKERS = int(os.getenv("MONGO_EXECUTOR_WORKERS", str(MONGO_MAX_POOL_SIZE)))
+
+logger = logging.getLogger(__name__)
+
+# error codes of an index that exists with the same name but other options or keys
+INDEX_CONFLICT_CODES = [85, 86]
+
+# indexes of the catalog queries, ensured at startup. The filters of `GET /ai-services/` are
+# compound with `_id`, so the same index also serves the sort of the cursor pagination
+# the services without an image yet have an empty `image_repository_url`, only the
+# non-empty urls are indexed and must be unique
+AI_SERVICE_INDEXES = [
+    IndexModel(
+        [("image_repository_url", ASCENDING)],
+        name="image_repository_url_unique",
+        unique=True,
+        partialFilterExpression={"image_repository_url": {"$gt": ""}},
+    ),
+    IndexModel([("model_name", ASCENDING), ("_id", ASCENDING)], name="model_name_id"),
+    IndexModel([("task", ASCENDING), ("_id", ASCENDING)], name="task_id"),
+    # multikey index, one entry per profiled node of each service
+    IndexModel([("profiles.node_id", ASCENDING)], name="profiles_node_id"),
+]
+
+# representative catalog lookups, none of them may scan the whole collection
+CATALOG_QUERIES = {
+    "service by image repository url": ({"image_repository_url": "registry/service:latest"}, None),
+    "services by model name": ({"model_name": ""}, "_id"),
+    "services by task": ({"task": ""}, "_id"),
+    "services profiled on a node": ({"profiles.node_id": ""}, None),
+    "placement candidates on a node": (
+        {"profiles": {"$elemMatch": {"node_id": "", "inference.execution_time_ms": {"$lte": 0}}}},
+        None,
+    ),
+    "next page": ({"_id": {"$gt": ObjectId("000000000000000000000000")}}, "_id"),
+}
+
+
+def create_mongo_client(uri: str = MONGO_URI) -> MongoClient:
+    """MongoDB client with the configured pool limits and timeouts, it connects lazily."""
+    return MongoClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    )
+
+
+class AsyncCollection:
+    """
+    Awaitable wrapper of a pymongo collection.
+
+    Every call, including the iteration of the cursors, runs on a dedicated thread pool,
+    so the event loop keeps serving requests during the database round trips. The pool
+    size bounds the number of concurrent database calls, it should not exceed the
+    connection pool of the client. Without an executor the calls run inline.
+    """
+
+    def __init__(self, collection: Collection, executor: Optional[ThreadPoolExecutor]):
+        self.collection = collection
+        self.executor = executor
+
+    async def run(self, function: Callable, *args, **kwargs):
+        """Run a blocking function of the data layer on the database thread pool."""
+        if self.executor is None:
+            return function(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    async def find(self, query: dict, projection: Optional[dict] = None, **kwargs) -> List[dict]:
+        return await self.run(
+            lambda: list(self.collection.find(query, projection, **kwargs))
+        )
+
+    async def find_one(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.run(self.collection.find_one, query, projection)
+
+    async def insert_one(self, document: dict):
+        return await self.run(self.collection.insert_one, document)
+
+    async def update_one(self, query: dict, update: dict, **kwargs):
+        return await self.run(self.collection.update_one, query, update, **kwargs)
+
+    async def delete_one(self, query: dict):
+        return await self.run(self.collection.delete_one, query)
+
+    async def aggregate(self, pipeline: List[dict]) -> List[dict]:
+        return await self.run(lambda: list(self.collection.aggregate(pipeline)))
+
+
+def ensure_indexes(collection: Collection) -> List[str]:
+    """
+    Create the missing `AI_SERVICE_INDEXES`. An index that exists under the same name with
+    other options (e.g. from an older manager) is dropped and created again.
+    An index that cannot be built (e.g. duplicated image repository urls for the unique
+    index) is logged as an error and skipped, so the manager still starts.
+    """
+    created_indexes = []
+    for index in AI_SERVICE_INDEXES:
+        name = index.document["name"]
+        try:
+            try:
+                created_indexes += collection.create_indexes([index])
+            except OperationFailure as e:
+                if e.code not in INDEX_CONFLICT_CODES:
+                    raise
+                logger.warning(f"Recreating the index {name}, its definition changed: {e}")
+                collection.drop_index(name)
+                created_indexes += collection.create_indexes([index])
+        except OperationFailure as e:
+            logger.error(
+                f"Failed to create the index {name} on {collection.full_name}, "
+                f"the catalog queries it serves will scan the collection: {e}"
+            )
+    return created_indexes
+
+
+def get_plan_stages(plan: dict) -> List[str]:
+    """Stages of a query plan of `explain()`, for both the classic and the slot-based engine."""
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ["inputStage", "queryPlan"]:
+        if key in plan:
+            stages += get_plan_stages(plan[key])
+    for input_stage in plan.get("inputStages", []):
+        stages += get_plan_stages(input_stage)
+    return stages
+
+
+def explain_catalog_queries(collection: Collection) -> dict:
+    """
+    Winning plan of each of the `CATALOG_QUERIES`. A query uses an index if its plan
+    has no collection scan, so its cost grows with log n instead of n.
+    """
+    plans = {}
+    for name, (query, sort_field) in CATALOG_QUERIES.items():
+        cursor = collection.find(query)
+        if sort_field:
+            cursor = cursor.sort(sort_field, ASCENDING)
+        stages = get_plan_stages(cursor.explain()["queryPlanner"]["winningPlan"])
+        plans[name] = {
+            "stages": stages,
+            "uses_index": "COLLSCAN" not in stages,
+        }
+    return plans
+
+
+def create_executor(workers: int = MONGO_EXECUTOR_WORKERS) -> Optional[ThreadPoolExecutor]:
+    if workers <= 0:
+        return None
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mongo")
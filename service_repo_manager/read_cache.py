@@ -0,0 +1,111 @@
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# number of read responses kept in memory, 0 disables the cache (the ETags are still served)
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "256"))
+
+
+def parse_if_none_match(header: Optional[str]) -> List[str]:
+    """ETags of an `If-None-Match` header, weak ETags are compared by their opaque value."""
+    etags = []
+    for etag in (header or "").split(","):
+        etag = etag.strip()
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        if etag:
+            etags.append(etag)
+    return etags
+
+
+class CatalogReadCache:
+    """
+    Read-through cache of the catalog responses, versioned by the writes of this manager.
+
+    Every POST/PUT/DELETE bumps the catalog version and drops the cached responses. The ETag
+    of a read is the version and a hash of the request URL, so a conditional GET is answered
+    without touching MongoDB. The process id in the ETag keeps the ETags of a previous run
+    from matching after a restart. Writes made directly to MongoDB are not seen.
+    """
+
+    def __init__(self, max_entries: int = READ_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.process_id = uuid.uuid4().hex[:8]
+        self.version = 0
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def make_key(path: str, query_params: List[tuple]) -> str:
+        return f"{path}?{sorted(query_params)}"
+
+    def etag(self, key: str, version: Optional[int] = None) -> str:
+        version = self.version if version is None else version
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        return f'"{self.process_id}-{version}-{key_hash}"'
+
+    def is_not_modified(self, etag: str, if_none_match: Optional[str]) -> bool:
+        """Whether the client already has the response of `etag`."""
+        if etag not in parse_if_none_match(if_none_match):
+            return False
+        with self._lock:
+            self._counters["not_modified"] += 1
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, key: str, value: Any, version: int):
+        """Cache a response computed at `version`, unless a write happened in the meantime."""
+        with self._lock:
+            if version != self.version or self.max_entries <= 0:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """Called after every write of the manager."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            requests = lookups + self._counters["not_modified"]
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                # share of the reads answered without MongoDB, by the cache or with a 304
+                "served_without_database_rate": (
+                    (self._counters["hits"] + self._counters["not_modified"]) / requests
+                    if requests
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# -------------------------------------------
+# ENV Variables
+# -------------------------------------------
+# embedder of the task details: "hashing" (local, no model download) or
+# "sentence-transformers" (requires the sentence-transformers package)
+TASK_DETAIL_EMBEDDER = os.getenv("TASK_DETAIL_EMBEDDER", "hashing")
+SENTENCE_TRANSFORMER_MODEL = os.getenv("SENTENCE_TRANSFORMER_MODEL", "all-MiniLM-L6-v2")
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "1024"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "which", "with",
+}
+
+
+def get_text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HashingEmbedder:
+    """
+    Local embedder without a model: the words and word bigrams of a text are hashed into a
+    fixed number of signed buckets (the hashing trick), with log-scaled counts.
+    The similarity of two embeddings is their lexical overlap, it runs offline and is deterministic.
+    """
+
+    def __init__(self, dim: int = HASHING_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed_one(self, text: str) -> np.ndarray:
+        tokens = [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            feature_hash = int.from_bytes(
+                hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            vector[feature_hash % self.dim] += 1.0 if feature_hash >> 63 else -1.0
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.stack([self.embed_one(text) for text in texts])
+
+
+class SentenceTransformerEmbedder:
+    """Semantic embedder backed by a sentence-transformers model, loaded once."""
+
+    def __init__(self, model_name: str = SENTENCE_TRANSFORMER_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence-transformers/{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True).astype(np.float32)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+
+def create_embedder(name: str = TASK_DETAIL_EMBEDDER):
+    """Create the configured embedder, falling back to the hashing embedder if it cannot be loaded."""
+    assert name in EMBEDDERS, f"Unknown embedder '{name}', use one of {list(EMBEDDERS)}."
+    try:
+        return EMBEDDERS[name]()
+    except ImportError as e:
+        print(f"Failed to load the {name} embedder, falling back to the hashing embedder: {e}")
+        return HashingEmbedder()
+
+
+class EmbeddingIndex:
+    """
+    In-memory index of normalized embeddings, searched by cosine similarity.
+    The rows are updated in place on writes, a removed row is replaced by the last one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def upsert(self, key: str, vector: np.ndarray):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if not self._keys:
+                self._vectors = np.zeros((0, vector.shape[0]), dtype=np.float32)
+            row = self._rows.get(key)
+            if row is not None:
+                self._vectors[row] = vector
+                return
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._vectors = np.vstack([self._vectors, vector[None, :]])
+
+    def remove(self, key: str):
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return
+            last_key = self._keys.pop()
+            last_vector = self._vectors[-1]
+            self._vectors = self._vectors[:-1]
+            if last_key != key:
+                self._keys[row] = last_key
+                self._rows[last_key] = row
+                self._vectors[row] = last_vector
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """Top-k keys with their cosine similarity to the query embedding."""
+        with self._lock:
+            if not self._keys:
+                return []
+            scores = self._vectors @ np.asarray(vector, dtype=np.float32)
+            k = min(k, len(self._keys))
+            top_rows = np.argpartition(-scores, k - 1)[:k]
+            top_rows = top_rows[np.argsort(-scores[top_rows])]
+            return [(self._keys[row], float(scores[row])) for row in top_rows]
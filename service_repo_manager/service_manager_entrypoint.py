@@ -3,6 +3,7 @@ import os
 import json
 import time
 from pymongo import MongoClient
+from database import explain_catalog_queries
 from rich.console import Console
 from rich.table import Table
 import traceback
@@ -49,11 +50,53 @@ def option_export_mongodb_to_json():
     except Exception as e:
         print(f"Error: {e}")
 
+def check_catalog_query_plans(uri, database_name, collection_name):
+    """
+    Explain the catalog lookups of the manager and check that none of them scans the whole collection.
+    Returns True if all of them use an index.
+    """
+    client = MongoClient(uri)
+    try:
+        plans = explain_catalog_queries(client[database_name][collection_name])
+    finally:
+        client.close()
+
+    table = Table(title=f"Query plans of {database_name}/{collection_name}")
+    table.add_column("Query", style="cyan")
+    table.add_column("Plan stages", style="yellow")
+    table.add_column("Uses an index", justify="center")
+    for name, plan in plans.items():
+        table.add_row(
+            name,
+            " <- ".join(plan["stages"]),
+            "[green]yes[/green]" if plan["uses_index"] else "[bold red]no[/bold red]",
+        )
+    Console().print(table)
+    return all(plan["uses_index"] for plan in plans.values())
+
+def option_check_catalog_query_plans():
+    """Check that the catalog lookups use the indexes ensured by the manager."""
+    try:
+        uri = input(f"Enter MongoDB URI (default: {DEFAULT_MONGO_URI}): ").strip() or DEFAULT_MONGO_URI
+        database_name = input("Enter the database name (default: cranfield_ai_services): ").strip() or "cranfield_ai_services"
+        collection_name = input("Enter the collection name (default: ai_services): ").strip() or "ai_services"
+
+        if check_catalog_query_plans(uri, database_name, collection_name):
+            print("All catalog lookups use an index.")
+        else:
+            print("Some catalog lookups scan the whole collection, start the manager to ensure its indexes.")
+    except Exception as e:
+        print(f"Error: {e}")
+
 OPTIONS = [
     {
         "label": "Export MongoDB data to a JSON file",
         "function": option_export_mongodb_to_json,
     },
+    {
+        "label": "Check the query plans of the catalog lookups",
+        "function": option_check_catalog_query_plans,
+    },
 ]
 
 def main():
@@ -77,7 +120,7 @@ def main():
         console.print(table)
 
         try:
-            choice = input("Enter your choice (1 or 'q' to quit): ").strip()
+            choice = input(f"Enter your choice (1-{len(OPTIONS)} or 'q' to quit): ").strip()
             
             if choice == "q":
                 console.print("[bold green]Exiting the program. Goodbye![/bold green]")
@@ -87,7 +130,7 @@ def main():
                 console.print(f"[bold yellow]Executing:[/bold yellow] {option['label']}")
                 option["function"]()
             else:
-                console.print("[bold red]Invalid choice. Please select a valid option (1 or 'q').[/bold red]")
+                console.print(f"[bold red]Invalid choice. Please select a valid option (1-{len(OPTIONS)} or 'q').[/bold red]")
         
         except Exception as e:
             console.print(f"[bold red]An error occurred:[/bold red] {e}")
@@ -0,0 +1,147 @@
+"""
+Load test of the AI Service Manager API against a local MongoDB stand-in.
+
+The stand-in is an in-memory `mongomock` collection seeded with the latest snapshot of
+`database_storage/`, every call sleeps `--db-latency-ms` to model the round trip to MongoDB.
+The same request mix is sent with the database calls on the thread pool, and inline on the
+event loop (the behaviour of the blocking handlers) for comparison, both without the read cache,
+then with the read cache in front of the thread pool.
+
+    pip install httpx mongomock
+    python service_manager_load_test.py --requests 400 --concurrency 32 --db-latency-ms 10
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import statistics
+import time
+
+import httpx
+import mongomock
+
+import service_manager_server
+from database import AsyncCollection, create_executor
+from read_cache import CatalogReadCache
+
+DATABASE_STORAGE_DIR = os.path.join(os.path.dirname(__file__), "database_storage")
+
+
+class SlowCollection:
+    """Proxy of a collection that waits a fixed latency before every call, standing in for the MongoDB round trip."""
+
+    def __init__(self, collection, latency_s: float):
+        self.collection = collection
+        self.latency_s = latency_s
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            time.sleep(self.latency_s)
+            return attribute(*args, **kwargs)
+
+        return call
+
+
+def load_latest_snapshot() -> list:
+    snapshot_files = sorted(
+        glob.glob(os.path.join(DATABASE_STORAGE_DIR, "*.json")), key=os.path.getmtime
+    )
+    assert snapshot_files, f"No snapshot found in {DATABASE_STORAGE_DIR}."
+    with open(snapshot_files[-1], "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def create_stand_in_collection(db_latency_ms: float):
+    collection = mongomock.MongoClient().db.ai_services
+    collection.insert_many(load_latest_snapshot())
+    return SlowCollection(collection, db_latency_ms / 1000)
+
+
+async def send_requests(num_requests: int, concurrency: int, service_ids: list, model_names: list):
+    """Send a mix of reads by id (80%) and filtered list calls (20%), returns the latencies in seconds."""
+    transport = httpx.ASGITransport(app=service_manager_server.app)
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(num_requests):
+        if random.random() < 0.8:
+            queue.put_nowait((f"/ai-service/{random.choice(service_ids)}", None))
+        else:
+            queue.put_nowait(("/ai-services/", {"model_name": random.choice(model_names)}))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://manager") as http_client:
+
+        async def worker():
+            while not queue.empty():
+                url, params = queue.get_nowait()
+                start_time = time.perf_counter()
+                response = await http_client.get(url, params=params)
+                latencies.append(time.perf_counter() - start_time)
+                assert response.status_code == 200, response.text
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies
+
+
+def run_load_test(mode: str, executor_workers: int, read_cache_entries: int, args) -> dict:
+    stand_in_collection = create_stand_in_collection(args.db_latency_ms)
+    service_ids = [str(doc["_id"]) for doc in stand_in_collection.collection.find({}, {"_id": 1})]
+    model_names = stand_in_collection.collection.distinct("model_name")
+    executor = create_executor(executor_workers)
+    service_manager_server.collection = AsyncCollection(stand_in_collection, executor)
+    service_manager_server.read_cache = CatalogReadCache(read_cache_entries)
+
+    start_time = time.perf_counter()
+    latencies = asyncio.run(
+        send_requests(args.requests, args.concurrency, service_ids, model_names)
+    )
+    duration = time.perf_counter() - start_time
+    if executor is not None:
+        executor.shutdown()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "throughput_rps": len(latencies) / duration,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p95_ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))],
+        "cache_hit_rate": service_manager_server.read_cache.metrics()["hit_rate"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--db-latency-ms", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=32, help="database thread pool size")
+    args = parser.parse_args()
+
+    results = [
+        run_load_test("event loop (blocking)", 0, 0, args),
+        run_load_test(f"thread pool ({args.workers} workers)", args.workers, 0, args),
+        run_load_test("thread pool + read cache", args.workers, 1024, args),
+    ]
+
+    print(
+        f"\n{args.requests} requests, concurrency {args.concurrency}, "
+        f"database latency {args.db_latency_ms} ms\n"
+    )
+    print(
+        f"{'mode':<28} {'throughput (req/s)':>20} {'p50 (ms)':>10} {'p95 (ms)':>10} {'cache hits':>11}"
+    )
+    for result in results:
+        print(
+            f"{result['mode']:<28} {result['throughput_rps']:>20.1f} "
+            f"{result['p50_ms']:>10.1f} {result['p95_ms']:>10.1f} {result['cache_hit_rate']:>11.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,152 @@
-from typing import Optional
-from fastapi import FastAPI, HTTPException
-from pymongo import MongoClient
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, ExecutionTimeout
 from bson import ObjectId
+from bson.errors import InvalidId
 from api_models import AIService
 import os
+from database import (
+    MONGO_COLLECTION_NAME,
+    MONGO_DATABASE_NAME,
+    MONGO_EMBEDDING_COLLECTION_NAME,
+    AsyncCollection,
+    create_executor,
+    create_mongo_client,
+    ensure_indexes,
+)
+from read_cache import CatalogReadCache
+from semantic_search import EmbeddingIndex, create_embedder, get_text_hash
+
+# page size of `GET /ai-services/`
+DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", "50"))
+MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", "500"))
+# the indexes and the search index are prepared at startup, and again every
+# interval (seconds) in the background while the database is unreachable
+CATALOG_PREPARATION_RETRY_S = float(os.getenv("CATALOG_PREPARATION_RETRY_S", "5"))
+
+# fields of the summary view of `GET /ai-services/`, the `code` object (~40 KB per service)
+# and the detailed profiling metrics are left out
+SUMMARY_PROJECTION = {
+    "model_name": 1,
+    "model_url": 1,
+    "task": 1,
+    "image_repository_url": 1,
+    "service_disk_size_bytes": 1,
+    "profiles.node_id": 1,
+    "profiles.backend": 1,
+    "profiles.precision": 1,
+    "profiles.device_type": 1,
+    "profiles.device_name": 1,
+    "profiles.initialization_time_ms": 1,
+    "profiles.inference.execution_time_ms": 1,
+    "profiles.inference.cpu_memory_usage_MB": 1,
+    "profiles.inference.device_memory_usage_MB": 1,
+    "profiles.xai.xai_method": 1,
+    "profiles.xai.execution_time_ms": 1,
+}
+SERVICE_VIEWS = ["summary", "full"]
+
+# MongoDB connection, the blocking pymongo calls run on a dedicated thread pool
+client = create_mongo_client()
+db = client.get_database(MONGO_DATABASE_NAME)
+collection = AsyncCollection(db[MONGO_COLLECTION_NAME], create_executor())
+embedding_collection = AsyncCollection(db[MONGO_EMBEDDING_COLLECTION_NAME], collection.executor)
+
+# semantic search over the task details, the index is loaded at startup and updated on writes
+embedder = create_embedder()
+task_detail_index = EmbeddingIndex()
+
+# ETags and read-through cache of the catalog reads, invalidated by the writes of this manager
+read_cache = CatalogReadCache()
+
+
+async def index_task_detail(service_id: ObjectId, task_detail: str):
+    """Embed the task detail of a service, store the embedding and add it to the search index."""
+    vector = await collection.run(embedder.embed_one, task_detail)
+    await embedding_collection.update_one(
+        {"_id": service_id},
+        {
+            "$set": {
+                "embedder": embedder.name,
+                "task_detail_sha256": get_text_hash(task_detail),
+                "vector": vector.tolist(),
+            }
+        },
+        upsert=True,
+    )
+    task_detail_index.upsert(str(service_id), vector)
+
+
+async def load_task_detail_index():
+    """
+    Load the stored embeddings into the search index. The services without an embedding of the
+    current embedder, or whose task detail changed, are embedded again. The services without a
+    task detail (e.g. created before it was required) are not searchable and are skipped.
+    """
+    stored_embeddings = {
+        embedding["_id"]: embedding
+        for embedding in await embedding_collection.find({"embedder": embedder.name})
+    }
+    embedded_services, skipped_services = 0, 0
+    for service in await collection.find({}, {"task_detail": 1}):
+        service_id, task_detail = service.get("_id"), service.get("task_detail")
+        if service_id is None or not isinstance(task_detail, str) or not task_detail.strip():
+            skipped_services += 1
+            continue
+        embedding = stored_embeddings.get(service_id)
+        if embedding and embedding.get("task_detail_sha256") == get_text_hash(task_detail):
+            task_detail_index.upsert(str(service_id), embedding["vector"])
+        else:
+            await index_task_detail(service_id, task_detail)
+            embedded_services += 1
+    print(
+        f"Loaded {len(task_detail_index)} task detail embeddings ({embedder.name}), "
+        f"{embedded_services} computed at startup, {skipped_services} services without a task detail skipped."
+    )
+
+
+async def prepare_catalog():
+    """Declare the indexes of the catalog queries (the existing ones are left unchanged) and load the search index."""
+    created_indexes = await collection.run(ensure_indexes, collection.collection)
+    print(f"Ensured the AI Service indexes: {created_indexes}")
+    await load_task_detail_index()
+
+
+async def retry_prepare_catalog():
+    """
+    Prepare the catalog once the database is reachable, e.g. if it started after the manager.
+    Until then, the image repository urls are not unique and the search finds no service.
+    """
+    while True:
+        await asyncio.sleep(CATALOG_PREPARATION_RETRY_S)
+        try:
+            await prepare_catalog()
+            return
+        except ConnectionFailure as e:
+            print(f"The database is still unreachable, retrying in {CATALOG_PREPARATION_RETRY_S} s: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    retry_task = None
+    try:
+        await prepare_catalog()
+    except ConnectionFailure as e:
+        print(f"Failed to prepare the AI Service catalog, the database is unreachable: {e}")
+        retry_task = asyncio.create_task(retry_prepare_catalog())
+
+    yield
+
+    if retry_task is not None:
+        retry_task.cancel()
+    # release the database threads and connections
+    if collection.executor is not None:
+        collection.executor.shutdown(wait=False)
+    client.close()
+
 
 # Initialize FastAPI app with metadata for Swagger UI
 app = FastAPI(
@@ -18,13 +161,27 @@ app = FastAPI(
         "name": "MIT License",
         "url": "https://opensource.org/licenses/MIT",
     },
+    lifespan=lifespan,
 )
 
-# MongoDB connection
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017/?directConnection=true")
-client = MongoClient(MONGO_URI)
-db = client.get_database("cranfield_ai_services")
-collection = db["ai_services"]
+
+@app.exception_handler(ConnectionFailure)
+@app.exception_handler(ExecutionTimeout)
+async def database_unavailable_handler(request: Request, exc: Exception):
+    """The database is unreachable, its connection pool is exhausted or an operation timed out."""
+    return JSONResponse(
+        status_code=503, content={"detail": f"AI Service database unavailable: {exc}"}
+    )
+
+
+@app.exception_handler(DuplicateKeyError)
+async def duplicate_key_handler(request: Request, exc: DuplicateKeyError):
+    """A create or update would duplicate a unique field, e.g. the image repository url."""
+    detail = "An AI Service with the same image repository url already exists."
+    duplicate_fields = (exc.details or {}).get("keyValue")
+    if duplicate_fields:
+        detail += f" Duplicated: {duplicate_fields}"
+    return JSONResponse(status_code=409, content={"detail": detail})
 
 
 # Helper function to serialize MongoDB documents
@@ -34,26 +191,162 @@ def serialize_ai_service(doc):
     return doc
 
 
+async def serve_cached_read(
+    request: Request, response: Response, read: Callable[[], Awaitable[tuple]]
+):
+    """
+    Serve a catalog read with an ETag. A conditional GET whose `If-None-Match` holds the current
+    ETag is answered with `304` without touching MongoDB, otherwise the response is served from the
+    read cache or computed by `read`, which returns the content and the headers of the response.
+    """
+    key = read_cache.make_key(request.url.path, request.query_params.multi_items())
+    version = read_cache.version
+    cache_headers = {"ETag": read_cache.etag(key, version), "Cache-Control": "no-cache"}
+    if read_cache.is_not_modified(cache_headers["ETag"], request.headers.get("If-None-Match")):
+        return Response(status_code=304, headers=cache_headers)
+
+    cached = read_cache.get(key)
+    if cached is None:
+        cached = await read()
+        read_cache.put(key, cached, version)
+    content, headers = cached
+    response.headers.update({**headers, **cache_headers})
+    return content
+
+
+def parse_field_list(fields: Optional[str]) -> list:
+    """
+    Split a comma-separated list of (dotted) field names. MongoDB rejects a projection with
+    operators, empty path segments, or a path and one of its subpaths (a path collision),
+    these are answered with `400`.
+    """
+    field_list = list(
+        dict.fromkeys(field.strip() for field in (fields or "").split(",") if field.strip())
+    )
+    for field in field_list:
+        if any(not segment or segment.startswith("$") for segment in field.split(".")):
+            raise HTTPException(status_code=400, detail=f"Invalid field '{field}'.")
+    for field in field_list:
+        for other_field in field_list:
+            if other_field.startswith(f"{field}."):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"The fields '{field}' and '{other_field}' overlap, keep only one of them.",
+                )
+    return field_list
+
+
+def get_projection(view: str, fields: Optional[str], exclude: Optional[str]) -> Optional[dict]:
+    """
+    MongoDB projection of a list call. `fields` (inclusion) or `exclude` (exclusion)
+    take precedence over the view, they cannot be combined.
+    """
+    included_fields, excluded_fields = parse_field_list(fields), parse_field_list(exclude)
+    if included_fields and excluded_fields:
+        raise HTTPException(
+            status_code=400, detail="Use either 'fields' or 'exclude', not both."
+        )
+    if included_fields:
+        return {field: 1 for field in included_fields}
+    if excluded_fields:
+        return {field: 0 for field in excluded_fields if field != "_id"}
+    if view not in SERVICE_VIEWS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown view '{view}', use one of {SERVICE_VIEWS}."
+        )
+    return SUMMARY_PROJECTION if view == "summary" else None
+
+
+def get_placement_pipeline(
+    node_id: str,
+    task: Optional[str],
+    profile_limits: dict,
+    limit: int,
+) -> list:
+    """
+    Aggregation pipeline of the placement query, `profile_limits` maps a profile field to its maximum.
+    The services are matched with `$elemMatch` on their profiles (served by the `profiles.node_id`
+    index), only the profiles of the node within the limits are kept with `$filter`, and every
+    (service, profile) candidate is ranked by execution time, then initialization time.
+    """
+    profile_query = {"node_id": node_id}
+    profile_conditions = [{"$eq": ["$$profile.node_id", node_id]}]
+    for field, maximum in profile_limits.items():
+        profile_query[field] = {"$lte": maximum}
+        # in an expression a missing or null field sorts before the numbers and passes `$lte`,
+        # unlike in the `$elemMatch` query, `$gt` null leaves out the profiles without the metric
+        profile_conditions.append({"$gt": [f"$$profile.{field}", None]})
+        profile_conditions.append({"$lte": [f"$$profile.{field}", maximum]})
+
+    service_query = {"profiles": {"$elemMatch": profile_query}}
+    if task:
+        service_query["task"] = task
+
+    return [
+        {"$match": service_query},
+        {
+            "$project": {
+                "model_name": 1,
+                "task": 1,
+                "image_repository_url": 1,
+                "service_disk_size_bytes": 1,
+                "profile": {
+                    "$filter": {
+                        "input": "$profiles",
+                        "as": "profile",
+                        "cond": {"$and": profile_conditions},
+                    }
+                },
+            }
+        },
+        {"$unwind": "$profile"},
+        {
+            "$sort": {
+                "profile.inference.execution_time_ms": 1,
+                "profile.initialization_time_ms": 1,
+                "_id": 1,
+            }
+        },
+        {"$limit": limit},
+    ]
+
+
 # Create AI Service Record
 @app.post("/ai-services/", response_model=dict, status_code=201, tags=["AI Service"])
 async def create_ai_service(ai_service: AIService):
     """
     Create a new AI Service.
     """
-    result = collection.insert_one(ai_service.model_dump())
-    created = collection.find_one({"_id": result.inserted_id})
+    result = await collection.insert_one(ai_service.model_dump())
+    await index_task_detail(result.inserted_id, ai_service.task_detail)
+    read_cache.invalidate()
+    created = await collection.find_one({"_id": result.inserted_id})
     return serialize_ai_service(created)
 
 
 # Read all AI Service with optional filtering
 @app.get("/ai-services/", response_model=list, status_code=200, tags=["AI Service"])
 async def get_all_ai_services(
+    request: Request,
+    response: Response,
     model_name: Optional[str] = None,
     image_repository_url: Optional[str] = None,
     task: Optional[str] = None,
+    view: str = "summary",
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
 ):
     """
-    Retrieve all AI Service with optional filtering.
+    Retrieve all AI Service with optional filtering, one page at a time.
+
+    - **view**: `summary` (default: name, task, image URL and the main profile metrics) or `full`.
+    - **fields** / **exclude**: comma-separated (dotted) fields to return or to leave out, instead of the view.
+    - **limit**: maximum number of services in the page.
+    - **cursor**: the `X-Next-Cursor` header of the previous page, absent on the last page.
+
+    The page has an `ETag`, send it back in `If-None-Match` to get `304` while the catalog is unchanged.
     """
     query = {}
     if model_name:
@@ -62,9 +355,108 @@ async def get_all_ai_services(
         query["image_repository_url"] = image_repository_url
     if task:
         query["task"] = task
+    if cursor:
+        try:
+            query["_id"] = {"$gt": ObjectId(cursor)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor '{cursor}'.")
+    projection = get_projection(view, fields, exclude)
 
-    services = collection.find(query)
-    return [serialize_ai_service(s) for s in services]
+    async def read_page():
+        # one extra service tells whether there is a next page
+        services = await collection.find(
+            query,
+            projection,
+            sort=[("_id", 1)],
+            limit=limit + 1,
+        )
+        headers = {}
+        if len(services) > limit:
+            services = services[:limit]
+            headers["X-Next-Cursor"] = str(services[-1]["_id"])
+        return [serialize_ai_service(s) for s in services], headers
+
+    return await serve_cached_read(request, response, read_page)
+
+
+# Find the AI Services that can be placed on a node
+@app.get("/ai-services/placement", response_model=list, status_code=200, tags=["AI Service"])
+async def get_placement_candidates(
+    request: Request,
+    response: Response,
+    node_id: str,
+    task: Optional[str] = None,
+    max_execution_time_ms: Optional[float] = None,
+    max_memory_MB: Optional[float] = None,
+    max_device_memory_MB: Optional[float] = None,
+    max_initialization_time_ms: Optional[float] = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+):
+    """
+    Retrieve the AI Services profiled on a node that meet the latency and memory limits, best first.
+
+    - **node_id**: The node the services would be placed on.
+    - **max_execution_time_ms**, **max_memory_MB**, **max_device_memory_MB**: Limits of the inference profile.
+    - **max_initialization_time_ms**: Limit of the container initialization time.
+
+    Each candidate is a service with one matching profile, in `profile`. A service with several
+    matching profiles on the node (e.g. several backends) yields one candidate per profile.
+    Candidates are ranked by execution time, then initialization time.
+    """
+    profile_limits = {
+        "inference.execution_time_ms": max_execution_time_ms,
+        "inference.cpu_memory_usage_MB": max_memory_MB,
+        "inference.device_memory_usage_MB": max_device_memory_MB,
+        "initialization_time_ms": max_initialization_time_ms,
+    }
+    pipeline = get_placement_pipeline(
+        node_id,
+        task,
+        {field: maximum for field, maximum in profile_limits.items() if maximum is not None},
+        limit,
+    )
+
+    async def read_candidates():
+        candidates = await collection.aggregate(pipeline)
+        return [serialize_ai_service(candidate) for candidate in candidates], {}
+
+    return await serve_cached_read(request, response, read_candidates)
+
+
+# Semantic search over the task details
+@app.get("/ai-services/search", response_model=list, status_code=200, tags=["AI Service"])
+async def search_ai_services(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    k: int = Query(10, ge=1, le=MAX_PAGE_LIMIT),
+):
+    """
+    Retrieve the AI Services whose task detail is the most similar to a free-text query.
+
+    - **q**: The query, e.g. "detect people in a video stream".
+    - **k**: The number of services to return.
+
+    Each service is returned in the summary view with its cosine similarity `score`, best first.
+    """
+
+    async def read_matches():
+        query_vector = await collection.run(embedder.embed_one, q)
+        matches = task_detail_index.search(query_vector, k)
+        services = {
+            str(service["_id"]): service
+            for service in await collection.find(
+                {"_id": {"$in": [ObjectId(service_id) for service_id, _ in matches]}},
+                SUMMARY_PROJECTION,
+            )
+        }
+        return [
+            {**serialize_ai_service(services[service_id]), "score": score}
+            for service_id, score in matches
+            if service_id in services
+        ], {}
+
+    return await serve_cached_read(request, response, read_matches)
 
 
 # Read a single AI Service by ID
@@ -74,16 +466,22 @@ async def get_all_ai_services(
     status_code=200,
     tags=["AI Service"],
 )
-async def get_ai_service(service_id: str):
+async def get_ai_service(request: Request, response: Response, service_id: str):
     """
     Retrieve a single AI Service by its ID.
 
     - **service_id**: The ID of the AI service.
+
+    The service has an `ETag`, send it back in `If-None-Match` to get `304` while the catalog is unchanged.
     """
-    service = collection.find_one({"_id": ObjectId(service_id)})
-    if not service:
-        raise HTTPException(status_code=404, detail="AI Service not found")
-    return serialize_ai_service(service)
+
+    async def read_service():
+        service = await collection.find_one({"_id": ObjectId(service_id)})
+        if not service:
+            raise HTTPException(status_code=404, detail="AI Service not found")
+        return serialize_ai_service(service), {}
+
+    return await serve_cached_read(request, response, read_service)
 
 
 # Update AI Service by ID
@@ -100,12 +498,14 @@ async def update_ai_service(service_id: str, ai_service: AIService):
     - **service_id**: The ID of the AI service.
     - **ai_service**: The updated AI service data.
     """
-    result = collection.update_one(
+    result = await collection.update_one(
         {"_id": ObjectId(service_id)}, {"$set": ai_service.model_dump()}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="AI Service not found")
-    updated = collection.find_one({"_id": ObjectId(service_id)})
+    await index_task_detail(ObjectId(service_id), ai_service.task_detail)
+    read_cache.invalidate()
+    updated = await collection.find_one({"_id": ObjectId(service_id)})
     return serialize_ai_service(updated)
 
 
@@ -121,7 +521,23 @@ async def delete_ai_service(service_id: str):
     Delete an AI Service by its ID.
     - **service_id**: The ID of the AI service.
     """
-    result = collection.delete_one({"_id": ObjectId(service_id)})
+    result = await collection.delete_one({"_id": ObjectId(service_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="AI Service not found")
+    await embedding_collection.delete_one({"_id": ObjectId(service_id)})
+    task_detail_index.remove(service_id)
+    read_cache.invalidate()
     return {"message": "AI Service deleted successfully"}
+
+
+# Hit rates of the catalog read cache
+@app.get("/metrics/read-cache", response_model=dict, status_code=200, tags=["Metrics"])
+async def get_read_cache_metrics():
+    """
+    Retrieve the counters of the catalog read cache.
+
+    - **hit_rate**: share of the full reads served from the cache.
+    - **not_modified**: conditional GETs answered with `304`.
+    - **served_without_database_rate**: share of all the reads that did not query MongoDB.
+    """
+    return read_cache.metrics()
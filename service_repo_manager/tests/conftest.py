@@ -0,0 +1,82 @@
+import asyncio
+import copy
+import os
+import sys
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure
+
+# the manager modules are imported from the service directory, as in the container
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mongomock = pytest.importorskip("mongomock")
+httpx = pytest.importorskip("httpx")
+
+import service_manager_server  # noqa: E402
+from database import AsyncCollection  # noqa: E402
+from semantic_search import EmbeddingIndex  # noqa: E402
+from service_manager_load_test import load_latest_snapshot  # noqa: E402
+
+# the query plans and the aggregation semantics need a real MongoDB, the tests using
+# `mongo_collection` are skipped when it is unreachable
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017/?directConnection=true")
+
+
+@pytest.fixture
+def snapshot_services():
+    """Services of the latest `database_storage/` snapshot that have an image repository url."""
+    return [
+        service
+        for service in load_latest_snapshot()
+        if service["image_repository_url"]
+    ]
+
+
+@pytest.fixture
+def mongo_collection():
+    """Collection of a throwaway database on the test server, dropped afterwards."""
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except ConnectionFailure as e:
+        client.close()
+        pytest.skip(f"No MongoDB reachable at {MONGO_TEST_URI}: {e}")
+    database_name = f"ai_service_manager_test_{uuid.uuid4().hex[:8]}"
+    yield client[database_name]["ai_services"]
+    client.drop_database(database_name)
+    client.close()
+
+
+@pytest.fixture
+def run_manager(monkeypatch):
+    """
+    Run a coroutine `test(client, database)` against the manager, backed by an in-memory
+    `mongomock` database seeded with `services`, with the manager's startup and shutdown.
+    """
+
+    def run(test, services):
+        database = mongomock.MongoClient().db
+        if services:
+            database.ai_services.insert_many(copy.deepcopy(services))
+        monkeypatch.setattr(
+            service_manager_server, "collection", AsyncCollection(database.ai_services, None)
+        )
+        monkeypatch.setattr(
+            service_manager_server,
+            "embedding_collection",
+            AsyncCollection(database.ai_service_embeddings, None),
+        )
+        monkeypatch.setattr(service_manager_server, "task_detail_index", EmbeddingIndex())
+        monkeypatch.setattr(service_manager_server.client, "close", lambda: None)
+
+        async def run_test():
+            async with service_manager_server.lifespan(service_manager_server.app):
+                transport = httpx.ASGITransport(app=service_manager_server.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://manager") as client:
+                    await test(client, database)
+
+        asyncio.run(run_test())
+
+    return run
@@ -0,0 +1,88 @@
+"""
+Index checks of the catalog. The query plans need a real MongoDB, set `MONGO_TEST_URI`
+(default: a local server); the plan tests are skipped when it is unreachable.
+"""
+
+import asyncio
+import copy
+
+import pytest
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import ConnectionFailure
+
+import service_manager_server
+from database import AI_SERVICE_INDEXES, ensure_indexes, explain_catalog_queries
+
+
+def test_catalog_queries_use_indexes(mongo_collection, snapshot_services):
+    # services without an image share the empty url, they are left out of the unique index
+    services = copy.deepcopy(snapshot_services) + [
+        {**copy.deepcopy(snapshot_services[0]), "image_repository_url": ""},
+        {**copy.deepcopy(snapshot_services[0]), "image_repository_url": ""},
+    ]
+    mongo_collection.insert_many(services)
+
+    created_indexes = ensure_indexes(mongo_collection)
+    assert sorted(created_indexes) == sorted(index.document["name"] for index in AI_SERVICE_INDEXES)
+
+    for name, plan in explain_catalog_queries(mongo_collection).items():
+        assert "COLLSCAN" not in plan["stages"], f"{name}: {plan['stages']}"
+        assert "IXSCAN" in plan["stages"], f"{name}: {plan['stages']}"
+
+
+def test_ensure_indexes_recreates_changed_index(mongo_collection):
+    # the unique index of an older manager, without the partial filter
+    mongo_collection.create_indexes(
+        [IndexModel([("image_repository_url", ASCENDING)], name="image_repository_url_unique", unique=True)]
+    )
+
+    ensure_indexes(mongo_collection)
+
+    index = mongo_collection.index_information()["image_repository_url_unique"]
+    assert index["partialFilterExpression"] == {"image_repository_url": {"$gt": ""}}
+
+
+def test_duplicate_image_repository_url_returns_409(run_manager, snapshot_services):
+    async def test(client, database):
+        new_service = {**copy.deepcopy(snapshot_services[0]), "image_repository_url": "registry/new-service"}
+        response = await client.post("/ai-services/", json=new_service)
+        assert response.status_code == 201
+
+        response = await client.post("/ai-services/", json=new_service)
+        assert response.status_code == 409
+        assert "already exists" in response.json()["detail"]
+
+        other_service = database.ai_services.find_one(
+            {"image_repository_url": snapshot_services[1]["image_repository_url"]}
+        )
+        response = await client.put(f"/ai-service/{other_service['_id']}", json=new_service)
+        assert response.status_code == 409
+
+    run_manager(test, snapshot_services)
+
+
+def test_catalog_is_prepared_once_the_database_is_reachable(run_manager, snapshot_services, monkeypatch):
+    # the database is unreachable during the first attempt, at startup
+    attempts = []
+
+    def ensure_indexes_after_first_attempt(collection):
+        attempts.append(collection)
+        if len(attempts) == 1:
+            raise ConnectionFailure("database not started yet")
+        return ensure_indexes(collection)
+
+    monkeypatch.setattr(service_manager_server, "ensure_indexes", ensure_indexes_after_first_attempt)
+    monkeypatch.setattr(service_manager_server, "CATALOG_PREPARATION_RETRY_S", 0.01)
+
+    async def test(client, database):
+        assert len(service_manager_server.task_detail_index) == 0
+        for _ in range(100):
+            if len(service_manager_server.task_detail_index):
+                break
+            await asyncio.sleep(0.01)
+
+        assert len(attempts) == 2
+        assert len(service_manager_server.task_detail_index) == len(snapshot_services)
+        assert "image_repository_url_unique" in database.ai_services.index_information()
+
+    run_manager(test, snapshot_services)
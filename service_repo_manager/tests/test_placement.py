@@ -0,0 +1,155 @@
+import copy
+
+import pytest
+
+import service_manager_server
+from read_cache import CatalogReadCache
+
+
+def profile(node_id, execution_time_ms, initialization_time_ms, cpu_memory_usage_MB=100.0, backend="onnx"):
+    return {
+        "node_id": node_id,
+        "backend": backend,
+        "initialization_time_ms": initialization_time_ms,
+        "inference": {
+            "execution_time_ms": execution_time_ms,
+            "cpu_memory_usage_MB": cpu_memory_usage_MB,
+            "device_memory_usage_MB": 0.0,
+        },
+    }
+
+
+@pytest.fixture
+def placement_services(monkeypatch):
+    monkeypatch.setattr(service_manager_server, "read_cache", CatalogReadCache())
+    return [
+        {
+            "model_name": "detector-small",
+            "task": "object-detection",
+            "task_detail": "Detect objects in an image.",
+            "image_repository_url": "registry/detector-small",
+            "code": "...",
+            "profiles": [
+                profile("node-a", 40.0, 900.0, backend="onnx"),
+                profile("node-a", 40.0, 500.0, backend="torch"),
+                profile("node-b", 5.0, 100.0),
+            ],
+        },
+        {
+            "model_name": "detector-large",
+            "task": "object-detection",
+            "task_detail": "Detect objects in an image, more accurately.",
+            "image_repository_url": "registry/detector-large",
+            "code": "...",
+            "profiles": [profile("node-a", 120.0, 2000.0, cpu_memory_usage_MB=900.0)],
+        },
+        {
+            "model_name": "classifier",
+            "task": "image-classification",
+            "task_detail": "Classify an image.",
+            "image_repository_url": "registry/classifier",
+            "code": "...",
+            "profiles": [
+                profile("node-a", 10.0, 300.0),
+                # profiled without its memory usage
+                {"node_id": "node-a", "initialization_time_ms": 50.0, "inference": {"execution_time_ms": 1.0}},
+            ],
+        },
+    ]
+
+
+def candidates_of(response):
+    assert response.status_code == 200
+    return [
+        (candidate["model_name"], candidate["profile"]["inference"]["execution_time_ms"],
+         candidate["profile"]["initialization_time_ms"])
+        for candidate in response.json()
+    ]
+
+
+def test_placement_ranks_the_profiles_of_the_node(run_manager, placement_services):
+    async def test(client, database):
+        response = await client.get("/ai-services/placement", params={"node_id": "node-a"})
+        assert candidates_of(response) == [
+            ("classifier", 1.0, 50.0),
+            ("classifier", 10.0, 300.0),
+            ("detector-small", 40.0, 500.0),
+            ("detector-small", 40.0, 900.0),
+            ("detector-large", 120.0, 2000.0),
+        ]
+        for candidate in response.json():
+            assert candidate["profile"]["node_id"] == "node-a"
+            assert "profiles" not in candidate and "code" not in candidate
+
+        response = await client.get("/ai-services/placement", params={"node_id": "node-b"})
+        assert candidates_of(response) == [("detector-small", 5.0, 100.0)]
+
+        response = await client.get("/ai-services/placement", params={"node_id": "node-c"})
+        assert candidates_of(response) == []
+
+    run_manager(test, placement_services)
+
+
+def test_placement_keeps_the_profiles_within_the_limits(run_manager, placement_services):
+    async def test(client, database):
+        response = await client.get(
+            "/ai-services/placement", params={"node_id": "node-a", "max_execution_time_ms": 50}
+        )
+        assert candidates_of(response) == [
+            ("classifier", 1.0, 50.0),
+            ("classifier", 10.0, 300.0),
+            ("detector-small", 40.0, 500.0),
+            ("detector-small", 40.0, 900.0),
+        ]
+
+        # the profile without a memory usage does not pass a memory limit
+        response = await client.get(
+            "/ai-services/placement",
+            params={"node_id": "node-a", "max_memory_MB": 500, "max_initialization_time_ms": 600},
+        )
+        assert candidates_of(response) == [
+            ("classifier", 10.0, 300.0),
+            ("detector-small", 40.0, 500.0),
+        ]
+
+        response = await client.get(
+            "/ai-services/placement", params={"node_id": "node-a", "max_execution_time_ms": 0.5}
+        )
+        assert candidates_of(response) == []
+
+    run_manager(test, placement_services)
+
+
+def test_placement_filters_by_task_and_limit(run_manager, placement_services):
+    async def test(client, database):
+        response = await client.get(
+            "/ai-services/placement", params={"node_id": "node-a", "task": "object-detection"}
+        )
+        assert candidates_of(response) == [
+            ("detector-small", 40.0, 500.0),
+            ("detector-small", 40.0, 900.0),
+            ("detector-large", 120.0, 2000.0),
+        ]
+
+        response = await client.get(
+            "/ai-services/placement", params={"node_id": "node-a", "task": "object-detection", "limit": 1}
+        )
+        assert candidates_of(response) == [("detector-small", 40.0, 500.0)]
+
+        response = await client.get(
+            "/ai-services/placement", params={"node_id": "node-b", "task": "image-classification"}
+        )
+        assert candidates_of(response) == []
+
+    run_manager(test, placement_services)
+
+
+def test_placement_pipeline_skips_profiles_without_the_metric(mongo_collection, placement_services):
+    # unlike mongomock, MongoDB ranks a missing field below the numbers in the `$filter` expression
+    mongo_collection.insert_many(copy.deepcopy(placement_services))
+
+    pipeline = service_manager_server.get_placement_pipeline(
+        "node-a", "image-classification", {"inference.cpu_memory_usage_MB": 500}, 10
+    )
+    candidates = list(mongo_collection.aggregate(pipeline))
+    assert [candidate["profile"]["inference"]["execution_time_ms"] for candidate in candidates] == [10.0]
@@ -0,0 +1,192 @@
+import copy
+
+import pytest
+
+import service_manager_server
+from read_cache import CatalogReadCache
+
+
+@pytest.fixture
+def read_cache(monkeypatch):
+    """A fresh read cache of the manager, the module one outlives the tests."""
+    cache = CatalogReadCache(max_entries=16)
+    monkeypatch.setattr(service_manager_server, "read_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def count_finds(monkeypatch):
+    """Count the `find` calls of the manager's collection, set up inside the test coroutine."""
+    calls = []
+
+    def count():
+        collection = service_manager_server.collection
+        find = collection.find
+
+        async def counted_find(*args, **kwargs):
+            calls.append(args)
+            return await find(*args, **kwargs)
+
+        monkeypatch.setattr(collection, "find", counted_find)
+        return calls
+
+    return count
+
+
+def test_conditional_get_is_answered_without_the_database(
+    run_manager, snapshot_services, read_cache, count_finds
+):
+    async def test(client, database):
+        calls = count_finds()
+        response = await client.get("/ai-services/", params={"limit": 2})
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "no-cache"
+        assert len(calls) == 1
+
+        response = await client.get("/ai-services/", params={"limit": 2}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+        response = await client.get(
+            "/ai-services/", params={"limit": 2}, headers={"If-None-Match": f'"other", W/{etag}'}
+        )
+        assert response.status_code == 304
+
+        # the same query, without a matching ETag, is served from the cache
+        response = await client.get("/ai-services/", params={"limit": 2}, headers={"If-None-Match": '"other"'})
+        assert response.status_code == 200
+        assert response.headers["ETag"] == etag
+        assert len(calls) == 1
+
+        # another query has its own ETag
+        response = await client.get("/ai-services/", params={"limit": 3})
+        assert response.headers["ETag"] != etag
+        assert len(calls) == 2
+
+    run_manager(test, snapshot_services)
+
+
+def test_writes_change_the_etag_and_clear_the_cache(run_manager, snapshot_services, read_cache):
+    async def test(client, database):
+        async def list_etag():
+            response = await client.get("/ai-services/", params={"fields": "model_name"})
+            assert response.status_code == 200
+            return response.headers["ETag"], response.json()
+
+        etag, services = await list_etag()
+        new_service = {**copy.deepcopy(snapshot_services[0]), "image_repository_url": "registry/new-service"}
+
+        response = await client.post("/ai-services/", json=new_service)
+        assert response.status_code == 201
+        assert read_cache.metrics()["entries"] == 0
+        posted_etag, posted_services = await list_etag()
+        assert posted_etag != etag
+        assert len(posted_services) == len(services) + 1
+        response = await client.get(
+            "/ai-services/", params={"fields": "model_name"}, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+
+        service_id = posted_services[-1]["id"]
+        response = await client.get(f"/ai-service/{service_id}")
+        service_etag = response.headers["ETag"]
+        response = await client.put(
+            f"/ai-service/{service_id}", json={**new_service, "model_name": "renamed-model"}
+        )
+        assert response.status_code == 200
+        assert read_cache.metrics()["entries"] == 0
+        response = await client.get(f"/ai-service/{service_id}", headers={"If-None-Match": service_etag})
+        assert response.status_code == 200
+        assert response.json()["model_name"] == "renamed-model"
+        put_etag = response.headers["ETag"]
+
+        response = await client.delete(f"/ai-service/{service_id}")
+        assert response.status_code == 200
+        assert read_cache.metrics()["entries"] == 0
+        deleted_etag, deleted_services = await list_etag()
+        assert deleted_etag not in (etag, posted_etag, put_etag)
+        assert len(deleted_services) == len(services)
+
+    run_manager(test, snapshot_services)
+
+
+def test_read_computed_before_a_concurrent_write_is_not_cached(
+    run_manager, snapshot_services, read_cache, monkeypatch
+):
+    async def test(client, database):
+        collection = service_manager_server.collection
+        find = collection.find
+        service = database.ai_services.find_one({})
+        service = {key: value for key, value in service.items() if key != "_id"}
+        writes = []
+
+        async def find_during_a_write(*args, **kwargs):
+            services = await find(*args, **kwargs)
+            if not writes:
+                # a write completes while the read is in flight
+                writes.append(await client.put(f"/ai-service/{services[0]['_id']}", json=service))
+            return services
+
+        monkeypatch.setattr(collection, "find", find_during_a_write)
+        response = await client.get("/ai-services/", params={"limit": 1})
+        assert response.status_code == 200
+        assert writes[0].status_code == 200
+        # the response carries the ETag of the version it was read at, the client revalidates
+        stale_etag = response.headers["ETag"]
+        assert read_cache.metrics()["entries"] == 0
+
+        response = await client.get("/ai-services/", params={"limit": 1}, headers={"If-None-Match": stale_etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != stale_etag
+        assert read_cache.metrics()["entries"] == 1
+
+    run_manager(test, snapshot_services)
+
+
+def test_put_skips_stale_versions():
+    cache = CatalogReadCache(max_entries=2)
+    version = cache.version
+    cache.invalidate()
+    cache.put("a", "stale", version)
+    assert cache.get("a") is None
+
+    for key in ["a", "b", "c"]:
+        cache.put(key, key, cache.version)
+    assert cache.get("a") is None
+    assert cache.get("c") == "c"
+
+    cache = CatalogReadCache(max_entries=0)
+    cache.put("a", "a", cache.version)
+    assert cache.get("a") is None
+
+
+def test_read_cache_metrics(run_manager, snapshot_services, read_cache):
+    async def test(client, database):
+        response = await client.get("/ai-services/")
+        etag = response.headers["ETag"]
+        await client.get("/ai-services/")
+        await client.get("/ai-services/", headers={"If-None-Match": etag})
+        await client.get("/ai-services/", params={"limit": 1})
+
+        response = await client.get("/metrics/read-cache")
+        assert response.status_code == 200
+        metrics = response.json()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 2
+        assert metrics["not_modified"] == 1
+        assert metrics["entries"] == 2
+        assert metrics["max_entries"] == 16
+        assert metrics["hit_rate"] == pytest.approx(1 / 3)
+        assert metrics["served_without_database_rate"] == pytest.approx(2 / 4)
+
+        version = metrics["version"]
+        service_id = database.ai_services.find_one({})["_id"]
+        await client.delete(f"/ai-service/{service_id}")
+        metrics = (await client.get("/metrics/read-cache")).json()
+        assert metrics["version"] == version + 1
+        assert metrics["invalidations"] == 1
+        assert metrics["entries"] == 0
+
+    run_manager(test, snapshot_services)
@@ -0,0 +1,31 @@
+import copy
+
+import service_manager_server
+
+
+def test_startup_skips_services_without_task_detail(run_manager, snapshot_services):
+    # legacy documents created before `task_detail` was required
+    legacy_service = copy.deepcopy(snapshot_services[0])
+    legacy_service.pop("task_detail")
+    legacy_service["image_repository_url"] = "registry/legacy-service"
+    empty_service = {
+        **copy.deepcopy(snapshot_services[1]),
+        "task_detail": None,
+        "image_repository_url": "registry/empty-service",
+    }
+
+    async def test(client, database):
+        indexed_ids = {
+            str(service["_id"])
+            for service in database.ai_services.find({"task_detail": {"$type": "string"}})
+        }
+        assert len(service_manager_server.task_detail_index) == len(indexed_ids)
+
+        response = await client.get("/ai-services/search", params={"q": "image classification", "k": 50})
+        assert response.status_code == 200
+        assert {service["id"] for service in response.json()} == indexed_ids
+
+        response = await client.get("/ai-services/", params={"limit": 50})
+        assert len(response.json()) == len(snapshot_services) + 2
+
+    run_manager(test, snapshot_services + [legacy_service, empty_service])
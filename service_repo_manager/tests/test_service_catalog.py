@@ -0,0 +1,109 @@
+import copy
+
+import pytest
+
+
+@pytest.fixture
+def catalog_services(snapshot_services):
+    """Enough services for several pages, each with its own image repository url."""
+    return [
+        {**copy.deepcopy(service), "image_repository_url": f"{service['image_repository_url']}-{copy_index}"}
+        for copy_index in range(3)
+        for service in snapshot_services
+    ]
+
+
+def test_summary_view_leaves_out_the_code(run_manager, catalog_services):
+    async def test(client, database):
+        response = await client.get("/ai-services/", params={"limit": 1})
+        assert response.status_code == 200
+        [service] = response.json()
+        assert "code" not in service
+        assert "task_detail" not in service
+        assert {"id", "model_name", "task", "image_repository_url", "profiles"} <= set(service)
+
+        response = await client.get("/ai-services/", params={"limit": 1, "view": "full"})
+        assert "code" in response.json()[0]
+
+        response = await client.get("/ai-services/", params={"view": "compact"})
+        assert response.status_code == 400
+
+    run_manager(test, catalog_services)
+
+
+def test_fields_and_exclude(run_manager, catalog_services):
+    async def test(client, database):
+        response = await client.get("/ai-services/", params={"fields": "model_name,profiles.node_id"})
+        assert response.status_code == 200
+        for service in response.json():
+            assert set(service) == {"id", "model_name", "profiles"}
+            assert all(set(profile) <= {"node_id"} for profile in service["profiles"])
+
+        response = await client.get("/ai-services/", params={"exclude": "code,profiles"})
+        assert response.status_code == 200
+        for service in response.json():
+            assert "code" not in service and "profiles" not in service
+            assert "task_detail" in service
+
+        response = await client.get("/ai-services/", params={"fields": "model_name", "exclude": "code"})
+        assert response.status_code == 400
+
+    run_manager(test, catalog_services)
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"fields": "profiles,profiles.node_id"},
+        {"exclude": "profiles.inference,profiles"},
+        {"fields": "model_name,$where"},
+        {"fields": "profiles..node_id"},
+    ],
+)
+def test_invalid_projection_returns_400(run_manager, catalog_services, params):
+    async def test(client, database):
+        response = await client.get("/ai-services/", params=params)
+        assert response.status_code == 400
+
+    run_manager(test, catalog_services)
+
+
+def test_cursor_pagination_returns_each_service_once(run_manager, catalog_services):
+    async def test(client, database):
+        service_ids, pages, cursor = [], 0, None
+        while True:
+            params = {"limit": 4, "fields": "model_name"}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/ai-services/", params=params)
+            assert response.status_code == 200
+            page = response.json()
+            assert 0 < len(page) <= 4
+            service_ids += [service["id"] for service in page]
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            assert cursor == page[-1]["id"]
+
+        assert pages == -(-len(catalog_services) // 4)
+        assert sorted(service_ids) == sorted(str(service["_id"]) for service in database.ai_services.find())
+        assert len(set(service_ids)) == len(service_ids)
+
+    run_manager(test, catalog_services)
+
+
+def test_limit_bounds_and_invalid_cursor(run_manager, catalog_services):
+    async def test(client, database):
+        response = await client.get("/ai-services/", params={"limit": len(catalog_services)})
+        assert len(response.json()) == len(catalog_services)
+        assert "X-Next-Cursor" not in response.headers
+
+        for limit in [0, 100000]:
+            response = await client.get("/ai-services/", params={"limit": limit})
+            assert response.status_code == 422
+
+        response = await client.get("/ai-services/", params={"cursor": "not-an-object-id"})
+        assert response.status_code == 400
+
+    run_manager(test, catalog_services)
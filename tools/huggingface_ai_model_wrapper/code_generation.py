@@ -8,7 +8,7 @@ from utils import (
     AI_SERVER_UTILS_SCRIPT_NAME,
     NECESSARY_SERVICE_FILE_LIST,
     HEALTHCHECK_SCRIPT_NAME,
-    XAI_MODEL_SCRIPT_NAME,
+    XAI_SERVICE_FILE_LIST,
     copy_file_from_example_model_folder,
     download_model_readme,
     generate_ai_client_utils_script,
@@ -75,6 +75,12 @@ def prepare_example_model_data():
         ), f"The example file '{file_path}' does not exist."
         with open(file_path, "r") as file:
             example_model_files_content[file_name] = file.read()
+    # the XAI files are optional, they only exist for examples that support XAI
+    for file_name in XAI_SERVICE_FILE_LIST:
+        file_path = os.path.join(example_model_directory, file_name)
+        if os.path.exists(file_path):
+            with open(file_path, "r") as file:
+                example_model_files_content[file_name] = file.read()
     print(f"The example {example_model_name} is valid.")
     
     return example_model_files_content
@@ -149,13 +155,14 @@ def code_generation_main(huggingface_model_name: str, additional_data: dict) ->
     xai_enabled = model_task == "image-classification"
     # placeholder for other checks in the future
     if xai_enabled:
-        copy_file_from_example_model_folder(
-            XAI_MODEL_SCRIPT_NAME,
-            hf_model_directory,
-            example_model_files_content,
-            output_files_content,
-        )
-        print(f"XAI model script copied.")
+        for file_name_to_copy in XAI_SERVICE_FILE_LIST:
+            copy_file_from_example_model_folder(
+                file_name_to_copy,
+                hf_model_directory,
+                example_model_files_content,
+                output_files_content,
+            )
+        print(f"XAI model scripts copied.")
     else:
         print(f"The model {huggingface_model_name} does not support XAI.")
 
@@ -15,6 +15,11 @@ AI_CLIENT_SCRIPT_NAME = "ai_client.py"
 AI_CLIENT_UTILS_SCRIPT_NAME = "ai_client_utils.py"
 MODEL_SCRIPT_NAME = "model.py"
 XAI_MODEL_SCRIPT_NAME = "xai_model.py"
+XAI_ENGINE_SCRIPT_NAME = "xai_engine.py"
+XAI_JOBS_SCRIPT_NAME = "xai_jobs.py"
+XAI_PROFILES_SCRIPT_NAME = "xai_profiles.py"
+XAI_CACHE_SCRIPT_NAME = "xai_cache.py"
+IMAGE_INGEST_SCRIPT_NAME = "image_ingest.py"
 DOCKERFILE_NAME = "Dockerfile"
 HEALTHCHECK_SCRIPT_NAME = "healthcheck.py"
 SERVICE_DATA_JSON_NAME = "service_data.json"
@@ -30,7 +35,18 @@ NECESSARY_SERVICE_FILE_LIST = [
     SERVICE_DATA_JSON_NAME,
 ]
 
-COMPLETE_SERVICE_FILE_LIST = NECESSARY_SERVICE_FILE_LIST + [XAI_MODEL_SCRIPT_NAME]
+# files only copied for models that support XAI
+XAI_SERVICE_FILE_LIST = [
+    XAI_MODEL_SCRIPT_NAME,
+    XAI_ENGINE_SCRIPT_NAME,
+    XAI_JOBS_SCRIPT_NAME,
+    XAI_PROFILES_SCRIPT_NAME,
+    XAI_CACHE_SCRIPT_NAME,
+    # shared image decoding of model.py and xai_model.py in the image-classification services
+    IMAGE_INGEST_SCRIPT_NAME,
+]
+
+COMPLETE_SERVICE_FILE_LIST = NECESSARY_SERVICE_FILE_LIST + XAI_SERVICE_FILE_LIST
 
 
 def prompt_for_additional_guidance(current_task: str, additional_data: dict) -> str:
@@ -458,6 +474,51 @@ def sync_code_content_to_service_data_json(service_data_json, hf_model_directory
             "r",
         ).read()
 
+    if os.path.exists(os.path.join(hf_model_directory, XAI_ENGINE_SCRIPT_NAME)):
+        service_data_json["code"]["xai_engine_script_content"] = open(
+            os.path.join(
+                hf_model_directory,
+                XAI_ENGINE_SCRIPT_NAME,
+            ),
+            "r",
+        ).read()
+
+    if os.path.exists(os.path.join(hf_model_directory, XAI_JOBS_SCRIPT_NAME)):
+        service_data_json["code"]["xai_jobs_script_content"] = open(
+            os.path.join(
+                hf_model_directory,
+                XAI_JOBS_SCRIPT_NAME,
+            ),
+            "r",
+        ).read()
+
+    if os.path.exists(os.path.join(hf_model_directory, XAI_PROFILES_SCRIPT_NAME)):
+        service_data_json["code"]["xai_profiles_script_content"] = open(
+            os.path.join(
+                hf_model_directory,
+                XAI_PROFILES_SCRIPT_NAME,
+            ),
+            "r",
+        ).read()
+
+    if os.path.exists(os.path.join(hf_model_directory, XAI_CACHE_SCRIPT_NAME)):
+        service_data_json["code"]["xai_cache_script_content"] = open(
+            os.path.join(
+                hf_model_directory,
+                XAI_CACHE_SCRIPT_NAME,
+            ),
+            "r",
+        ).read()
+
+    if os.path.exists(os.path.join(hf_model_directory, IMAGE_INGEST_SCRIPT_NAME)):
+        service_data_json["code"]["image_ingest_script_content"] = open(
+            os.path.join(
+                hf_model_directory,
+                IMAGE_INGEST_SCRIPT_NAME,
+            ),
+            "r",
+        ).read()
+
 
 def prepare_service_data_json(model_name: str, additional_data: dict) -> str:
     """Copy a service_data.json for the model."""